@@ -0,0 +1,245 @@
+"""
+流量制御（アドミッション制御）モジュール
+処理中のリクエスト数の上限、クライアントごとのトークンバケット、期限付きの短い待ち行列により、
+過負荷時にも受け付けたリクエストのレイテンシを一定に保つ。
+受け付けられないリクエストには Retry-After 付きの 429 / 503 を即座に返す。
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Sequence, Tuple
+
+from app.metrics import ADMISSION_REJECTED_TOTAL, ADMISSION_WAIT_SECONDS
+
+
+class TokenBucketLimiter:
+    """
+    クライアントごとのトークンバケット
+
+    1秒あたり rate 個のトークンが補充され、最大 burst 個まで貯まる。
+    リクエストごとに1個消費し、不足している場合は拒否する。
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = float(burst)
+        self.max_clients = max_clients
+        # クライアント → [残りトークン数, 最終更新時刻]（最近使われた順）
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def try_acquire(self, client: str, now: Optional[float] = None) -> float:
+        """
+        トークンを1個消費する
+
+        Args:
+            client: クライアントの識別子
+            now: 現在時刻（time.monotonic()、省略時は現在時刻）
+
+        Returns:
+            float: 0.0（受け付け）、または次のトークンが補充されるまでの秒数（拒否）
+        """
+        if now is None:
+            now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.burst, now]
+            # 長く使われていないクライアントから削除する（削除後は満タンから再開）
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionRejected(Exception):
+    """流量制御でリクエストを受け付けなかった場合の例外"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+        self.message = message
+
+
+class AdmissionController:
+    """
+    処理中のリクエスト数の上限と、期限付きの待ち行列
+
+    - 処理中が max_in_flight 件未満なら即座に受け付ける
+    - 上限に達している場合は最大 queue_size 件まで待ち行列に入り、queue_timeout 秒以内に空きが出なければ 503
+    - 待ち行列も満杯なら即座に 503
+    - limiter を指定した場合、クライアントごとの流量を超えたリクエストは即座に 429
+
+    空きが出た時点で待ち行列の先頭に処理枠を直接引き渡すため、後から来たリクエストが追い越すことはない
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 32,
+        queue_size: int = 100,
+        queue_timeout: float = 1.0,
+        limiter: Optional[TokenBucketLimiter] = None
+    ):
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.limiter = limiter
+        self.in_flight = 0
+        self.queue_depth = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @classmethod
+    def from_settings(cls, settings) -> "AdmissionController":
+        """アプリケーション設定から作成する"""
+        limiter = None
+        if settings.admission_rate_per_client > 0:
+            limiter = TokenBucketLimiter(
+                settings.admission_rate_per_client,
+                settings.admission_burst_per_client
+            )
+        return cls(
+            max_in_flight=settings.admission_max_in_flight,
+            queue_size=settings.admission_queue_size,
+            queue_timeout=settings.admission_queue_timeout,
+            limiter=limiter
+        )
+
+    @property
+    def retry_after(self) -> float:
+        """混雑時に返す Retry-After（秒）"""
+        return max(1.0, self.queue_timeout)
+
+    async def acquire(self, client: str) -> float:
+        """
+        処理枠を取得する（取得後は必ず release() を呼び出すこと）
+
+        Args:
+            client: クライアントの識別子（流量制限に使用）
+
+        Returns:
+            float: 待ち行列での待ち時間（秒）
+
+        Raises:
+            AdmissionRejected: 流量の超過、待ち行列の満杯、待ち時間の超過
+        """
+        if self.limiter is not None:
+            wait = self.limiter.try_acquire(client)
+            if wait > 0:
+                raise AdmissionRejected(429, "rate_limited", wait, "リクエストが多すぎます。しばらく待ってから再試行してください")
+
+        # 待機中のリクエストがあるのは処理中が上限に達している間だけなので、空きがあれば即座に受け付けてよい
+        if self.in_flight < self.max_in_flight:
+            self.in_flight += 1
+            return 0.0
+        if self.queue_depth >= self.queue_size:
+            raise AdmissionRejected(503, "queue_full", self.retry_after, "混雑しています。しばらく待ってから再試行してください")
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        # 期限切れは False で完了させる（引き渡しと期限切れが同時に起きても取りこぼさない）
+        timer = loop.call_later(self.queue_timeout, _resolve, waiter, False)
+        self._waiters.append(waiter)
+        self.queue_depth += 1
+        started = time.perf_counter()
+        try:
+            granted = await waiter
+        except asyncio.CancelledError:
+            # 引き渡し後にキャンセルされた場合は処理枠を返す
+            if waiter.done() and not waiter.cancelled() and waiter.result():
+                self.release()
+            raise
+        finally:
+            timer.cancel()
+            self.queue_depth -= 1
+        if not granted:
+            raise AdmissionRejected(503, "queue_timeout", self.retry_after, "混雑しています。しばらく待ってから再試行してください")
+        return time.perf_counter() - started
+
+    def release(self) -> None:
+        """処理枠を返す（待ち行列があれば先頭に引き渡す）"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.in_flight -= 1
+
+
+def _resolve(future: asyncio.Future, value: bool) -> None:
+    """未完了の Future を完了させる"""
+    if not future.done():
+        future.set_result(value)
+
+
+class AdmissionMiddleware:
+    """
+    流量制御を行うASGIミドルウェア
+
+    paths のいずれかで始まるパスへのリクエストのみを対象とし、
+    拒否した場合はエラーハンドラーと同じ形式のJSONを Retry-After ヘッダー付きで返す
+    """
+
+    def __init__(
+        self,
+        app,
+        controller: AdmissionController,
+        paths: Sequence[str] = ("/api/",),
+        trust_forwarded: bool = False
+    ):
+        self.app = app
+        self.controller = controller
+        self.paths = tuple(paths)
+        self.trust_forwarded = trust_forwarded
+
+    def client_id(self, scope) -> str:
+        """クライアントの識別子（X-Forwarded-For の先頭、または接続元アドレス）"""
+        if self.trust_forwarded:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",", 1)[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            waited = await self.controller.acquire(self.client_id(scope))
+        except AdmissionRejected as e:
+            ADMISSION_REJECTED_TOTAL.inc(e.reason)
+            await self._reject(send, e)
+            return
+        ADMISSION_WAIT_SECONDS.observe(waited)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+    @staticmethod
+    async def _reject(send, rejected: AdmissionRejected) -> None:
+        """拒否レスポンスを送信する"""
+        body = json.dumps(
+            {"status": "error", "message": rejected.message, "status_code": rejected.status_code},
+            ensure_ascii=False
+        ).encode("utf-8")
+        headers: List[Tuple[bytes, bytes]] = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(rejected.retry_after))).encode()),
+        ]
+        await send({"type": "http.response.start", "status": rejected.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
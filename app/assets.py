@@ -0,0 +1,354 @@
+"""
+静的ファイル・入力フォームの配信モジュール
+入力フォーム（index.html）を事前にレンダリングし、静的ファイルの名前に内容のハッシュ値を付けて
+（例: style.css → style.0123456789ab.css）、gzip（brotli がインストールされていれば brotli も）で事前に圧縮する。
+
+- `python -m app.build` でビルドし、app/static/dist/ に出力する（Vercel ではエッジから直接配信される）
+- 起動時は app/static/dist/ を読み込む（元のファイルと一致しない場合はメモリ上でビルドし直す）
+- ハッシュ値付きのファイルは内容が変わらないため長期間キャッシュさせ（immutable）、
+  入力フォームとハッシュ値なしの URL は毎回 ETag で確認させる（変更がなければ 304）
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli は任意（未インストールの場合は gzip のみ）
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).parent / "static"
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_NAME = "manifest.json"
+
+# 事前にレンダリングするページ（HTMLテンプレート）
+PAGES = ("index.html",)
+
+# ファイル名に付けるハッシュ値の長さ（SHA-256 の先頭、16進数）
+HASH_LENGTH = 12
+
+# ハッシュ値付きのファイル: 1年間キャッシュし、再検証もしない
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# ページ・ハッシュ値なしのファイル: キャッシュしてよいが、使う前に毎回 ETag で確認する
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# 事前圧縮の対象（画像などの圧縮済みの形式は対象外）
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+# Content-Encoding → 事前圧縮したファイルの拡張子（優先する順）
+ENCODING_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+
+
+class Asset:
+    """
+    配信するファイル（本文と事前圧縮した本文）
+
+    ETag は本文のハッシュ値で、圧縮した表現には Content-Encoding ごとの接尾辞を付ける
+    """
+
+    __slots__ = ("name", "body", "content_type", "cache_control", "digest", "encodings")
+
+    def __init__(self, name: str, body: bytes, cache_control: str, encodings: Optional[Dict[str, bytes]] = None):
+        self.name = name
+        self.body = body
+        self.content_type = content_type(name)
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.encodings = encodings if encodings is not None else {}
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        """表現ごとの ETag"""
+        if encoding is None:
+            return f'"{self.digest[:32]}"'
+        return f'"{self.digest[:32]}-{encoding}"'
+
+    def etags(self) -> List[str]:
+        """全ての表現の ETag"""
+        return [self.etag()] + [self.etag(encoding) for encoding in self.encodings]
+
+
+def content_type(name: str) -> str:
+    """ファイル名から Content-Type を決める（テキストは UTF-8）"""
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type == "application/javascript":
+        return f"{media_type}; charset=utf-8"
+    return media_type
+
+
+def fingerprint(name: str, body: bytes) -> str:
+    """内容のハッシュ値を付けたファイル名（例: style.css → style.0123456789ab.css）"""
+    path = Path(name)
+    return f"{path.stem}.{hashlib.sha256(body).hexdigest()[:HASH_LENGTH]}{path.suffix}"
+
+
+def compress(name: str, body: bytes) -> Dict[str, bytes]:
+    """
+    本文を事前に圧縮する（元より小さくならない場合は含めない）
+
+    Args:
+        name: ファイル名（Content-Type の判定に使用）
+        body: 本文
+
+    Returns:
+        Dict[str, bytes]: Content-Encoding → 圧縮した本文
+    """
+    if not content_type(name).startswith(COMPRESSIBLE_TYPES):
+        return {}
+    encodings: Dict[str, bytes] = {}
+    # mtime=0: 同じ内容からは同じバイト列を生成する（ビルド結果の差分を出さない）
+    compressed = gzip.compress(body, compresslevel=9, mtime=0)
+    if len(compressed) < len(body):
+        encodings["gzip"] = compressed
+    if brotli is not None:
+        compressed = brotli.compress(body, quality=11)
+        if len(compressed) < len(body):
+            encodings["br"] = compressed
+    return encodings
+
+
+def source_files(static_dir: Path = STATIC_DIR) -> List[Path]:
+    """ビルド対象の静的ファイル（static 直下のファイル、ビルド結果のディレクトリを除く）"""
+    return sorted(path for path in static_dir.iterdir() if path.is_file() and not path.name.startswith("."))
+
+
+def source_digests(static_dir: Path = STATIC_DIR, template_dir: Path = TEMPLATE_DIR) -> Dict[str, str]:
+    """ビルド元のファイルのハッシュ値（ビルド結果が最新か判定するためマニフェストに記録する）"""
+    digests = {f"static/{path.name}": hashlib.sha256(path.read_bytes()).hexdigest() for path in source_files(static_dir)}
+    for page in PAGES:
+        digests[f"templates/{page}"] = hashlib.sha256((template_dir / page).read_bytes()).hexdigest()
+    return digests
+
+
+class StaticAssets:
+    """
+    ビルド済みの入力フォーム・静的ファイル
+
+    - pages: ページ名 → 事前にレンダリングしたページ
+    - files: /static/ 以下のパス → ファイル（dist/ 以下はハッシュ値付き、それ以外は元の名前）
+    - urls: 元のファイル名 → ハッシュ値付きのURL（テンプレートの static_url で参照）
+    """
+
+    def __init__(self, pages: Dict[str, Asset], files: Dict[str, Asset], urls: Dict[str, str]):
+        self.pages = pages
+        self.files = files
+        self.urls = urls
+
+    @classmethod
+    def build(cls, static_dir: Path = STATIC_DIR, template_dir: Path = TEMPLATE_DIR) -> "StaticAssets":
+        """
+        静的ファイルにハッシュ値を付けて圧縮し、ページをレンダリングする
+
+        Args:
+            static_dir: 静的ファイルのディレクトリ
+            template_dir: HTMLテンプレートのディレクトリ
+
+        Returns:
+            StaticAssets: ビルド結果
+        """
+        # jinja2 はビルド時のみ使用する（実行時はレンダリング済みのページを配信する）
+        from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+        files: Dict[str, Asset] = {}
+        urls: Dict[str, str] = {}
+        for path in source_files(static_dir):
+            body = path.read_bytes()
+            encodings = compress(path.name, body)
+            hashed = f"dist/{fingerprint(path.name, body)}"
+            files[hashed] = Asset(hashed, body, IMMUTABLE_CACHE_CONTROL, encodings)
+            files[path.name] = Asset(path.name, body, REVALIDATE_CACHE_CONTROL, encodings)
+            urls[path.name] = f"/static/{hashed}"
+
+        def static_url(name: str) -> str:
+            """テンプレートから参照する静的ファイルのURL"""
+            return urls[name]
+
+        environment = Environment(
+            loader=FileSystemLoader(str(template_dir)),
+            autoescape=select_autoescape(["html"]),
+            keep_trailing_newline=True
+        )
+        pages: Dict[str, Asset] = {}
+        for page in PAGES:
+            body = environment.get_template(page).render(static_url=static_url).encode("utf-8")
+            pages[page] = Asset(page, body, REVALIDATE_CACHE_CONTROL, compress(page, body))
+        return cls(pages, files, urls)
+
+    def outputs(self, sources: Dict[str, str]) -> Dict[str, bytes]:
+        """
+        ビルド結果のディレクトリに書き出すファイル
+
+        Args:
+            sources: ビルド元のファイルのハッシュ値（source_digests）
+
+        Returns:
+            Dict[str, bytes]: ファイル名 → 内容（事前圧縮したものは .gz / .br を付ける）
+        """
+        outputs: Dict[str, bytes] = {}
+        assets: Iterable[Tuple[str, Asset]] = [
+            *((name, asset) for name, asset in self.pages.items()),
+            *((name[len("dist/"):], asset) for name, asset in self.files.items() if name.startswith("dist/")),
+        ]
+        for name, asset in assets:
+            outputs[name] = asset.body
+            for encoding, suffix in ENCODING_SUFFIXES:
+                if encoding in asset.encodings:
+                    outputs[name + suffix] = asset.encodings[encoding]
+        manifest = {
+            "sources": sources,
+            "assets": {name: url[len("/static/dist/"):] for name, url in sorted(self.urls.items())},
+        }
+        outputs[MANIFEST_NAME] = (json.dumps(manifest, ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+        return outputs
+
+    @classmethod
+    def load(
+        cls,
+        dist_dir: Path = DIST_DIR,
+        static_dir: Path = STATIC_DIR,
+        template_dir: Path = TEMPLATE_DIR
+    ) -> "StaticAssets":
+        """
+        ビルド結果を読み込む（無い場合・元のファイルと一致しない場合はメモリ上でビルドする）
+
+        Args:
+            dist_dir: ビルド結果のディレクトリ
+            static_dir: 静的ファイルのディレクトリ
+            template_dir: HTMLテンプレートのディレクトリ
+
+        Returns:
+            StaticAssets: 読み込んだビルド結果
+        """
+        manifest_path = dist_dir / MANIFEST_NAME
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            manifest = None
+        if manifest is None or manifest.get("sources") != source_digests(static_dir, template_dir):
+            logger.warning("静的ファイルのビルド結果が最新ではないため、起動時にビルドします（python -m app.build で再生成してください）")
+            return cls.build(static_dir, template_dir)
+
+        def read(name: str, cache_control: str, url_name: Optional[str] = None) -> Asset:
+            encodings = {}
+            for encoding, suffix in ENCODING_SUFFIXES:
+                path = dist_dir / (name + suffix)
+                if path.is_file():
+                    encodings[encoding] = path.read_bytes()
+            return Asset(url_name or name, (dist_dir / name).read_bytes(), cache_control, encodings)
+
+        pages = {page: read(page, REVALIDATE_CACHE_CONTROL) for page in PAGES}
+        files: Dict[str, Asset] = {}
+        urls: Dict[str, str] = {}
+        for name, hashed in manifest["assets"].items():
+            asset = read(hashed, IMMUTABLE_CACHE_CONTROL, f"dist/{hashed}")
+            files[asset.name] = asset
+            files[name] = Asset(name, asset.body, REVALIDATE_CACHE_CONTROL, asset.encodings)
+            urls[name] = f"/static/{asset.name}"
+        return cls(pages, files, urls)
+
+
+def accepted_encodings(accept_encoding: str) -> List[str]:
+    """Accept-Encoding で受け付けるエンコーディング（q=0 のものを除く）"""
+    encodings = []
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = params.strip().lower()
+        if quality.startswith("q=") and quality[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        encodings.append(name)
+    return encodings
+
+
+def asset_response(asset: Asset, accept_encoding: str = "", if_none_match: Optional[str] = None) -> Response:
+    """
+    ファイルのレスポンスを作成する
+
+    クライアントが受け付ける場合は事前圧縮した本文を返し、
+    If-None-Match がいずれかの表現の ETag と一致する場合は本文なしの 304 を返す
+
+    Args:
+        asset: 配信するファイル
+        accept_encoding: リクエストの Accept-Encoding
+        if_none_match: リクエストの If-None-Match
+
+    Returns:
+        Response: 200 または 304
+    """
+    encoding = None
+    if asset.encodings and accept_encoding:
+        accepted = accepted_encodings(accept_encoding)
+        encoding = next(
+            (name for name, _ in ENCODING_SUFFIXES if name in asset.encodings and (name in accepted or "*" in accepted)),
+            None
+        )
+    headers = {"Cache-Control": asset.cache_control, "ETag": asset.etag(encoding), "Vary": "Accept-Encoding"}
+    if if_none_match is not None:
+        # 弱い比較（W/ を無視）で、いずれかの表現の ETag と一致すれば変更なしとする
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or not tags.isdisjoint(asset.etags()):
+            return Response(status_code=304, headers=headers)
+
+    if encoding is None:
+        return Response(asset.body, media_type=asset.content_type, headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(asset.encodings[encoding], media_type=asset.content_type, headers=headers)
+
+
+def write_assets(dist_dir: Path = DIST_DIR) -> List[Path]:
+    """
+    ビルドして dist_dir に書き出す（古いビルド結果は削除する）
+
+    Args:
+        dist_dir: 出力先
+
+    Returns:
+        List[Path]: 書き出したファイル
+    """
+    outputs = StaticAssets.build().outputs(source_digests())
+    dist_dir.mkdir(parents=True, exist_ok=True)
+    for path in dist_dir.iterdir():
+        if path.is_file() and path.name not in outputs:
+            path.unlink()
+    written = []
+    for name, content in sorted(outputs.items()):
+        path = dist_dir / name
+        path.write_bytes(content)
+        written.append(path)
+    return written
+
+
+def assets_current(dist_dir: Path = DIST_DIR) -> bool:
+    """ビルド結果が最新か（マニフェストと、圧縮していないファイルが一致するか）"""
+    outputs = StaticAssets.build().outputs(source_digests())
+    for name, content in outputs.items():
+        if name.endswith(tuple(suffix for _, suffix in ENCODING_SUFFIXES)):
+            continue
+        path = dist_dir / name
+        if not path.is_file() or path.read_bytes() != content:
+            return False
+    return True
+
+
+# 読み込み済みのビルド結果（アプリケーション全体で1つ）
+_assets: Optional[StaticAssets] = None
+
+
+def get_static_assets() -> StaticAssets:
+    """ビルド結果を取得する（初回呼び出し時に読み込む）"""
+    global _assets
+    if _assets is None:
+        _assets = StaticAssets.load()
+    return _assets
@@ -0,0 +1,89 @@
+"""
+ビルドスクリプト
+PowerShellテンプレートを事前にコンパイルし、インポート可能なモジュール
+（app/services/precompiled_templates.py）として出力する。
+起動時にテンプレートファイルの読み込みと解析を省略できるため、サーバーレス環境のコールドスタートが短くなる。
+あわせて入力フォームのレンダリングと静的ファイルのハッシュ値付け・事前圧縮を行い、app/static/dist/ に出力する。
+
+使用例:
+    python -m app.build            # モジュール・静的ファイルを再生成
+    python -m app.build --check    # モジュール・静的ファイルが元のファイルと一致しているか確認（不一致なら終了コード 1）
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from app.assets import DIST_DIR, assets_current, write_assets
+from app.services.template_cache import CompiledTemplate
+
+TEMPLATE_DIR = Path(__file__).parent.parent / "templates" / "powershell"
+OUTPUT_PATH = Path(__file__).parent / "services" / "precompiled_templates.py"
+
+HEADER = '''"""
+事前コンパイル済みのPowerShellテンプレート
+このファイルは `python -m app.build` で自動生成される。直接編集しないこと。
+"""
+
+# テンプレート名 → (本文のハッシュ値, リテラルと変数スロットのリスト, (位置, 変数名) のリスト)
+TEMPLATES = {
+'''
+
+
+def render_module(template_dir: Path = TEMPLATE_DIR) -> str:
+    """
+    テンプレートディレクトリ内の全 .ps1 をコンパイルし、モジュールのソースコードを生成する
+
+    Args:
+        template_dir: テンプレートディレクトリ
+
+    Returns:
+        str: モジュールのソースコード
+    """
+    lines: List[str] = [HEADER]
+    for path in sorted(template_dir.glob("*.ps1")):
+        template = CompiledTemplate(path.name, path.read_text(encoding="utf-8"))
+        lines.append(f"    {path.name!r}: (\n")
+        lines.append(f"        {template.digest!r},\n")
+        lines.append("        [\n")
+        for part in template.parts:
+            lines.append(f"            {part!r},\n")
+        lines.append("        ],\n")
+        lines.append(f"        {list(template.slots)!r},\n")
+        lines.append("    ),\n")
+    lines.append("}\n")
+    return "".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="PowerShellテンプレートの事前コンパイルと静的ファイルのビルド")
+    parser.add_argument("--check", action="store_true", help="生成済みモジュールが最新か確認する")
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH, help="出力先")
+    args = parser.parse_args(argv)
+
+    source = render_module()
+    if args.check:
+        current = args.output.read_text(encoding="utf-8") if args.output.exists() else ""
+        exit_code = 0
+        if current != source:
+            print(f"{args.output} が最新ではありません（python -m app.build で再生成してください）", file=sys.stderr)
+            exit_code = 1
+        else:
+            print(f"{args.output} は最新です", file=sys.stderr)
+        if not assets_current():
+            print(f"{DIST_DIR} が最新ではありません（python -m app.build で再生成してください）", file=sys.stderr)
+            exit_code = 1
+        else:
+            print(f"{DIST_DIR} は最新です", file=sys.stderr)
+        return exit_code
+
+    args.output.write_text(source, encoding="utf-8")
+    print(f"{args.output} を生成しました", file=sys.stderr)
+    written = write_assets()
+    print(f"{DIST_DIR} に {len(written)} ファイルを生成しました", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
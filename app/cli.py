@@ -0,0 +1,589 @@
+"""
+コマンドラインインターフェース
+HTTPアプリケーションを経由せずに、大量のHRファイルからPowerShellスクリプトを生成する
+
+使用例:
+    python -m app.cli generate new_hires.csv --output-dir out --split company --workers 8
+    python -m app.cli generate new_hires.csv --output-dir out/2026-03-02 --incremental state/acme.json
+    python -m app.cli golden            # 生成結果をゴールデンファイル（golden/）と比較
+    python -m app.cli golden --update   # ゴールデンファイルを更新
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+from app.services.batch_service import BatchService, RawRow
+from app.services.command_generator import CommandGenerator
+from app.services.judgment_service import JudgmentService
+from app.services.manifest import Manifest, generation_version
+from app.services.upn_registry import UpnRegistry
+
+
+# ワーカーから返す1行分の結果: (行番号, 顧客名, 従業員名, 成功可否, スクリプト or エラー内容)
+RowOutput = Tuple[int, str, str, bool, str]
+
+# ワーカーに渡す1行分の入力: (行番号, 行データ, 割り当て済みのMailNickname)
+AssignedRow = Tuple[int, object, Optional[str]]
+
+# ファイル名に使用できない文字
+_UNSAFE_FILENAME_PATTERN = re.compile(r'[\\/:*?"<>|\s]+')
+
+# 顧客単位の出力で同時に開いておくファイル数の上限（超えた分は最も古いものから閉じ、追記モードで開き直す）
+MAX_OPEN_COMPANY_FILES = 64
+
+# ゴールデンファイル（生成結果の期待値）のディレクトリ
+GOLDEN_DIR = Path(__file__).parent.parent / "golden"
+
+# 出力形式 → ゴールデンファイル名
+GOLDEN_OUTPUTS = {
+    BatchService.OUTPUT_NDJSON: "output.ndjson",
+    BatchService.OUTPUT_PS1: "output.ps1",
+    BatchService.OUTPUT_BUNDLE: "output.bundle.ps1",
+    BatchService.OUTPUT_GRAPH: "output.graph.ps1",
+}
+
+# 実行日によって変わる値（生成日時・契約終了日）
+_TIMESTAMP_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
+_DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def safe_filename(value: str, default: str = "unknown") -> str:
+    """
+    文字列をファイル名として安全な形式に変換する
+
+    Args:
+        value: 元の文字列（顧客名・従業員名など）
+        default: 空になった場合の既定値
+
+    Returns:
+        str: ファイル名
+    """
+    name = _UNSAFE_FILENAME_PATTERN.sub("_", value).strip("._")
+    return name[:100] or default
+
+
+def process_chunk(
+    chunk: List[AssignedRow],
+    employee_dir: Optional[str] = None,
+    layout: Optional[str] = None
+) -> List[RowOutput]:
+    """
+    行のチャンクを処理する（ワーカープロセスで実行）
+
+    Args:
+        chunk: (行番号, 行データ, MailNickname) のリスト
+        employee_dir: 従業員単位で出力する場合の出力先
+            （指定時はワーカー側で書き出し、スクリプト本文はプロセス間で転送しない）
+        layout: バンドル形式のレイアウト（bundle / graph、省略時は行ごとにスクリプト全体を生成）
+
+    Returns:
+        List[RowOutput]: 行ごとの処理結果
+    """
+    outputs: List[RowOutput] = []
+    # 検証はチャンク単位でまとめて行う
+    validated = BatchService.validate_rows([(row_number, row) for row_number, row, _ in chunk])
+    # 判断とコマンド生成もチャンク単位で列指向にまとめて行う
+    results = BatchService.generate_rows(
+        [(row_number, result) for (row_number, _, _), result in zip(chunk, validated)],
+        mail_nicknames=[mail_nickname for _, _, mail_nickname in chunk],
+        layout=layout
+    )
+    for (row_number, row, _), result in zip(chunk, results):
+        company = str(row.get("company") or "") if isinstance(row, dict) else ""
+        employee_name = result.employee_name or ""
+        if result.status != "success":
+            error = result.model_dump_json(exclude_none=True)
+            outputs.append((row_number, company, employee_name, False, error))
+        elif employee_dir is not None:
+            path = write_employee_script(
+                Path(employee_dir), row_number, company, employee_name, result.powershell_command
+            )
+            outputs.append((row_number, company, employee_name, True, str(path)))
+        else:
+            outputs.append((row_number, company, employee_name, True, result.powershell_command))
+    return outputs
+
+
+def write_employee_script(
+    output_dir: Path,
+    row_number: int,
+    company: str,
+    employee_name: str,
+    script: str
+) -> Path:
+    """従業員1人分のスクリプトを <出力先>/<顧客名>/<行番号>_<従業員名>.ps1 に書き出す"""
+    company_dir = output_dir / safe_filename(company)
+    company_dir.mkdir(parents=True, exist_ok=True)
+    path = company_dir / f"{row_number:06d}_{safe_filename(employee_name)}.ps1"
+    # Windows PowerShell 5.1 で文字化けしないようBOM付きUTF-8で出力する
+    with open(path, "w", encoding="utf-8-sig") as f:
+        f.write(script)
+    return path
+
+
+def init_worker(rules_path: Optional[str], domain_map_path: Optional[str]) -> None:
+    """ワーカープロセスの初期化（判断ルール・ドメインマッピング表の読み込み）"""
+    JudgmentService.load_rules(rules_path)
+    CommandGenerator.load_domain_map(domain_map_path)
+
+
+def assign_nicknames(
+    rows: Iterator[RawRow],
+    registry: UpnRegistry,
+    reserved: Dict[int, Tuple[str, str]],
+    preassigned: Optional[Dict[int, str]] = None
+) -> Iterator[AssignedRow]:
+    """
+    MailNicknameをメインプロセスで割り当てる
+
+    ワーカー間で同姓同名の重複が起きないよう、連番の割り当てはメインプロセスで一括して行う
+
+    Args:
+        rows: (行番号, 行データ) のイテレーター
+        registry: MailNicknameの重複管理
+        reserved: 割り当て結果 {行番号: (テナントドメイン, MailNickname)}（失敗行の取り消し用）
+        preassigned: 前回から引き継ぐMailNickname {行番号: MailNickname}（発行済みとして登録済み）
+    """
+    for row_number, row in rows:
+        mail_nickname = None
+        if isinstance(row, dict) and row.get("employee_name") and row.get("company"):
+            if preassigned and row_number in preassigned:
+                mail_nickname = preassigned[row_number]
+            else:
+                tenant_domain = CommandGenerator.resolve_tenant_domain(str(row["company"]))
+                mail_nickname = CommandGenerator.assign_mail_nickname(
+                    str(row["employee_name"]),
+                    tenant_domain,
+                    registry
+                )
+                reserved[row_number] = (tenant_domain, mail_nickname)
+        yield row_number, row, mail_nickname
+
+
+def iter_chunks(rows: Iterator[AssignedRow], chunk_size: int) -> Iterator[List[AssignedRow]]:
+    """行をチャンク単位にまとめる"""
+    chunk: List[AssignedRow] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class OutputWriter:
+    """
+    生成したスクリプトを顧客単位または従業員単位でファイルに書き出す
+
+    バンドル形式（layout 指定時）では、顧客ごとのファイルの先頭に共通関数を1回だけ書き出し、
+    従業員ごとは1行を追記する
+
+    顧客数が多いエクスポートでも開くファイル数の上限（EMFILE）に達しないよう、顧客ごとのファイルは
+    最近使った max_open_files 件だけを開いておき、閉じたファイルには追記モードで開き直して書き出す。
+    ファイル名に変換すると同じになる別の顧客は、顧客名のハッシュ値を付けた別のファイルに書き出す。
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        split: str,
+        layout: Optional[str] = None,
+        max_open_files: int = MAX_OPEN_COMPANY_FILES
+    ):
+        self.output_dir = output_dir
+        self.split = split
+        self.layout = layout
+        self.max_open_files = max(1, max_open_files)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # 顧客名 → 出力ファイルのパス（書き出し済みの全顧客）
+        self._company_paths: Dict[str, Path] = {}
+        self._used_filenames: Set[str] = set()
+        # 顧客名 → 開いているファイル（最近使った順）
+        self._company_files: "OrderedDict[str, TextIO]" = OrderedDict()
+        self._errors: Optional[TextIO] = None
+        self.succeeded = 0
+        self.failed = 0
+
+    def _company_filename(self, company: str) -> str:
+        """顧客ごとに重複しないファイル名（拡張子なし）を決める"""
+        name = safe_filename(company)
+        if name.lower() in self._used_filenames:
+            # 大文字・小文字を区別しないファイルシステムでも衝突しないよう小文字で比較する
+            digest = hashlib.sha1(company.encode("utf-8")).hexdigest()[:8]
+            name = f"{name}_{digest}"
+        self._used_filenames.add(name.lower())
+        return name
+
+    def _company_file(self, company: str) -> TextIO:
+        """顧客ごとのファイルを返す（初回は新規作成してヘッダーを書き出し、以降は追記モードで開き直す）"""
+        f = self._company_files.get(company)
+        if f is not None:
+            self._company_files.move_to_end(company)
+            return f
+
+        if len(self._company_files) >= self.max_open_files:
+            _, oldest = self._company_files.popitem(last=False)
+            oldest.close()
+
+        path = self._company_paths.get(company)
+        if path is None:
+            path = self.output_dir / f"{self._company_filename(company)}.ps1"
+            self._company_paths[company] = path
+            f = open(path, "w", encoding="utf-8-sig")
+            if self.layout is not None:
+                f.write(CommandGenerator.render_bundle_header(self.layout))
+        else:
+            # BOMは作成時に書き出し済みのため、追記はBOMなしのUTF-8で行う
+            f = open(path, "a", encoding="utf-8")
+        self._company_files[company] = f
+        return f
+
+    def write(self, output: RowOutput) -> None:
+        """1行分の結果を書き出す"""
+        row_number, company, employee_name, ok, text = output
+
+        if not ok:
+            if self._errors is None:
+                self._errors = open(self.output_dir / "errors.ndjson", "w", encoding="utf-8")
+            self._errors.write(text + "\n")
+            self.failed += 1
+            return
+
+        # 従業員単位の出力はワーカー側で書き出し済み
+        if self.split == "company":
+            f = self._company_file(company)
+            if self.layout is not None:
+                f.write(f"{text}\n")
+            else:
+                f.write(f"{BatchService.row_header(row_number, employee_name)}\n{text}\n\n")
+        self.succeeded += 1
+
+    def close(self) -> None:
+        """開いているファイルを閉じる（バンドル形式では全顧客のファイルにフッターを書き出す）"""
+        if self.layout is not None:
+            for company in self._company_paths:
+                self._company_file(company).write(CommandGenerator.bundle_footer(self.layout))
+        for f in self._company_files.values():
+            f.close()
+        self._company_files.clear()
+        self._company_paths.clear()
+        self._used_filenames.clear()
+        if self._errors is not None:
+            self._errors.close()
+            self._errors = None
+
+
+def run_generate(args: argparse.Namespace) -> int:
+    """
+    generate サブコマンドを実行する
+
+    Args:
+        args: コマンドライン引数
+
+    Returns:
+        int: 終了コード（エラー行がある場合は 1）
+    """
+    input_path = Path(args.input)
+    input_format = args.format or BatchService.detect_format(input_path.name)
+    with open(input_path, "rb") as stream:
+        BatchService.check_encoding(stream)
+    workers = args.workers or os.cpu_count() or 1
+    layout = None if args.layout == "script" else args.layout
+    if layout is not None and args.split != "company":
+        raise ValueError("--layout bundle / graph は --split company の場合のみ指定できます")
+    writer = OutputWriter(Path(args.output_dir), args.split, layout)
+    employee_dir = args.output_dir if args.split == "employee" else None
+    init_worker(args.rules, args.domain_map)
+    registry = UpnRegistry(args.upn_store)
+    reserved: Dict[int, Tuple[str, str]] = {}
+    started = time.perf_counter()
+
+    # 増分生成: 前回のマニフェストと比較し、新規・変更された行だけを生成する
+    manifest: Optional[Manifest] = None
+    statuses: Dict[int, str] = {}
+    preassigned: Dict[int, str] = {}
+    if args.incremental:
+        manifest = Manifest(args.incremental, generation_version(layout, args.domain_map))
+        if manifest.version_changed:
+            print("[INFO] 判断ルール・テンプレートなどが前回から変更されたため、全件を生成します", file=sys.stderr)
+        with open(input_path, "rb") as stream:
+            statuses, preassigned = manifest.plan(BatchService.iter_rows(stream, input_format), registry)
+
+    def handle(outputs: List[RowOutput]) -> None:
+        for output in outputs:
+            row_number, company, _, ok, _ = output
+            assigned = reserved.pop(row_number, None)
+            if not ok and assigned is not None:
+                registry.release(*assigned)
+            if manifest is not None:
+                if assigned is None and row_number in preassigned:
+                    assigned = (CommandGenerator.resolve_tenant_domain(company), preassigned[row_number])
+                manifest.record(row_number, ok, *(assigned or (None, None)))
+            writer.write(output)
+
+    with open(input_path, "rb") as stream:
+        rows = BatchService.iter_rows(stream, input_format)
+        if manifest is not None:
+            rows = (
+                (row_number, row) for row_number, row in rows
+                if statuses.get(row_number) != Manifest.STATUS_UNCHANGED
+            )
+        rows = assign_nicknames(rows, registry, reserved, preassigned)
+        chunks = iter_chunks(rows, args.chunk_size)
+        try:
+            if workers == 1:
+                for chunk in chunks:
+                    handle(process_chunk(chunk, employee_dir, layout))
+            else:
+                # 入力全体を保持しないよう、実行中のチャンク数を上限付きにする
+                with ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=init_worker,
+                    initargs=(args.rules, args.domain_map)
+                ) as executor:
+                    pending: Deque[Future] = deque()
+                    for chunk in chunks:
+                        pending.append(executor.submit(process_chunk, chunk, employee_dir, layout))
+                        if len(pending) >= workers * 2:
+                            handle(pending.popleft().result())
+                    while pending:
+                        handle(pending.popleft().result())
+        finally:
+            writer.close()
+            registry.close()
+
+    if manifest is not None:
+        removed = manifest.removed()
+        if removed:
+            write_removed(Path(args.output_dir), removed)
+        manifest.save()
+    elapsed = time.perf_counter() - started
+
+    total = writer.succeeded + writer.failed
+    rate = total / elapsed if elapsed > 0 else 0.0
+    summary = {
+        "rows": total,
+        "succeeded": writer.succeeded,
+        "failed": writer.failed,
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(rate, 1),
+    }
+    print(
+        f"[INFO] {total} 行を処理しました（成功: {writer.succeeded}, 失敗: {writer.failed}）"
+        f" {elapsed:.2f}秒, {rate:.1f} 行/秒, ワーカー数: {workers}",
+        file=sys.stderr
+    )
+    if manifest is not None:
+        summary["incremental"] = dict(manifest.counts, removed=len(removed))
+        print(
+            f"[INFO] 増分生成: 新規 {manifest.counts[Manifest.STATUS_NEW]} 件, "
+            f"変更 {manifest.counts[Manifest.STATUS_CHANGED]} 件, "
+            f"変更なし {manifest.counts[Manifest.STATUS_UNCHANGED]} 件（生成を省略）, "
+            f"削除 {len(removed)} 件" + ("（removed.ndjson に出力）" if removed else ""),
+            file=sys.stderr
+        )
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False))
+    return 1 if writer.failed else 0
+
+
+def write_removed(output_dir: Path, removed: List[Dict]) -> Path:
+    """前回の入力にあり今回の入力に無い行を <出力先>/removed.ndjson に書き出す"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / "removed.ndjson"
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in removed:
+            f.write(json.dumps({
+                "company": entry.get("company"),
+                "employee_name": entry.get("employee_name"),
+                "mail_nickname": entry.get("mail_nickname"),
+                "tenant": entry.get("tenant"),
+                "previous_row": entry.get("row"),
+            }, ensure_ascii=False) + "\n")
+    return path
+
+
+def normalize_golden(text: str) -> str:
+    """実行日によって変わる値（生成日時・契約終了日）を固定の文字列に置き換える"""
+    text = _TIMESTAMP_PATTERN.sub("<GENERATED_AT>", text)
+    return _DATE_PATTERN.sub("<DATE>", text)
+
+
+def render_golden(input_path: Path, output_format: str) -> str:
+    """ゴールデンファイルの入力（JSONL）から、指定した出力形式の結果を生成する"""
+    with open(input_path, "rb") as stream:
+        output = b"".join(BatchService.stream(stream, BatchService.FORMAT_JSONL, output_format))
+    return normalize_golden(output.decode("utf-8"))
+
+
+def check_powershell_syntax(path: Path) -> Optional[List[str]]:
+    """
+    PowerShellの構文解析でスクリプトのエラーを確認する（pwsh がインストールされている場合のみ）
+
+    Args:
+        path: スクリプトのパス
+
+    Returns:
+        Optional[List[str]]: 構文エラーの一覧（pwsh が無い場合は None）
+    """
+    pwsh = shutil.which("pwsh") or shutil.which("powershell")
+    if pwsh is None:
+        return None
+    script = (
+        "$errors = $null; "
+        f"[System.Management.Automation.Language.Parser]::ParseFile({CommandGenerator.ps_literal(str(path))}, "
+        "[ref]$null, [ref]$errors) | Out-Null; "
+        "$errors | ForEach-Object { \"$($_.Extent.StartLineNumber): $($_.Message)\" }"
+    )
+    result = subprocess.run(
+        [pwsh, "-NoProfile", "-NonInteractive", "-Command", script],
+        capture_output=True,
+        text=True,
+        encoding="utf-8"
+    )
+    return [line for line in result.stdout.splitlines() if line.strip()]
+
+
+def run_golden(args: argparse.Namespace) -> int:
+    """
+    golden サブコマンドを実行する
+
+    golden/input.jsonl から全出力形式の結果を生成し、ゴールデンファイルと比較する
+    （--update 指定時はゴールデンファイルを更新する）。pwsh があれば .ps1 の構文も確認する
+
+    Args:
+        args: コマンドライン引数
+
+    Returns:
+        int: 終了コード（不一致・構文エラーがある場合は 1）
+    """
+    golden_dir = Path(args.golden_dir)
+    input_path = golden_dir / "input.jsonl"
+    if not input_path.exists():
+        raise FileNotFoundError(f"ゴールデンファイルの入力が見つかりません: {input_path}")
+    # 判断ルール・ドメインマッピングは既定のものを使用する
+    init_worker(None, None)
+
+    failed = 0
+    for output_format, name in GOLDEN_OUTPUTS.items():
+        expected_path = golden_dir / name
+        actual = render_golden(input_path, output_format)
+        if args.update:
+            expected_path.write_text(actual, encoding="utf-8")
+            print(f"[INFO] {expected_path} を更新しました", file=sys.stderr)
+            continue
+
+        expected = expected_path.read_text(encoding="utf-8") if expected_path.exists() else ""
+        if actual != expected:
+            failed += 1
+            diff = difflib.unified_diff(
+                expected.splitlines(keepends=True),
+                actual.splitlines(keepends=True),
+                fromfile=str(expected_path),
+                tofile=f"{name}（今回の生成結果）"
+            )
+            sys.stderr.writelines(list(diff)[:200])
+            print(f"[ERROR] {name}: 期待値と一致しません（python -m app.cli golden --update で更新）", file=sys.stderr)
+            continue
+
+        syntax_errors = check_powershell_syntax(expected_path) if name.endswith(".ps1") else []
+        if syntax_errors:
+            failed += 1
+            for error in syntax_errors:
+                print(f"[ERROR] {name}:{error}", file=sys.stderr)
+            continue
+        checked = "（構文確認なし: pwsh が見つかりません）" if syntax_errors is None else ""
+        print(f"[INFO] {name}: OK{checked}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """コマンドライン引数のパーサーを構築する"""
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli",
+        description="入社処理のPowerShellスクリプトをオフラインで一括生成します"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="HRファイルからスクリプトを生成する")
+    generate.add_argument("input", help="入力ファイル（CSV または JSONL）")
+    generate.add_argument("-o", "--output-dir", default="output", help="出力ディレクトリ（デフォルト: output）")
+    generate.add_argument(
+        "--split",
+        choices=["company", "employee"],
+        default="company",
+        help="出力単位（company: 顧客ごとに1ファイル / employee: 従業員ごとに1ファイル）"
+    )
+    generate.add_argument(
+        "--layout",
+        choices=["script", "bundle", "graph"],
+        default="script",
+        help=(
+            "スクリプトの構成（script: 従業員ごとに処理全体 / bundle: 共通関数1回＋1行1名の呼び出し"
+            " / graph: SKUを1回だけ取得し、作成・ライセンス付与を Graph の $batch で20件ずつ送信）"
+            "。bundle / graph は --split company のみ"
+        )
+    )
+    generate.add_argument(
+        "--bundle",
+        dest="layout",
+        action="store_const",
+        const="bundle",
+        help="--layout bundle と同じ"
+    )
+    generate.add_argument(
+        "--format",
+        choices=[BatchService.FORMAT_CSV, BatchService.FORMAT_JSONL],
+        help="入力形式（省略時は拡張子から判定）"
+    )
+    generate.add_argument("--rules", help="判断ルールファイル（JSON）のパス")
+    generate.add_argument("--domain-map", help="顧客名 → テナントドメインのマッピング表（CSV/SQLite）のパス")
+    generate.add_argument("--upn-store", help="発行済みMailNicknameのSQLiteストアのパス（過去の発行分と重複しないよう連番を付与）")
+    generate.add_argument(
+        "--incremental",
+        metavar="MANIFEST",
+        help=(
+            "増分生成のマニフェスト（JSON）のパス。前回から新規・変更された行だけを生成し、"
+            "削除された行は removed.ndjson に出力する（初回は全件を生成してマニフェストを作成）"
+        )
+    )
+    generate.add_argument("-w", "--workers", type=int, default=0, help="ワーカープロセス数（デフォルト: CPUコア数）")
+    generate.add_argument("--chunk-size", type=int, default=500, help="ワーカーに渡す1チャンクあたりの行数")
+    generate.add_argument("--json", action="store_true", help="処理結果のサマリーをJSONで標準出力に出力する")
+    generate.set_defaults(func=run_generate)
+
+    golden = subparsers.add_parser("golden", help="生成結果をゴールデンファイルと比較する")
+    golden.add_argument("--update", action="store_true", help="ゴールデンファイルを今回の生成結果で更新する")
+    golden.add_argument("--golden-dir", default=str(GOLDEN_DIR), help="ゴールデンファイルのディレクトリ（デフォルト: golden/）")
+    golden.set_defaults(func=run_golden)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """エントリーポイント"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,8 @@
 環境変数から設定を読み込み、アプリケーション全体で使用する
 """
 
+from functools import lru_cache
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
@@ -10,22 +12,92 @@ from pydantic import Field
 class Settings(BaseSettings):
     """アプリケーション設定"""
     
-    # OpenAI API設定
-    openai_api_key: str = Field(..., description="OpenAI APIキー")
+    # OpenAI API設定（現在はテンプレートベースで動作するため未設定でも起動可能）
+    openai_api_key: Optional[str] = Field(default=None, description="OpenAI APIキー")
     openai_model: str = Field(default="gpt-4", description="使用するOpenAIモデル")
+    openai_base_url: Optional[str] = Field(default=None, description="OpenAI APIのベースURL（スタブサーバー等を使う場合）")
+    ai_max_concurrency: int = Field(default=8, ge=1, description="OpenAI APIの同時実行数の上限")
+    ai_timeout: float = Field(default=10.0, gt=0, description="OpenAI API呼び出しのタイムアウト（秒）")
+    ai_max_retries: int = Field(default=3, ge=0, description="一時的なエラー時のリトライ回数")
+    ai_cache_ttl: float = Field(default=3600.0, ge=0, description="応答キャッシュの有効期間（秒）")
+    ai_cache_size: int = Field(default=1024, ge=1, description="応答キャッシュの上限件数")
     
     # アプリケーション設定
     app_name: str = Field(default="BPO業務自動化AIデモシステム")
     app_version: str = Field(default="1.0.0")
     debug: bool = Field(default=False)
     
+    # 判断ルール設定（顧客・部署ごとのルールファイル、未指定時は既定ルールのみ）
+    judgment_rules_path: Optional[str] = Field(default=None, description="判断ルールファイル（JSON）のパス")
+    
+    # テナントドメイン設定（顧客名 → テナントドメインのマッピング表、CSV または SQLite）
+    company_domain_map_path: Optional[str] = Field(default=None, description="ドメインマッピング表のパス")
+    
+    # MailNickname重複管理（発行済みの名前を保存するSQLiteストア、未指定時は一括処理内のみ確認）
+    upn_store_path: Optional[str] = Field(default=None, description="発行済みMailNicknameストアのパス")
+    
+    # 生成履歴（生成したコマンドをリクエスト内容・判断結果とともに保存し、/api/history で検索する）
+    history_store_path: Optional[str] = Field(default=None, description="生成履歴ストア（SQLite）のパス（未指定時は保存しない）")
+    history_flush_size: int = Field(default=500, ge=1, description="まとめて書き込む件数")
+    history_flush_interval: float = Field(default=0.5, gt=0, description="まとめて書き込む間隔（秒）")
+    history_queue_size: int = Field(default=10000, ge=1, description="書き込み待ちの上限件数（超過分は破棄）")
+    
+    # 冪等性（同じリクエストの再送に生成済みのレスポンスを返す）
+    idempotency_enabled: bool = Field(default=True, description="Idempotency-Key による重複排除")
+    idempotency_ttl: float = Field(default=86400.0, gt=0, description="生成済みレスポンスの保持期間（秒）")
+    idempotency_hash_fallback: bool = Field(default=False, description="Idempotency-Key が無い場合に内容のハッシュ値で重複排除するか（同姓同名の別人にも同じ結果を返すため既定では無効）")
+    idempotency_hash_ttl: float = Field(default=10.0, gt=0, description="内容のハッシュ値で重複排除する場合の保持期間（秒）")
+    idempotency_cache_size: int = Field(default=10000, ge=1, description="メモリ上に保持する件数の上限")
+    idempotency_store_path: Optional[str] = Field(default=None, description="再起動後も保持するSQLiteストアのパス（複数ワーカーで共有）")
+    
+    # 流量制御（/api/ 配下への同時実行数・クライアントごとの流量を制限し、超過分は 429 / 503 を返す）
+    admission_enabled: bool = Field(default=True, description="流量制御を行うか")
+    admission_max_in_flight: int = Field(default=32, ge=1, description="同時に処理するリクエスト数の上限")
+    admission_queue_size: int = Field(default=100, ge=0, description="処理待ちの待ち行列の上限件数")
+    admission_queue_timeout: float = Field(default=1.0, gt=0, description="待ち行列で待機する最大時間（秒）")
+    admission_rate_per_client: float = Field(default=20.0, ge=0, description="クライアントごとの1秒あたりのリクエスト数（0で無制限）")
+    admission_burst_per_client: int = Field(default=40, ge=1, description="クライアントごとに連続して受け付ける件数")
+    admission_trust_forwarded: bool = Field(default=False, description="X-Forwarded-For の先頭をクライアントとして扱うか（リバースプロキシ配下の場合）")
+    
+    # レスポンスの圧縮（Accept-Encoding: gzip のクライアントのみ、一括処理のスクリプトなど大きなレスポンス向け）
+    gzip_minimum_size: int = Field(default=4096, ge=0, description="圧縮するレスポンスの最小サイズ（バイト、ストリーミングは常に圧縮）")
+    gzip_compress_level: int = Field(default=6, ge=1, le=9, description="gzipの圧縮レベル")
+    
+    # 非同期ジョブ（大量の一括処理をバックグラウンドで実行し、進捗の確認・成果物のダウンロードを行う）
+    jobs_enabled: bool = Field(default=True, description="非同期ジョブを受け付けるか")
+    jobs_dir: str = Field(default="data/jobs", description="ジョブの状態・入出力ファイルの保存先")
+    job_workers: int = Field(default=2, ge=1, description="同時に実行するジョブ数（ワーカー数）")
+    job_chunk_size: int = Field(default=500, ge=1, description="進捗を保存する単位（行数）")
+    job_ttl: float = Field(default=86400.0, gt=0, description="完了したジョブ・成果物の保持期間（秒）")
+    
     # サーバー設定
     host: str = Field(default="0.0.0.0")
     port: int = Field(default=8000)
     
+    # 本番用のマルチワーカーサーバー（python -m app.server）
+    server_workers: int = Field(default=1, ge=0, description="ワーカープロセス数（0でCPU数）")
+    server_loop: Literal["auto", "uvloop", "asyncio"] = Field(default="auto", description="イベントループ（auto: uvloop があれば使用）")
+    server_http: Literal["auto", "httptools", "h11"] = Field(default="auto", description="HTTPパーサー（auto: httptools があれば使用）")
+    server_preload: bool = Field(default=True, description="fork 前にルール・テンプレートなどを読み込み、ワーカー間で共有するか")
+    server_backlog: int = Field(default=2048, ge=1, description="接続待ちキューの長さ")
+    server_keepalive_timeout: int = Field(default=5, ge=1, description="Keep-Alive 接続を保持する時間（秒）")
+    server_graceful_timeout: float = Field(default=30.0, gt=0, description="停止時に処理中のリクエストの完了を待つ最大時間（秒）")
+    
+    # プロファイリング（/api/ 配下の一部のリクエストと遅いリクエストを記録し、/api/admin/profiles で取得する）
+    profiling_enabled: bool = Field(default=False, description="プロファイリングとリクエストIDの付与を行うか")
+    profiling_sample_rate: float = Field(default=0.01, ge=0, le=1, description="cProfile で計測するリクエストの割合")
+    profiling_slow_threshold: float = Field(default=1.0, ge=0, description="スタックを記録する処理時間の閾値（秒、0で無効）")
+    profiling_sampler_interval: float = Field(default=0.005, gt=0, description="遅いリクエストのスタックを記録する間隔（秒）")
+    profiling_dir: str = Field(default="data/profiles", description="プロファイルの保存先")
+    profiling_max_files: int = Field(default=200, ge=1, description="保存するプロファイルの上限件数（超過分は古いものから削除）")
+    admin_token: Optional[str] = Field(default=None, description="/api/admin/ 配下・/api/history に必要な X-Admin-Token（未設定時は確認しない、HISTORY_STORE_PATH を設定する場合は必須）")
+    
     # ログ設定
     log_level: str = Field(default="INFO")
-    log_format: str = Field(default="json")
+    log_format: str = Field(default="json", description="ログ形式（json / text）")
+    log_queue_size: int = Field(default=10000, ge=1, description="ログキューの上限件数（超過分は破棄）")
+    log_sample_watermark: int = Field(default=1000, ge=0, description="INFOログの間引きを開始するキューの滞留件数")
+    log_sample_rate: float = Field(default=0.1, ge=0, le=1, description="間引き時にINFOログを残す割合")
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -35,6 +107,20 @@ class Settings(BaseSettings):
     )
 
 
-# グローバル設定インスタンス
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    設定を取得する（初回呼び出し時に環境変数・.env から読み込む）
+    
+    Returns:
+        Settings: アプリケーション設定
+    """
+    return Settings()
+
+
+def __getattr__(name: str):
+    """グローバル設定インスタンス（`from app.config import settings` の参照時に読み込む）"""
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
@@ -0,0 +1,241 @@
+"""
+ログ設定モジュール
+ログレコードをキュー経由でバックグラウンドの書き込みスレッドに渡し、
+整形（JSON / テキスト）と個人情報のマスク処理は書き込みスレッド側で行う
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+try:
+    from pythonjsonlogger.json import JsonFormatter as _BaseJsonFormatter
+except ImportError:  # python-json-logger 3.1 未満
+    from pythonjsonlogger.jsonlogger import JsonFormatter as _BaseJsonFormatter
+
+
+# マスク対象の項目（個人情報）
+PII_FIELDS = frozenset({"employee_name", "company", "department"})
+
+# 構造化データを渡すための extra のキー（例: logger.info("入力受信", extra={"data": {...}})）
+DATA_FIELD = "data"
+
+# 処理中のリクエストのID（プロファイリングのミドルウェアが設定し、ログレコードの request_id に出力する）
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+TEXT_FORMAT = "[%(asctime)s] [%(levelname)s] %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 実行中のリスナー（アプリケーション全体で1つ）
+_listener: Optional[QueueListener] = None
+
+# setup_logging に渡された設定（fork した子プロセスで書き込みスレッドを作り直すために保持）
+_settings: Any = None
+
+
+def mask_value(value: Any) -> str:
+    """
+    値をマスクする（先頭1文字のみ残す）
+
+    Args:
+        value: マスクする値
+
+    Returns:
+        str: マスクした値（例: "山田 太郎" → "山***"）
+    """
+    text = str(value or "")
+    return f"{text[:1]}***" if text else ""
+
+
+def mask_pii(data: Any) -> Any:
+    """
+    辞書・リストに含まれる個人情報をマスクした複製を返す（元のデータは変更しない）
+
+    Args:
+        data: ログに出力するデータ
+
+    Returns:
+        Any: マスク済みのデータ
+    """
+    if isinstance(data, dict):
+        return {
+            key: mask_value(value) if key in PII_FIELDS else mask_pii(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, (list, tuple)):
+        return [mask_pii(value) for value in data]
+    return data
+
+
+class JsonLogFormatter(_BaseJsonFormatter):
+    """JSON形式のフォーマッター（個人情報の項目はマスクする）"""
+
+    def __init__(self):
+        super().__init__(
+            "%(asctime)s %(levelname)s %(name)s %(message)s",
+            datefmt=DATE_FORMAT,
+            rename_fields={"asctime": "time", "levelname": "level", "name": "logger"},
+            json_ensure_ascii=False
+        )
+
+    def process_log_record(self, log_record: Dict[str, Any]) -> Dict[str, Any]:
+        return mask_pii(log_record)
+
+
+class TextLogFormatter(logging.Formatter):
+    """
+    テキスト形式のフォーマッター
+
+    extra の data はマスクしたうえでメッセージの後ろにJSONで出力する
+    （例: [YYYY-MM-DD HH:MM:SS] [INFO] 入力受信: {"company": "サ***", ...}）。
+    リクエストIDがある場合はレベルの後ろに出力する（例: [INFO] [req=3f2c...] 入力受信）
+    """
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            record.message = f"[req={request_id}] {record.message}"
+        message = super().formatMessage(record)
+        data = getattr(record, DATA_FIELD, None)
+        if data is not None:
+            message = f"{message}: {json.dumps(mask_pii(data), ensure_ascii=False, default=str)}"
+        return message
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    ログレコードをキューに入れるだけのハンドラー
+
+    標準の QueueHandler は呼び出し側のスレッドでメッセージを整形するが、
+    ここでは整形を書き込みスレッドに任せ、キューが上限件数に達している場合はレコードを破棄する
+    """
+
+    def __init__(self, log_queue: "queue.SimpleQueue[logging.LogRecord]", max_size: int):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 整形（メッセージの組み立て・マスク・JSON化）は書き込みスレッドで行う。
+        # リクエストIDは呼び出し側のコンテキストにしかないため、ここでレコードに付ける（JSONでは request_id の項目になる）
+        request_id = request_id_var.get()
+        if request_id is not None:
+            record.request_id = request_id
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+class InfoSamplingFilter(logging.Filter):
+    """
+    高負荷時に INFO 以下のレコードを間引くフィルター
+
+    キューの滞留件数が watermark 以上の場合のみ、INFO 以下のレコードを
+    sample_rate の割合で残す（WARNING 以上は常に出力する）
+    """
+
+    def __init__(self, log_queue: "queue.SimpleQueue[logging.LogRecord]", watermark: int, sample_rate: float):
+        super().__init__()
+        self.queue = log_queue
+        self.watermark = watermark
+        self.sample_rate = sample_rate
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or self.queue.qsize() < self.watermark:
+            return True
+        if random.random() < self.sample_rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+def create_formatter(log_format: str) -> logging.Formatter:
+    """
+    ログ形式に応じたフォーマッターを作成する
+
+    Args:
+        log_format: "json" または "text"
+
+    Returns:
+        logging.Formatter: フォーマッター
+    """
+    if log_format.lower() == "json":
+        return JsonLogFormatter()
+    return TextLogFormatter()
+
+
+def setup_logging(settings) -> QueueListener:
+    """
+    ルートロガーにキュー経由の非同期ログ出力を設定する
+
+    Args:
+        settings: アプリケーション設定（log_level, log_format, log_queue_size など）
+
+    Returns:
+        QueueListener: 書き込みスレッド（終了時に自動で停止する）
+    """
+    global _listener, _settings
+    if _listener is not None:
+        return _listener
+
+    # 呼び出し側で不要な情報の収集を省略する（出力形式で使用しないため）
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    # 呼び出し元（ファイル名・行番号）の探索を省略する（logging HOWTO の最適化手順）
+    logging._srcfile = None
+
+    # 上限件数は NonBlockingQueueHandler 側で判定する（SimpleQueue の put はロック不要で高速）
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(create_formatter(settings.log_format))
+
+    queue_handler = NonBlockingQueueHandler(log_queue, settings.log_queue_size)
+    queue_handler.addFilter(InfoSamplingFilter(log_queue, settings.log_sample_watermark, settings.log_sample_rate))
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, settings.log_level.upper()))
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    if _settings is None and hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_restart_after_fork)
+    _settings = settings
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def _restart_after_fork() -> None:
+    """fork した子プロセスで書き込みスレッドを作り直す（親プロセスのスレッドは子プロセスに引き継がれない）"""
+    global _listener
+    if _listener is None:
+        return
+    _listener = None
+    setup_logging(_settings)
+
+
+def shutdown_logging() -> None:
+    """キューに残っているレコードを書き出して書き込みスレッドを停止する"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
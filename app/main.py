@@ -1,99 +1,340 @@
 """
 FastAPIアプリケーション
 BPO向け業務自動化AIデモシステムのメインアプリケーション
+
+サーバーレス環境のコールドスタートを短くするため、インポート時には設定の読み込み・ロガーの設定・
+サービスの読み込みを行わない。設定・ミドルウェア・サービスは最初のリクエスト（または lifespan）の処理時に
+キャッシュ付きの get_ 関数で作成し、サービスのモジュールもその時点でインポートする。
 """
 
+import hmac
 import logging
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
+from datetime import datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Literal, Optional
+from fastapi import Depends, FastAPI, Header, Request, HTTPException, UploadFile, File, Query
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
+from starlette.concurrency import run_in_threadpool
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.types import ASGIApp
 
-from app.config import settings
-from app.models import OnboardingRequest, OnboardingResponse, ErrorResponse
-from app.services.judgment_service import JudgmentService
-from app.services.command_generator import CommandGenerator
-
-# ロガーの設定
-logging.basicConfig(
-    level=getattr(logging, settings.log_level.upper()),
-    format='[%(asctime)s] [%(levelname)s] %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
+from app.models import (
+    HistoryEntry, HistoryPage, JobResponse, OnboardingRequest, OnboardingResponse, ErrorResponse, ProfileEntry,
+    ValidationReport
 )
+
+if TYPE_CHECKING:
+    from app.admission import AdmissionController
+    from app.config import Settings
+    from app.profiling import RequestProfiler
+    from app.services.history_store import HistoryStore
+    from app.services.job_queue import JobQueue
+
+# ロガー（出力先は初回の get_app_settings で設定する）
 logger = logging.getLogger(__name__)
 
 
+# 読み込み済みの状態（ルール・マッピング表・テンプレートなど、プロセス間で共有できるもの）
+_preloaded = False
+
+# リクエストを受け付ける準備ができているか（/ready で公開）
+_ready = False
+
+
+@lru_cache(maxsize=1)
+def get_app_settings() -> "Settings":
+    """
+    設定を読み込み、ロガーを設定する（初回の呼び出し時に1回だけ）
+
+    Returns:
+        Settings: アプリケーション設定
+    """
+    from app.config import get_settings
+    from app.logging_config import setup_logging
+
+    settings = get_settings()
+    # ロガーの設定（キュー経由で書き込みスレッドに出力、個人情報はマスク）
+    setup_logging(settings)
+    return settings
+
+
+@lru_cache(maxsize=1)
+def get_admission_controller() -> Optional["AdmissionController"]:
+    """
+    流量制御を取得する（初回の呼び出し時に作成する）
+
+    Returns:
+        Optional[AdmissionController]: 流量制御（無効な場合は None）
+    """
+    settings = get_app_settings()
+    if not settings.admission_enabled:
+        return None
+    from app.admission import AdmissionController
+    from app.metrics import register_admission_gauges
+
+    controller = AdmissionController.from_settings(settings)
+    register_admission_gauges(controller)
+    return controller
+
+
+@lru_cache(maxsize=1)
+def get_request_profiler() -> Optional["RequestProfiler"]:
+    """
+    プロファイリングの設定を取得する（初回の呼び出し時に作成する）
+
+    Returns:
+        Optional[RequestProfiler]: プロファイリングの設定（無効な場合は None）
+    """
+    settings = get_app_settings()
+    if not settings.profiling_enabled:
+        return None
+    from app.profiling import RequestProfiler
+
+    return RequestProfiler.from_settings(settings)
+
+
+def configure_middleware(app: FastAPI, settings: "Settings") -> None:
+    """
+    設定に応じたミドルウェアを追加する（内側から順に追加する）
+
+    Args:
+        app: FastAPIアプリケーション
+        settings: アプリケーション設定
+    """
+    from fastapi.middleware.gzip import GZipMiddleware
+    from app.metrics import MetricsMiddleware
+
+    # 流量制御（/api/ 配下のみ、拒否したリクエストも処理時間の計測対象にするため計測より内側に置く）
+    admission_controller = get_admission_controller()
+    if admission_controller is not None:
+        from app.admission import AdmissionMiddleware
+        app.add_middleware(
+            AdmissionMiddleware,
+            controller=admission_controller,
+            paths=("/api/",),
+            trust_forwarded=settings.admission_trust_forwarded
+        )
+
+    # 大きなレスポンス（一括処理のスクリプトなど）の圧縮
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.gzip_minimum_size,
+        compresslevel=settings.gzip_compress_level
+    )
+
+    # 処理時間の計測（/metrics で公開）
+    app.add_middleware(MetricsMiddleware)
+
+    # リクエストIDの付与・プロファイリング（リクエストIDを全てのログに出力するため最も外側に置く）
+    request_profiler = get_request_profiler()
+    if request_profiler is not None:
+        from app.profiling import ProfilingMiddleware
+        app.add_middleware(
+            ProfilingMiddleware, profiler=request_profiler, paths=("/api/",), excluded_paths=("/api/admin/",)
+        )
+
+
+class OnboardingApp(FastAPI):
+    """設定の読み込みとミドルウェアの追加を、最初のリクエスト（または lifespan）の処理時に行う FastAPI アプリケーション"""
+
+    def build_middleware_stack(self) -> ASGIApp:
+        if not self.user_middleware:
+            settings = get_app_settings()
+            self.title = settings.app_name
+            self.version = settings.app_version
+            self.debug = settings.debug
+            configure_middleware(self, settings)
+        return super().build_middleware_stack()
+
+
+def preload() -> None:
+    """
+    ルール・マッピング表・テンプレート・読み仮名辞書などを読み込み、1件生成して初回のみの処理を済ませる
+
+    python -m app.server では fork 前にマスタープロセスで1回だけ呼び出し、ワーカー間で共有する
+    （スレッド・SQLite接続などプロセスごとに必要なものは lifespan で作成する）。
+    2回目以降の呼び出しでは何もしない。
+    """
+    global _preloaded
+    if _preloaded:
+        return
+    from app.assets import get_static_assets
+    from app.services.command_generator import CommandGenerator
+    from app.services.judgment_service import JudgmentService
+    from app.services.upn_registry import UpnRegistry
+
+    settings = get_app_settings()
+    # 判断ルールを読み込んでインデックスを構築
+    rule_engine = JudgmentService.load_rules(settings.judgment_rules_path)
+    logger.info(f"判断ルール: version={rule_engine.version}")
+    # 顧客名 → テナントドメインのマッピング表を読み込む
+    domain_resolver = CommandGenerator.load_domain_map(settings.company_domain_map_path)
+    logger.info(f"ドメインマッピング: {len(domain_resolver)} 件")
+    # PowerShellテンプレートを事前にコンパイルしてキャッシュ
+    CommandGenerator.preload_templates()
+    # 読み仮名辞書・ビルド済みの入力フォーム・静的ファイルを読み込み、1件生成して初回のみの処理を済ませる（発行済みストアには記録しない）
+    CommandGenerator.get_romanizer()
+    get_static_assets()
+    warmup_request = {
+        "company": "株式会社サンプル",
+        "task_type": "onboarding",
+        "employee_name": "山田 太郎",
+        "employment_type": "正社員",
+        "department": "営業部",
+    }
+    CommandGenerator.generate_command(
+        warmup_request,
+        judgment=JudgmentService.judge(warmup_request),
+        registry=UpnRegistry()
+    )
+    _preloaded = True
+
+
+def set_ready(ready: bool) -> None:
+    """準備完了の状態を設定する（停止処理の開始時に False にしてロードバランサーの振り分け対象から外す）"""
+    global _ready
+    _ready = ready
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """アプリケーションのライフサイクル管理"""
+    from app.metrics import register_job_gauges
+    from app.services.ai_service import close_ai_service
+    from app.services.command_generator import CommandGenerator
+    from app.services.history_store import close_history_store, configure_history_store
+    from app.services.idempotency_store import close_idempotency_store
+    from app.services.job_queue import close_job_queue, start_job_queue
+
+    settings = get_app_settings()
     # 起動時の処理
     logger.info(f"{settings.app_name} v{settings.app_version} を起動しました")
     logger.info(f"ログレベル: {settings.log_level}")
     logger.info(f"OpenAIモデル: {settings.openai_model}")
+    # ルール・テンプレートなどの読み込み（マルチワーカーサーバーでは fork 前に読み込み済み）
+    preload()
+    # 発行済みMailNicknameのストアを開く
+    CommandGenerator.configure_upn_registry(settings.upn_store_path)
+    # 生成履歴のストアを開く（書き込みスレッドを起動）
+    # 履歴には従業員名・リクエスト内容・生成したスクリプトが含まれるため、管理用トークンを必須とする
+    if settings.history_store_path and not settings.admin_token:
+        raise ValueError("HISTORY_STORE_PATH を設定する場合は ADMIN_TOKEN も設定してください（/api/history の認証に使用）")
+    configure_history_store(settings)
+    # 非同期ジョブのワーカーを起動（未完了のジョブは続きから再開）
+    if settings.jobs_enabled:
+        job_queue = await start_job_queue(settings)
+        if job_queue is not None:
+            register_job_gauges(job_queue)
+    set_ready(True)
     yield
-    # 終了時の処理
+    # 終了時の処理（実行中のジョブは処理中のチャンクを書き終えてから停止）
+    set_ready(False)
+    await close_job_queue()
+    CommandGenerator.configure_upn_registry(None)
+    # 書き込み待ちの生成履歴を書き込んでから閉じる
+    close_history_store()
+    # OpenAI APIクライアントのコネクションプールを解放
+    await close_ai_service()
+    close_idempotency_store()
+    request_profiler = get_request_profiler()
+    if request_profiler is not None:
+        request_profiler.close()
     logger.info(f"{settings.app_name} を終了しました")
 
 
-# FastAPIアプリケーションの初期化
-app = FastAPI(
-    title=settings.app_name,
-    version=settings.app_version,
-    debug=settings.debug,
+# FastAPIアプリケーションの初期化（タイトル・バージョン・ミドルウェアは最初のリクエストの処理時に設定から反映する）
+app = OnboardingApp(
     description="BPO向け業務自動化AIデモシステム - 入社処理のPowerShellコマンド生成",
     lifespan=lifespan
 )
 
-# テンプレートと静的ファイルの設定
-templates = Jinja2Templates(directory="app/templates")
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-
 
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     """HTTP例外のハンドラー"""
     logger.error(f"HTTPエラー {exc.status_code}: {exc.detail}")
-    return {
-        "status": "error",
-        "message": exc.detail,
-        "status_code": exc.status_code
-    }
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "status": "error",
+            "message": exc.detail,
+            "status_code": exc.status_code
+        },
+        headers=getattr(exc, "headers", None)
+    )
 
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """バリデーション例外のハンドラー"""
-    logger.error(f"バリデーションエラー: {exc.errors()}")
-    return {
-        "status": "error",
-        "message": "入力値の検証に失敗しました",
-        "details": exc.errors()
-    }
+    from app.metrics import ERRORS_TOTAL
+
+    ERRORS_TOTAL.inc(request.url.path, "RequestValidationError")
+    # 入力値（個人情報を含む）は出力せず、項目とエラー内容のみ記録する
+    logger.error(
+        "バリデーションエラー",
+        extra={"data": [{"loc": error.get("loc"), "msg": error.get("msg")} for error in exc.errors()]}
+    )
+    return JSONResponse(
+        status_code=422,
+        content={
+            "status": "error",
+            "message": "入力値の検証に失敗しました",
+            "details": jsonable_encoder(exc.errors())
+        }
+    )
 
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """一般的な例外のハンドラー"""
     logger.exception(f"予期しないエラーが発生しました: {str(exc)}")
-    return {
-        "status": "error",
-        "message": "サーバー内部エラーが発生しました"
-    }
+    return JSONResponse(
+        status_code=500,
+        content={
+            "status": "error",
+            "message": "サーバー内部エラーが発生しました"
+        }
+    )
 
 
-@app.get("/", response_class=HTMLResponse)
+@app.api_route("/", methods=["GET", "HEAD"], response_class=HTMLResponse)
 async def root(request: Request):
-    """ルートエンドポイント（入力フォーム）"""
+    """ルートエンドポイント（入力フォーム、ビルド時にレンダリング済みのページを返す）"""
+    from app.assets import asset_response, get_static_assets
+
     logger.info("ルートエンドポイントにアクセス")
-    return templates.TemplateResponse("index.html", {"request": request})
+    return asset_response(
+        get_static_assets().pages["index.html"],
+        request.headers.get("accept-encoding", ""),
+        request.headers.get("if-none-match")
+    )
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def static_file(path: str, request: Request):
+    """
+    静的ファイル（ハッシュ値付きの /static/dist/ 以下は長期間キャッシュ、事前圧縮した本文を返す）
+    
+    Args:
+        path: /static/ 以下のパス
+    """
+    from app.assets import asset_response, get_static_assets
+
+    asset = get_static_assets().files.get(path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return asset_response(asset, request.headers.get("accept-encoding", ""), request.headers.get("if-none-match"))
 
 
 @app.get("/health")
 async def health_check():
     """ヘルスチェックエンドポイント"""
+    settings = get_app_settings()
     return {
         "status": "ok",
         "app_name": settings.app_name,
@@ -101,24 +342,92 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    レディネスチェックエンドポイント
+    
+    起動時の読み込み・ウォームアップが完了するまでと、停止処理の開始後は 503 を返す
+    （ロードバランサーの振り分け判定用、プロセスの死活監視には /health を使う）
+    """
+    if not _ready:
+        return JSONResponse(status_code=503, content={"status": "not_ready"})
+    return {"status": "ready"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """メトリクスエンドポイント（Prometheusのテキスト形式）"""
+    from app.metrics import REGISTRY
+
+    return PlainTextResponse(REGISTRY.render(), media_type=REGISTRY.CONTENT_TYPE)
+
+
 @app.post("/api/onboarding", response_model=OnboardingResponse)
-async def create_onboarding(request: OnboardingRequest):
+async def create_onboarding(
+    request: OnboardingRequest,
+    http_request: Request
+):
     """
     入社処理のPowerShellコマンドを生成するエンドポイント
     
+    同じリクエストの再送（Idempotency-Key が同じ、または有効にした場合はキーが無く内容が同じ）には、
+    再計算せずに生成済みのレスポンスを返す（Idempotent-Replayed: true ヘッダー付き）
+    
     Args:
         request: 入社処理リクエスト
+        http_request: HTTPリクエスト（処理時間の計測、Idempotency-Key ヘッダーの取得用）
         
     Returns:
         OnboardingResponse: 判断結果とPowerShellコマンド
     """
+    from app.metrics import ERRORS_TOTAL, GENERATED_TOTAL, IDEMPOTENCY_TOTAL, STAGE_SECONDS
+    from app.services.command_generator import CommandGenerator
+    from app.services.history_store import get_history_store
+    from app.services.idempotency_store import (
+        IDEMPOTENCY_KEY_MAX_LENGTH, IdempotencyConflictError, IdempotencyStore, get_idempotency_store,
+        request_fingerprint
+    )
+    from app.services.judgment_service import JudgmentService
+
+    started = time.perf_counter()
+    settings = get_app_settings()
+    # 本文の受信・検証にかかった時間（ミドルウェアで記録した開始時刻から）
+    request_started = http_request.scope.get("state", {}).get("request_started")
+    if request_started is not None:
+        STAGE_SECONDS.observe(started - request_started, "onboarding", "validation")
+    # Header() 引数による解決はリクエストごとの負荷が大きいため、ヘッダーを直接参照する
+    idempotency_key = http_request.headers.get("idempotency-key")
+    if idempotency_key is not None and len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Idempotency-Key は{IDEMPOTENCY_KEY_MAX_LENGTH}文字以内で指定してください"
+        )
     try:
-        # リクエストデータをログ出力
+        # リクエストデータをログ出力（個人情報は書き込みスレッドでマスク）
         request_dict = request.model_dump()
-        logger.info(f"入力受信: {request_dict}")
+        logger.info("入力受信", extra={"data": request_dict})
+        
+        # 再送されたリクエストには生成済みのレスポンスを返す
+        store_key = fingerprint = None
+        if settings.idempotency_enabled:
+            fingerprint = request_fingerprint(request_dict)
+            store_key = IdempotencyStore.make_key(idempotency_key, fingerprint, settings.idempotency_hash_fallback)
+        if store_key is not None:
+            stored = await get_idempotency_store().get_async(store_key, fingerprint)
+            if stored is not None:
+                IDEMPOTENCY_TOTAL.inc("replayed")
+                logger.info("生成済みのレスポンスを返します（重複リクエスト）")
+                return Response(
+                    content=stored,
+                    media_type="application/json",
+                    headers={"Idempotent-Replayed": "true"}
+                )
         
         # AI判断ロジックの実行（雇用形態から自動判断）
+        judge_started = time.perf_counter()
         judgment = JudgmentService.judge(request_dict)
+        STAGE_SECONDS.observe(time.perf_counter() - judge_started, "onboarding", "judge")
         logger.info(
             f"AI判断結果: {judgment.employment_type} -> "
             f"{judgment.user_type} + {judgment.license_type} (SKU: {judgment.license_sku})"
@@ -130,29 +439,363 @@ async def create_onboarding(request: OnboardingRequest):
         # PowerShellコマンドを生成（Entra ID用、AI判断結果に基づく）
         # 注意: ライセンス種別はAI判断結果から自動取得
         # 常に create_entra_user_with_license.ps1 を使用
+        generate_started = time.perf_counter()
         powershell_command = CommandGenerator.generate_command(
             request_dict,
             judgment=judgment
         )
+        STAGE_SECONDS.observe(time.perf_counter() - generate_started, "onboarding", "generate")
+        GENERATED_TOTAL.inc("onboarding", judgment.employment_type, judgment.license_sku)
+        # 生成履歴に記録（書き込みはバックグラウンドで行う）
+        history_store = get_history_store()
+        if history_store is not None:
+            history_store.record("onboarding", request_dict, judgment, powershell_command)
         
         logger.info(f"PowerShell生成完了 (License: {judgment.license_type}, SKU: {judgment.license_sku})")
         
-        return OnboardingResponse(
+        response = OnboardingResponse(
             status="success",
             judgment=judgment_text,
             powershell_command=powershell_command
         )
+        if store_key is not None:
+            # 同時に届いた重複リクエストが先に保存した場合は、そちらのレスポンスを返す
+            content = await get_idempotency_store().put_async(
+                store_key,
+                fingerprint,
+                response.model_dump_json(),
+                ttl=None if idempotency_key else settings.idempotency_hash_ttl
+            )
+            IDEMPOTENCY_TOTAL.inc("stored")
+            STAGE_SECONDS.observe(time.perf_counter() - started, "onboarding", "total")
+            return Response(content=content, media_type="application/json")
+        
+        STAGE_SECONDS.observe(time.perf_counter() - started, "onboarding", "total")
+        return response
         
+    except IdempotencyConflictError as e:
+        IDEMPOTENCY_TOTAL.inc("conflict")
+        logger.error(f"冪等性キーの競合: {str(e)}")
+        raise HTTPException(status_code=422, detail=str(e))
     except ValueError as e:
+        ERRORS_TOTAL.inc("onboarding", type(e).__name__)
         logger.error(f"バリデーションエラー: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        ERRORS_TOTAL.inc("onboarding", type(e).__name__)
         logger.exception(f"予期しないエラー: {str(e)}")
         raise HTTPException(status_code=500, detail="サーバー内部エラーが発生しました")
 
 
+@app.post("/api/onboarding/batch")
+async def create_onboarding_batch(
+    file: UploadFile = File(..., description="HRエクスポート（CSV または JSONL）"),
+    output_format: Literal["ndjson", "ps1", "bundle", "graph"] = Query(
+        "ndjson",
+        alias="format",
+        description=(
+            "出力形式（ndjson: 1行1結果 / ps1: 連結スクリプト / bundle: 共通関数1回＋1行1名のスクリプト"
+            " / graph: Graph の $batch でまとめて送信するスクリプト）"
+        )
+    )
+):
+    """
+    HRエクスポートから入社処理のPowerShellコマンドを一括生成するエンドポイント
+    
+    入力は1行ずつ読み込み、結果は生成した順にストリーミングで返す。
+    行ごとのエラーは結果に含め、一括処理全体は中断しない。
+    
+    Args:
+        file: アップロードされたCSV/JSONLファイル
+        output_format: 出力形式
+        
+    Returns:
+        StreamingResponse: NDJSON、連結された .ps1、またはバンドル形式の .ps1
+    """
+    from app.services.batch_service import BatchService
+
+    try:
+        input_format = BatchService.detect_format(file.filename, file.content_type)
+        BatchService.check_encoding(file.file)
+    except ValueError as e:
+        logger.error(f"バリデーションエラー: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(f"一括処理受信: format={input_format}, output={output_format}")
+    
+    if output_format in (BatchService.OUTPUT_PS1, BatchService.OUTPUT_BUNDLE, BatchService.OUTPUT_GRAPH):
+        media_type = "text/plain; charset=utf-8"
+        headers = {"Content-Disposition": 'attachment; filename="onboarding_batch.ps1"'}
+    else:
+        media_type = "application/x-ndjson"
+        headers = {}
+    
+    return StreamingResponse(
+        BatchService.stream(file.file, input_format, output_format),
+        media_type=media_type,
+        headers=headers
+    )
+
+
+@app.post("/api/onboarding/validate", response_model=ValidationReport)
+async def validate_onboarding_batch(
+    file: UploadFile = File(..., description="HRエクスポート（CSV または JSONL）")
+):
+    """
+    HRエクスポートを検証するエンドポイント（コマンドは生成しない）
+    
+    行をまとめて検証し、エラーのある行を行番号・項目・理由の一覧で返す。
+    一括生成の前に入力ファイルを確認する用途を想定している。
+    
+    Args:
+        file: アップロードされたCSV/JSONLファイル
+        
+    Returns:
+        ValidationReport: 行数とエラーの一覧
+    """
+    from app.services.batch_service import BatchService
+
+    try:
+        input_format = BatchService.detect_format(file.filename, file.content_type)
+        BatchService.check_encoding(file.file)
+    except ValueError as e:
+        logger.error(f"バリデーションエラー: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    report = await run_in_threadpool(
+        lambda: BatchService.validation_report(BatchService.iter_rows(file.file, input_format))
+    )
+    logger.info(f"一括検証: rows={report.total}, invalid={report.invalid}")
+    return report
+
+
+def require_job_queue() -> "JobQueue":
+    """起動済みのジョブキューを取得する（無効な場合は 503）"""
+    from app.services.job_queue import get_job_queue
+
+    job_queue = get_job_queue()
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="非同期ジョブは無効です")
+    return job_queue
+
+
+@app.post("/api/jobs", response_model=JobResponse, status_code=202)
+async def create_job(
+    file: UploadFile = File(..., description="HRエクスポート（CSV または JSONL）"),
+    output_format: Literal["ndjson", "ps1", "bundle", "graph"] = Query(
+        "ndjson",
+        alias="format",
+        description="成果物の出力形式（/api/onboarding/batch と同じ）"
+    )
+):
+    """
+    一括処理をジョブとして登録するエンドポイント
+    
+    入力ファイルを保存してすぐにジョブIDを返し、判断・コマンド生成はバックグラウンドで行う。
+    進捗は GET /api/jobs/{job_id}、成果物は GET /api/jobs/{job_id}/artifact で取得する。
+    
+    Args:
+        file: アップロードされたCSV/JSONLファイル
+        output_format: 成果物の出力形式
+        
+    Returns:
+        JobResponse: 登録したジョブ（202 Accepted、Location ヘッダーに状態のURL）
+    """
+    from app.services.batch_service import BatchService
+    from app.services.job_queue import JobQueue
+
+    job_queue = require_job_queue()
+    try:
+        input_format = BatchService.detect_format(file.filename, file.content_type)
+        BatchService.check_encoding(file.file)
+    except ValueError as e:
+        logger.error(f"バリデーションエラー: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    job = JobQueue.to_response(await job_queue.submit(file.file, file.filename, input_format, output_format))
+    return JSONResponse(
+        status_code=202,
+        content=job.model_dump(),
+        headers={"Location": job.status_url}
+    )
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    ジョブの状態・進捗を取得するエンドポイント
+    
+    Args:
+        job_id: ジョブID
+        
+    Returns:
+        JobResponse: ジョブの状態・進捗（完了時は成果物のURLを含む）
+    """
+    from app.services.job_queue import JobNotFoundError, JobQueue
+
+    try:
+        return JobQueue.to_response(require_job_queue().get(job_id))
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/api/jobs/{job_id}/artifact")
+async def get_job_artifact(job_id: str):
+    """
+    完了したジョブの成果物をダウンロードするエンドポイント
+    
+    Args:
+        job_id: ジョブID
+        
+    Returns:
+        FileResponse: NDJSON または .ps1（未完了の場合は 409）
+    """
+    from app.services.job_queue import JobNotFoundError, JobNotReadyError
+
+    job_queue = require_job_queue()
+    try:
+        path = job_queue.artifact_path(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except JobNotReadyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if path.suffix == ".ndjson":
+        media_type = "application/x-ndjson"
+    else:
+        media_type = "text/plain; charset=utf-8"
+    return FileResponse(path, media_type=media_type, filename=path.name)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None, description="ADMIN_TOKEN に設定した値")) -> None:
+    """管理用エンドポイントの認証（ADMIN_TOKEN が設定されている場合のみ X-Admin-Token を確認する）"""
+    settings = get_app_settings()
+    if settings.admin_token is None:
+        return
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode("utf-8"), settings.admin_token.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="X-Admin-Token が正しくありません")
+
+
+def require_history_store() -> "HistoryStore":
+    """生成履歴ストアを取得する（未設定の場合は 503）"""
+    from app.services.history_store import get_history_store
+
+    history_store = get_history_store()
+    if history_store is None:
+        raise HTTPException(status_code=503, detail="生成履歴は無効です（HISTORY_STORE_PATH を設定してください）")
+    return history_store
+
+
+@app.get(
+    "/api/history",
+    response_model=HistoryPage,
+    response_model_exclude_none=True,
+    dependencies=[Depends(require_admin)]
+)
+async def search_history(
+    company: Optional[str] = Query(None, description="顧客名（完全一致）"),
+    employee_name: Optional[str] = Query(None, description="従業員名（前方一致）"),
+    employment_type: Optional[Literal["正社員", "派遣"]] = Query(None, description="雇用形態"),
+    since: Optional[datetime] = Query(None, description="この日時以降（例: 2026-03-01）"),
+    until: Optional[datetime] = Query(None, description="この日時より前（例: 2026-04-01）"),
+    limit: int = Query(50, ge=1, le=500, description="1ページの件数"),
+    cursor: Optional[str] = Query(None, description="前のページの next_cursor")
+):
+    """
+    生成履歴を新しい順に検索するエンドポイント
+    
+    次のページは、レスポンスの next_cursor を cursor に指定して取得する（キーセットページネーション）
+    
+    Returns:
+        HistoryPage: 生成履歴（スクリプト本文を除く）と次のページのカーソル
+    """
+    from app.services.history_store import HistoryStore
+
+    history_store = require_history_store()
+    position = None
+    if cursor is not None:
+        try:
+            position = HistoryStore.parse_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="cursor が不正です")
+    
+    entries = history_store.search(
+        company=company,
+        employee_name=employee_name,
+        employment_type=employment_type,
+        since=since,
+        until=until,
+        cursor=position,
+        limit=limit
+    )
+    next_cursor = HistoryStore.make_cursor(entries[-1]) if len(entries) == limit else None
+    return HistoryPage(items=[HistoryStore.to_entry(entry) for entry in entries], next_cursor=next_cursor)
+
+
+@app.get("/api/history/{history_id}", response_model=HistoryEntry, dependencies=[Depends(require_admin)])
+async def get_history(history_id: int):
+    """
+    生成履歴を1件取得するエンドポイント（リクエスト内容・生成したスクリプトを含む）
+    
+    Args:
+        history_id: 生成履歴のID
+        
+    Returns:
+        HistoryEntry: 生成履歴
+    """
+    from app.services.history_store import HistoryStore
+
+    entry = require_history_store().get(history_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"生成履歴が見つかりません: {history_id}")
+    return HistoryStore.to_entry(entry)
+
+
+def require_profiler() -> "RequestProfiler":
+    """プロファイリングの設定を取得する（無効な場合は 503）"""
+    request_profiler = get_request_profiler()
+    if request_profiler is None:
+        raise HTTPException(status_code=503, detail="プロファイリングは無効です（PROFILING_ENABLED=true を設定してください）")
+    return request_profiler
+
+
+@app.get("/api/admin/profiles", response_model=List[ProfileEntry], dependencies=[Depends(require_admin)])
+async def list_profiles(limit: int = Query(100, ge=1, le=1000, description="取得する件数")):
+    """
+    保存済みのプロファイルを新しい順に取得するエンドポイント
+    
+    Returns:
+        List[ProfileEntry]: プロファイルの一覧（このワーカーと同じ保存先に書き込んだ全ワーカーの分）
+    """
+    profiler = require_profiler()
+    return await run_in_threadpool(profiler.list_profiles, limit)
+
+
+@app.get("/api/admin/profiles/{name}", dependencies=[Depends(require_admin)])
+async def download_profile(name: str):
+    """
+    プロファイルをダウンロードするエンドポイント
+    
+    Args:
+        name: ファイル名（一覧の name）
+        
+    Returns:
+        FileResponse: pstats 形式（.prof、python -m pstats・snakeviz で表示）または
+        collapsed stack 形式（.collapsed、flamegraph.pl・speedscope で表示）
+    """
+    path = require_profiler().profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"プロファイルが見つかりません: {name}")
+    if path.suffix == ".prof":
+        media_type = "application/octet-stream"
+    else:
+        media_type = "text/plain; charset=utf-8"
+    return FileResponse(path, media_type=media_type, filename=path.name)
+
+
 if __name__ == "__main__":
     import uvicorn
+    settings = get_app_settings()
     uvicorn.run(
         "app.main:app",
         host=settings.host,
@@ -0,0 +1,386 @@
+"""
+メトリクス収集モジュール
+処理段階ごとの所要時間（ヒストグラム）と件数（カウンター）をメモリ上に集計し、
+Prometheus のテキスト形式（/metrics）で出力する
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# 所要時間のバケット（秒）: 0.1ms 〜 5秒（APIレスポンス時間の要件）
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape_label(value: str) -> str:
+    """ラベル値をPrometheusのテキスト形式用にエスケープする"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """ラベルを {name="value",...} 形式に整形する"""
+    pairs = [f'{name}="{_escape_label(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """数値を整形する（整数値は小数点を付けない）"""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """単調増加するカウンター（ラベルの組み合わせごとに集計）"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """
+        カウンターを加算する
+
+        Args:
+            *labels: ラベル値（labelnames の順）
+            amount: 加算する値
+        """
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        """現在の値を取得する"""
+        return self._values.get(labels, 0.0)
+
+    def collect(self) -> Iterable[str]:
+        """Prometheusのテキスト形式の行を出力する"""
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class CallbackCounter:
+    """出力時にコールバックで値を取得するカウンター（既存の集計値をそのまま公開する）"""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        yield f"{self.name} {_format_value(self.callback())}"
+
+
+class CallbackGauge:
+    """出力時にコールバックで値を取得するゲージ（キューの滞留件数など、増減する現在値を公開する）"""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {_format_value(self.callback())}"
+
+
+class Histogram:
+    """
+    所要時間のヒストグラム（ラベルの組み合わせごとに集計）
+
+    観測時はバケットの二分探索と加算のみを行い、累積値は出力時に計算する
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # ラベル値 → [バケットごとの件数..., +Inf の件数, 合計値]
+        self._series: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        値を記録する
+
+        Args:
+            value: 観測値（秒）
+            *labels: ラベル値（labelnames の順）
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        """with 文のブロックの所要時間を記録する"""
+        return _Timer(self, labels)
+
+    def count(self, *labels: str) -> int:
+        """記録した件数を取得する"""
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def collect(self) -> Iterable[str]:
+        """Prometheusのテキスト形式の行を出力する"""
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {_format_value(cumulative)}"
+            cumulative += series[len(self.buckets)]
+            le = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{le} {_format_value(cumulative)}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(series[-1])}"
+            yield f"{self.name}_count{label_text} {_format_value(cumulative)}"
+
+
+class _Timer:
+    """Histogram.time() のコンテキストマネージャー"""
+
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: LabelValues):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class MetricsRegistry:
+    """メトリクスの登録と出力"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        """メトリクスを登録する（同名のメトリクスは登録済みのものを返す）"""
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback_counter(self, name: str, documentation: str, callback: Callable[[], float]) -> CallbackCounter:
+        return self.register(CallbackCounter(name, documentation, callback))
+
+    def callback_gauge(self, name: str, documentation: str, callback: Callable[[], float]) -> CallbackGauge:
+        return self.register(CallbackGauge(name, documentation, callback))
+
+    def get(self, name: str) -> Optional[object]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """
+        全メトリクスをPrometheusのテキスト形式で出力する
+
+        Returns:
+            str: エクスポジション形式のテキスト
+        """
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+# アプリケーション全体で共有するレジストリ
+REGISTRY = MetricsRegistry()
+
+# 処理段階ごとの所要時間（endpoint: onboarding / batch、stage: validation / judge / generate / total）
+STAGE_SECONDS = REGISTRY.histogram(
+    "onboarding_stage_seconds",
+    "入社処理の段階ごとの所要時間（秒）",
+    ("endpoint", "stage")
+)
+
+# テンプレートの取得・置換の所要時間（stage: load / render）
+TEMPLATE_SECONDS = REGISTRY.histogram(
+    "template_stage_seconds",
+    "PowerShellテンプレートの取得・置換の所要時間（秒）",
+    ("stage",)
+)
+
+# HTTPリクエストの所要時間（ミドルウェアで計測）
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTPリクエストの所要時間（秒）",
+    ("method", "path", "status")
+)
+
+# 生成件数（雇用形態・ライセンスSKUごと）
+GENERATED_TOTAL = REGISTRY.counter(
+    "onboarding_generated_total",
+    "PowerShellコマンドの生成件数",
+    ("endpoint", "employment_type", "license_sku")
+)
+
+# エラー件数（エラーの種類ごと）
+ERRORS_TOTAL = REGISTRY.counter(
+    "onboarding_errors_total",
+    "入社処理のエラー件数",
+    ("endpoint", "error")
+)
+
+# 冪等性ストアの参照結果（result: replayed / stored / conflict）
+IDEMPOTENCY_TOTAL = REGISTRY.counter(
+    "onboarding_idempotency_total",
+    "冪等性ストアの参照結果の件数",
+    ("result",)
+)
+
+# 流量制御で拒否したリクエスト数（reason: rate_limited / queue_full / queue_timeout）
+ADMISSION_REJECTED_TOTAL = REGISTRY.counter(
+    "admission_rejected_total",
+    "流量制御で拒否したリクエスト数",
+    ("reason",)
+)
+
+# 流量制御の待ち行列での待ち時間（受け付けたリクエストのみ）
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "admission_wait_seconds",
+    "流量制御の待ち行列での待ち時間（秒）"
+)
+
+# 非同期ジョブの件数（status: queued / succeeded / failed）
+JOBS_TOTAL = REGISTRY.counter(
+    "onboarding_jobs_total",
+    "非同期ジョブの登録・完了件数",
+    ("status",)
+)
+
+# 生成履歴の書き込み件数（result: queued / dropped / written / failed）
+HISTORY_TOTAL = REGISTRY.counter(
+    "onboarding_history_total",
+    "生成履歴ストアへの書き込み件数",
+    ("result",)
+)
+
+# 保存したプロファイルの件数（kind: sampled / slow）
+PROFILES_TOTAL = REGISTRY.counter(
+    "onboarding_profiles_total",
+    "保存したリクエストのプロファイルの件数",
+    ("kind",)
+)
+
+
+def register_cache_counters(name: str, cache, documentation: str) -> None:
+    """
+    hits / misses 属性を持つキャッシュの件数をカウンターとして公開する
+
+    Args:
+        name: メトリクス名の接頭辞（例: "template_cache"）
+        cache: hits / misses 属性を持つキャッシュ
+        documentation: 説明文
+    """
+    REGISTRY.callback_counter(f"{name}_hits_total", f"{documentation}のヒット件数", lambda: cache.hits)
+    REGISTRY.callback_counter(f"{name}_misses_total", f"{documentation}のミス件数", lambda: cache.misses)
+
+
+def register_admission_gauges(controller) -> None:
+    """
+    流量制御の処理中件数・待ち行列の滞留件数をゲージとして公開する
+
+    Args:
+        controller: in_flight / queue_depth 属性を持つ流量制御
+    """
+    REGISTRY.callback_gauge("admission_in_flight", "処理中のリクエスト数", lambda: controller.in_flight)
+    REGISTRY.callback_gauge("admission_queue_depth", "待ち行列で待機中のリクエスト数", lambda: controller.queue_depth)
+
+
+def register_job_gauges(queue) -> None:
+    """
+    ジョブキューの実行待ちのジョブ数をゲージとして公開する
+
+    Args:
+        queue: queue_depth 属性を持つジョブキュー
+    """
+    REGISTRY.callback_gauge("onboarding_jobs_queued", "実行待ちの非同期ジョブ数", lambda: queue.queue_depth)
+
+
+class MetricsMiddleware:
+    """
+    HTTPリクエストの所要時間を計測するASGIミドルウェア
+
+    リクエストの開始時刻を scope["state"]["request_started"] に保存し、
+    エンドポイント側で「本文の受信・検証」にかかった時間を算出できるようにする
+    """
+
+    def __init__(self, app, excluded_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.excluded_paths = frozenset(excluded_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        scope.setdefault("state", {})["request_started"] = started
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # パスパラメータの値ごとに系列が増えないよう、ルーティング後のルート定義のパスを使う
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                path,
+                str(status_code)
+            )
@@ -3,8 +3,18 @@
 リクエストとレスポンスのデータ構造を定義
 """
 
-from typing import Literal, Optional
+import html
+import re
+from typing import Annotated, List, Literal, Optional
 from pydantic import BaseModel, Field, field_validator
+from typing_extensions import TypedDict
+
+
+# 制御文字（改行・タブなどの Unicode の Cc カテゴリ）
+# 生成するスクリプトのコメント・文字列の外に値が出ないよう、顧客名・従業員名・部署では使用できない
+CONTROL_CHARS_PATTERN = re.compile(r"[\x00-\x1f\x7f-\x9f]")
+
+CONTROL_CHARS_MESSAGE = "改行などの制御文字は使用できません"
 
 
 class OnboardingRequest(BaseModel):
@@ -46,24 +56,59 @@ class OnboardingRequest(BaseModel):
         examples=["営業部"]
     )
     
-    @field_validator("company", "employee_name", "department")
+    # 以下の検証関数と同じ処理を一括検証（sanitize_onboarding_row）でも行うため、変更する場合は合わせて変更すること
+    @field_validator("company", "department")
     @classmethod
     def validate_no_special_chars(cls, v: str) -> str:
         """特殊文字のサニタイズ（基本的なXSS対策）"""
+        if CONTROL_CHARS_PATTERN.search(v):
+            raise ValueError(CONTROL_CHARS_MESSAGE)
         # HTMLタグをエスケープ
-        import html
         return html.escape(v)
     
     @field_validator("employee_name")
     @classmethod
     def validate_employee_name(cls, v: str) -> str:
-        """従業員名のバリデーション"""
-        v = v.strip()
+        """従業員名のバリデーション（サニタイズ後に前後の空白を除去）"""
+        if CONTROL_CHARS_PATTERN.search(v):
+            raise ValueError(CONTROL_CHARS_MESSAGE)
+        v = html.escape(v).strip()
         if not v:
             raise ValueError("従業員名は必須です")
         return v
 
 
+# 一括検証用の行の型: OnboardingRequest と同じ型・制約で、検証関数を含まない
+# （型と制約の検証は pydantic-core だけで完結し、サニタイズは sanitize_onboarding_row でまとめて行う）
+OnboardingRow = TypedDict("OnboardingRow", {
+    name: Annotated[(field.annotation, *field.metadata)] if field.metadata else field.annotation
+    for name, field in OnboardingRequest.model_fields.items()
+})
+
+
+def sanitize_onboarding_row(data: dict) -> bool:
+    """
+    一括検証した行に OnboardingRequest の検証関数と同じサニタイズを行う（行を直接書き換える）
+
+    Args:
+        data: OnboardingRow として検証済みの行
+
+    Returns:
+        bool: 正しい行か（制御文字を含む場合・従業員名が空白のみの場合は False）
+    """
+    control_chars = CONTROL_CHARS_PATTERN.search
+    if control_chars(data["company"]) or control_chars(data["department"]) or control_chars(data["employee_name"]):
+        return False
+    escape = html.escape
+    data["company"] = escape(data["company"])
+    data["department"] = escape(data["department"])
+    employee_name = escape(data["employee_name"]).strip()
+    if not employee_name:
+        return False
+    data["employee_name"] = employee_name
+    return True
+
+
 class JudgmentResult(BaseModel):
     """判断結果モデル（AI判断結果）"""
     
@@ -124,3 +169,281 @@ class ErrorResponse(BaseModel):
         description="エラー詳細"
     )
 
+
+
+class BatchRowResult(BaseModel):
+    """一括処理の行ごとの結果モデル"""
+    
+    row: int = Field(
+        ...,
+        description="入力ファイル内の行番号（ヘッダーを除き1始まり）"
+    )
+    
+    status: Literal["success", "error"] = Field(
+        ...,
+        description="処理ステータス"
+    )
+    
+    employee_name: Optional[str] = Field(
+        None,
+        description="従業員名"
+    )
+    
+    judgment: Optional[str] = Field(
+        None,
+        description="AI判断結果（文章）"
+    )
+    
+    powershell_command: Optional[str] = Field(
+        None,
+        description="生成されたPowerShellコマンド"
+    )
+    
+    message: Optional[str] = Field(
+        None,
+        description="エラーメッセージ（エラー時）"
+    )
+    
+    details: Optional[List[dict]] = Field(
+        None,
+        description="エラー詳細（エラー時）"
+    )
+
+
+class RowValidationError(BaseModel):
+    """一括検証の行ごとのエラーモデル（1項目につき1件）"""
+
+    row: int = Field(
+        ...,
+        description="入力ファイル内の行番号（ヘッダーを除き1始まり）"
+    )
+
+    field: Optional[str] = Field(
+        None,
+        description="エラーの項目（行を解析できない場合は null）"
+    )
+
+    reason: str = Field(
+        ...,
+        description="エラーの理由"
+    )
+
+
+class ValidationReport(BaseModel):
+    """一括検証の結果モデル"""
+
+    total: int = Field(
+        ...,
+        description="検証した行数"
+    )
+
+    valid: int = Field(
+        ...,
+        description="正しい行数"
+    )
+
+    invalid: int = Field(
+        ...,
+        description="エラーのある行数"
+    )
+
+    errors: List[RowValidationError] = Field(
+        default_factory=list,
+        description="行ごとのエラー（行番号順）"
+    )
+
+
+class JobResponse(BaseModel):
+    """非同期ジョブの状態モデル"""
+    
+    job_id: str = Field(
+        ...,
+        description="ジョブID"
+    )
+    
+    status: Literal["queued", "running", "succeeded", "failed"] = Field(
+        ...,
+        description="ジョブの状態"
+    )
+    
+    input_format: str = Field(
+        ...,
+        description="入力形式（csv / jsonl）"
+    )
+    
+    output_format: str = Field(
+        ...,
+        description="出力形式（ndjson / ps1 / bundle / graph）"
+    )
+    
+    filename: Optional[str] = Field(
+        None,
+        description="アップロードされたファイル名"
+    )
+    
+    total_rows: Optional[int] = Field(
+        None,
+        description="入力の行数（実行開始前は未確定）"
+    )
+    
+    processed_rows: int = Field(
+        ...,
+        description="処理済みの行数"
+    )
+    
+    succeeded: int = Field(
+        ...,
+        description="生成に成功した行数"
+    )
+    
+    failed: int = Field(
+        ...,
+        description="エラーになった行数"
+    )
+    
+    progress: float = Field(
+        ...,
+        description="進捗（0〜1）"
+    )
+    
+    created_at: str = Field(
+        ...,
+        description="登録日時"
+    )
+    
+    finished_at: Optional[str] = Field(
+        None,
+        description="完了日時"
+    )
+    
+    error: Optional[str] = Field(
+        None,
+        description="ジョブ全体が失敗した場合のエラーメッセージ"
+    )
+    
+    status_url: str = Field(
+        ...,
+        description="状態を確認するURL"
+    )
+    
+    artifact_url: Optional[str] = Field(
+        None,
+        description="成果物のダウンロードURL（完了時）"
+    )
+
+
+class HistoryEntry(BaseModel):
+    """生成履歴モデル"""
+    
+    id: int = Field(
+        ...,
+        description="生成履歴のID（新しいほど大きい）"
+    )
+    
+    created_at: str = Field(
+        ...,
+        description="生成日時"
+    )
+    
+    endpoint: str = Field(
+        ...,
+        description="生成元（onboarding / batch）"
+    )
+    
+    company: str = Field(
+        ...,
+        description="顧客名"
+    )
+    
+    employee_name: str = Field(
+        ...,
+        description="従業員名"
+    )
+    
+    employment_type: str = Field(
+        ...,
+        description="雇用形態"
+    )
+    
+    department: Optional[str] = Field(
+        None,
+        description="部署"
+    )
+    
+    user_type: Optional[str] = Field(
+        None,
+        description="ユーザー種別（判断結果）"
+    )
+    
+    license_sku: Optional[str] = Field(
+        None,
+        description="ライセンスSKU（判断結果）"
+    )
+    
+    script_sha256: str = Field(
+        ...,
+        description="生成したスクリプトのSHA-256"
+    )
+    
+    script_bytes: int = Field(
+        ...,
+        description="生成したスクリプトのサイズ（バイト）"
+    )
+    
+    request: Optional[dict] = Field(
+        None,
+        description="リクエスト内容（1件取得時のみ）"
+    )
+    
+    powershell_command: Optional[str] = Field(
+        None,
+        description="生成したPowerShellコマンド（1件取得時のみ）"
+    )
+
+
+class HistoryPage(BaseModel):
+    """生成履歴の検索結果モデル"""
+    
+    items: List[HistoryEntry] = Field(
+        ...,
+        description="生成履歴（新しい順）"
+    )
+    
+    next_cursor: Optional[str] = Field(
+        None,
+        description="次のページのカーソル（cursor に指定、最後のページでは null）"
+    )
+
+
+class ProfileEntry(BaseModel):
+    """保存済みのプロファイルモデル"""
+    
+    name: str = Field(
+        ...,
+        description="ファイル名（/api/admin/profiles/{name} でダウンロード）"
+    )
+    
+    kind: Literal["sampled", "slow"] = Field(
+        ...,
+        description="種類（sampled: cProfile の pstats 形式、slow: 遅いリクエストの collapsed stack 形式）"
+    )
+    
+    request_id: str = Field(
+        ...,
+        description="リクエストID（ログの request_id と同じ）"
+    )
+    
+    duration_ms: int = Field(
+        ...,
+        description="リクエストの処理時間（ミリ秒）"
+    )
+    
+    created_at: str = Field(
+        ...,
+        description="保存日時"
+    )
+    
+    size: int = Field(
+        ...,
+        description="ファイルサイズ（バイト）"
+    )
@@ -0,0 +1,327 @@
+"""
+リクエストのプロファイリングモジュール
+レイテンシの悪化時に、エンドポイント内のどこで時間がかかっているかを調べるためのもの（既定では無効）
+
+- 全リクエストにリクエストIDを付け、X-Request-ID ヘッダーで返すとともに処理中のログに出力する
+- sample_rate の割合のリクエストを cProfile で計測し、pstats 形式（.prof）で保存する
+- 処理時間が slow_threshold 秒を超えたリクエストは、超えた時点から完了までイベントループのスレッドの
+  スタックを一定間隔で記録し、collapsed stack 形式（.collapsed、flamegraph.pl / speedscope で表示）で保存する
+- 保存先のディレクトリは max_files 件を超えると古いものから削除する
+
+計測対象にならないリクエストの追加の処理は、乱数1回・リクエストIDの発行・処理中の一覧への登録のみ。
+イベントループ上では他のリクエストの処理も交互に実行されるため、どちらの出力にも同時に処理中だった
+リクエストの処理が含まれる（高負荷時の原因の特定にはむしろ役立つ）。
+"""
+
+import asyncio
+import cProfile
+import logging
+import marshal
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from app.logging_config import request_id_var
+from app.metrics import PROFILES_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# 受け付ける X-Request-ID（ログ・ファイル名に使うため英数字と - _ のみ）
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# 保存するファイル名（{作成時刻ミリ秒}_{種類}_{処理時間ms}ms_{リクエストID}.{拡張子}）
+PROFILE_NAME_PATTERN = re.compile(
+    r"^(?P<created>\d{13})_(?P<kind>sampled|slow)_(?P<duration>\d+)ms_(?P<request_id>[A-Za-z0-9_-]{1,64})\.(?:prof|collapsed)$"
+)
+
+
+class StackSampler:
+    """
+    処理時間が閾値を超えたリクエストを検出し、完了までスタックを記録する監視スレッド
+
+    リクエストの開始・完了時は処理中の一覧（辞書）を更新するだけで、
+    監視スレッドが一定間隔で一覧を確認する（同時に記録するリクエストは1件まで）
+    """
+
+    def __init__(self, profiler: "RequestProfiler", threshold: float, interval: float):
+        self.profiler = profiler
+        self.threshold = threshold
+        self.interval = interval
+        # リクエストごとのキー → (開始時刻, 処理しているスレッドのID, リクエストID, パス)
+        # （X-Request-ID は重複しうるため、キーには scope の id を使う）
+        self.in_flight: Dict[int, tuple] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def ensure_started(self) -> None:
+        """監視スレッドを起動する（fork 後のワーカーで最初のリクエスト時に起動するため、起動済みなら何もしない）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="slow-request-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """監視スレッドを停止する"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        # 閾値の 1/4 ごと（最大 0.1 秒）に確認する（待機中はCPUをほとんど使わない）
+        check_interval = min(0.1, self.threshold / 4)
+        while not self._stop.wait(check_interval):
+            now = time.perf_counter()
+            for key, (started, thread_id, request_id, path) in list(self.in_flight.items()):
+                if now - started >= self.threshold:
+                    self._capture(key, started, thread_id, request_id, path)
+                    break
+
+    def _capture(self, key: int, started: float, thread_id: int, request_id: str, path: str) -> None:
+        """リクエストが完了するまでスタックを記録して保存する"""
+        counts: Dict[str, int] = {}
+        while key in self.in_flight and not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                break
+            stack: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            collapsed = ";".join(reversed(stack))
+            counts[collapsed] = counts.get(collapsed, 0) + 1
+        # 完了を待たずに停止した場合も記録した分を保存する（同じリクエストを再度記録しないよう一覧から外す）
+        self.in_flight.pop(key, None)
+        if not counts:
+            return
+        duration = time.perf_counter() - started
+        lines = [f"{stack} {count}" for stack, count in sorted(counts.items())]
+        self.profiler.save("slow", request_id, duration, ("\n".join(lines) + "\n").encode("utf-8"))
+        logger.warning(f"処理に時間がかかったリクエストのスタックを記録しました: {path} {duration * 1000:.0f}ms request_id={request_id}")
+
+
+class RequestProfiler:
+    """
+    プロファイルの保存先ディレクトリの管理と、計測対象の判定
+
+    Args:
+        directory: 保存先ディレクトリ
+        sample_rate: cProfile で計測するリクエストの割合（0〜1）
+        slow_threshold: スタックを記録する処理時間の閾値（秒、0 で無効）
+        sampler_interval: スタックを記録する間隔（秒）
+        max_files: 保存するファイル数の上限（超えた分は古いものから削除）
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = 0.01,
+        slow_threshold: float = 1.0,
+        sampler_interval: float = 0.005,
+        max_files: int = 200
+    ):
+        self.directory = Path(directory)
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self.sampler = StackSampler(self, slow_threshold, sampler_interval) if slow_threshold > 0 else None
+        # cProfile はスレッドに1つしか設定できないため、同時に計測するリクエストは1件まで
+        self.profiling = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings) -> "RequestProfiler":
+        """アプリケーション設定から作成する"""
+        return cls(
+            directory=settings.profiling_dir,
+            sample_rate=settings.profiling_sample_rate,
+            slow_threshold=settings.profiling_slow_threshold,
+            sampler_interval=settings.profiling_sampler_interval,
+            max_files=settings.profiling_max_files
+        )
+
+    def save(self, kind: str, request_id: str, duration: float, content: bytes) -> Path:
+        """
+        プロファイルを保存し、上限を超えた古いファイルを削除する
+
+        Args:
+            kind: "sampled"（cProfile、.prof）または "slow"（スタック、.collapsed）
+            request_id: リクエストID
+            duration: リクエストの処理時間（秒）
+            content: ファイルの内容
+
+        Returns:
+            Path: 保存したファイル
+        """
+        suffix = "prof" if kind == "sampled" else "collapsed"
+        name = f"{int(time.time() * 1000):013d}_{kind}_{int(duration * 1000)}ms_{request_id}.{suffix}"
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / name
+            temp_path = path.with_name(f".{name}.tmp")
+            temp_path.write_bytes(content)
+            os.replace(temp_path, path)
+            names = sorted(entry for entry in os.listdir(self.directory) if PROFILE_NAME_PATTERN.match(entry))
+            for old in names[:max(0, len(names) - self.max_files)]:
+                try:
+                    os.remove(self.directory / old)
+                except FileNotFoundError:
+                    pass
+        PROFILES_TOTAL.inc(kind)
+        return path
+
+    def list_profiles(self, limit: int = 100) -> List[dict]:
+        """
+        保存済みのプロファイルを新しい順に取得する
+
+        Args:
+            limit: 取得する件数の上限
+
+        Returns:
+            List[dict]: name / kind / request_id / duration_ms / created_at / size
+        """
+        if not self.directory.is_dir():
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            match = PROFILE_NAME_PATTERN.match(name)
+            if match is None:
+                continue
+            try:
+                size = (self.directory / name).stat().st_size
+            except FileNotFoundError:
+                continue
+            created = int(match.group("created")) / 1000
+            profiles.append({
+                "name": name,
+                "kind": match.group("kind"),
+                "request_id": match.group("request_id"),
+                "duration_ms": int(match.group("duration")),
+                "created_at": datetime.fromtimestamp(created).isoformat(timespec="milliseconds"),
+                "size": size,
+            })
+            if len(profiles) >= limit:
+                break
+        return profiles
+
+    def profile_path(self, name: str) -> Optional[Path]:
+        """
+        保存済みのプロファイルのパスを取得する
+
+        Args:
+            name: ファイル名（list_profiles の name）
+
+        Returns:
+            Optional[Path]: ファイルのパス（名前が不正・存在しない場合は None）
+        """
+        if PROFILE_NAME_PATTERN.match(name) is None:
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+    def close(self) -> None:
+        """監視スレッドを停止する"""
+        if self.sampler is not None:
+            self.sampler.stop()
+
+
+class ProfilingMiddleware:
+    """
+    リクエストIDの付与とプロファイリングを行うASGIミドルウェア
+
+    paths のいずれかで始まるパス（excluded_paths で始まるものを除く）を計測の対象とする。
+    リクエストIDは全リクエストに付け、X-Request-ID ヘッダーで受け取った値があればそれを使う。
+    """
+
+    def __init__(
+        self,
+        app,
+        profiler: RequestProfiler,
+        paths: Sequence[str] = ("/api/",),
+        excluded_paths: Sequence[str] = ("/api/admin/",)
+    ):
+        self.app = app
+        self.profiler = profiler
+        self.paths = tuple(paths)
+        self.excluded_paths = tuple(excluded_paths)
+
+    @staticmethod
+    def request_id(scope) -> str:
+        """リクエストID（X-Request-ID ヘッダーの値、無い・不正な場合は新しく発行）"""
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                text = value.decode("latin-1")
+                if REQUEST_ID_PATTERN.match(text):
+                    return text
+                break
+        return os.urandom(8).hex()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = self.request_id(scope)
+        header = (b"x-request-id", request_id.encode("latin-1"))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), header]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            path = scope["path"]
+            if not path.startswith(self.paths) or path.startswith(self.excluded_paths):
+                await self.app(scope, receive, send_wrapper)
+            elif self.profiler.sample_rate > 0 and not self.profiler.profiling and random.random() < self.profiler.sample_rate:
+                await self._profile(scope, receive, send_wrapper, request_id)
+            else:
+                await self._watch(scope, receive, send_wrapper, request_id)
+        finally:
+            request_id_var.reset(token)
+
+    async def _profile(self, scope, receive, send, request_id: str) -> None:
+        """cProfile で計測して保存する"""
+        profiler = self.profiler
+        profiler.profiling = True
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profile.disable()
+            duration = time.perf_counter() - started
+            profiler.profiling = False
+            # レスポンスの送信後に、イベントループを止めないよう別スレッドで書き出す
+            await asyncio.to_thread(self._save_profile, profile, request_id, duration)
+
+    def _save_profile(self, profile: cProfile.Profile, request_id: str, duration: float) -> None:
+        """cProfile の結果を pstats 形式で保存する"""
+        profile.create_stats()
+        try:
+            self.profiler.save("sampled", request_id, duration, marshal.dumps(profile.stats))
+        except OSError as e:
+            logger.error(f"プロファイルを保存できませんでした: {e}")
+
+    async def _watch(self, scope, receive, send, request_id: str) -> None:
+        """処理時間の監視に登録して処理する"""
+        sampler = self.profiler.sampler
+        if sampler is None:
+            await self.app(scope, receive, send)
+            return
+        sampler.ensure_started()
+        key = id(scope)
+        sampler.in_flight[key] = (time.perf_counter(), threading.get_ident(), request_id, scope["path"])
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sampler.in_flight.pop(key, None)
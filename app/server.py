@@ -0,0 +1,323 @@
+"""
+本番用のマルチワーカーサーバー（pre-fork）
+マスタープロセスでルール・テンプレートなどを読み込んでから待ち受けソケットを作成し、
+ワーカープロセスを fork して同じソケットで uvicorn を実行する。
+
+- 読み込み済みの状態は copy-on-write でワーカー間で共有される（gc.freeze で参照カウント以外のページの複製を抑える）
+- SIGTERM / SIGINT を受けると、各ワーカーは新しい接続の受け付けを止め、処理中のリクエストの完了を待ってから終了する
+  （/ready は停止処理の開始時点で 503 を返す）
+- 異常終了したワーカーは作り直す（起動直後に終了した場合は設定の誤りとみなして全体を停止する）
+
+使い方:
+    SERVER_WORKERS=4 python -m app.server
+    python -m app.server --workers 0 --port 8080    # CPU数のワーカー
+"""
+
+import argparse
+import gc
+import logging
+import math
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+
+from app.config import Settings, get_settings
+from app.logging_config import setup_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+# ワーカーが起動直後に終了した場合に起動失敗とみなす時間（秒）
+WORKER_BOOT_TIMEOUT = 5.0
+
+# ワーカーの終了コード: 起動に失敗した
+WORKER_BOOT_ERROR = 3
+
+
+def resolve_workers(workers: int) -> int:
+    """ワーカー数を決定する（0 の場合は CPU 数）"""
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def resolve_loop(loop: str) -> str:
+    """イベントループを決定する（auto の場合は uvloop があれば使用）"""
+    if loop != "auto":
+        return loop
+    try:
+        import uvloop  # noqa: F401
+    except ImportError:
+        return "asyncio"
+    return "uvloop"
+
+
+def resolve_http(http: str) -> str:
+    """HTTPパーサーを決定する（auto の場合は httptools があれば使用）"""
+    if http != "auto":
+        return http
+    try:
+        import httptools  # noqa: F401
+    except ImportError:
+        return "h11"
+    return "httptools"
+
+
+def create_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """
+    ワーカー間で共有する待ち受けソケットを作成する
+
+    Args:
+        host: 待ち受けるアドレス
+        port: 待ち受けるポート（0 の場合は空いているポート）
+        backlog: 接続待ちキューの長さ
+
+    Returns:
+        socket.socket: 待ち受け中のソケット
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class WorkerServer(uvicorn.Server):
+    """停止シグナルを受けた時点で準備完了の状態を解除する uvicorn サーバー"""
+
+    def handle_exit(self, sig: int, frame) -> None:
+        from app.main import set_ready
+        set_ready(False)
+        super().handle_exit(sig, frame)
+
+
+class MultiWorkerServer:
+    """
+    ワーカープロセスを管理するマスタープロセス
+
+    - start: 待ち受けソケットを作成し、ワーカーを fork する
+    - run: ワーカーの終了を監視し、異常終了したワーカーを作り直す（停止シグナルで全体を停止する）
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.workers = resolve_workers(settings.server_workers)
+        self.loop = resolve_loop(settings.server_loop)
+        self.http = resolve_http(settings.server_http)
+        self.socket: Optional[socket.socket] = None
+        self.app = None
+        self._children: Dict[int, float] = {}
+        self._stopping = False
+
+    def load_app(self):
+        """アプリケーションを読み込む（preload 時はルール・テンプレートなども読み込み、GCの対象から外す）"""
+        from app.main import app, preload
+        if self.settings.server_preload:
+            preload()
+            # fork 後に GC が共有ページの参照情報を書き換えて複製されないよう、読み込み済みのオブジェクトを固定する
+            gc.collect()
+            gc.freeze()
+        return app
+
+    def configure_workers(self) -> None:
+        """
+        プロセスごとに独立した状態を、ワーカーが2つ以上の場合に合わせて設定する（アプリケーションの読み込み前に呼び出す）
+
+        - 非同期ジョブ: 待ち行列はプロセス内にあり、同じジョブを重複して実行しないよう無効にする
+        - 流量制御: 同時実行数・待ち行列の上限はサーバー全体の値として、ワーカー数で分割する
+        - /metrics・MailNickname の重複管理（ストア未指定時）はワーカーごとのため、起動時に警告する
+        """
+        if self.workers <= 1:
+            return
+        settings = self.settings
+        if settings.jobs_enabled:
+            logger.warning("マルチワーカーでは非同期ジョブを無効にします（ジョブは1ワーカーのサーバーで実行してください）")
+            settings.jobs_enabled = False
+        if settings.admission_enabled:
+            settings.admission_max_in_flight = max(1, math.ceil(settings.admission_max_in_flight / self.workers))
+            settings.admission_queue_size = math.ceil(settings.admission_queue_size / self.workers)
+            logger.info(
+                f"流量制御の上限をワーカー数で分割します: ワーカーごとに同時実行 {settings.admission_max_in_flight} 件"
+                f" / 待ち行列 {settings.admission_queue_size} 件（クライアントごとの流量はワーカーごと）"
+            )
+        if not settings.upn_store_path:
+            logger.warning(
+                "UPN_STORE_PATH が未設定のため、MailNickname の重複はリクエスト間・ワーカー間で確認されません"
+                "（同姓同名に連番を付与するには、全ワーカーで共有する UPN_STORE_PATH を指定してください）"
+            )
+        logger.warning(
+            f"/metrics の値はワーカーごとです（応答したワーカーの値のみ、{self.workers} ワーカー分の合計ではありません）"
+        )
+
+    def start(self) -> None:
+        """待ち受けソケットを作成してワーカーを起動する"""
+        self.configure_workers()
+        if self.settings.server_preload:
+            self.app = self.load_app()
+        self.socket = create_socket(self.settings.host, self.settings.port, self.settings.server_backlog)
+        host, port = self.socket.getsockname()[:2]
+        logger.info(
+            f"待ち受け開始: http://{host}:{port} workers={self.workers} loop={self.loop} "
+            f"http={self.http} preload={self.settings.server_preload}"
+        )
+        for _ in range(self.workers):
+            self.spawn()
+
+    def spawn(self) -> int:
+        """ワーカーを1つ fork する"""
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self._children[pid] = time.monotonic()
+        return pid
+
+    def _run_worker(self) -> None:
+        """ワーカープロセスの処理（戻らずにプロセスを終了する）"""
+        exit_code = 0
+        try:
+            # マスタープロセスのシグナルハンドラーを解除する（実行中は uvicorn が自身のハンドラーを設定し、
+            # 終了後に受信したシグナルを再送するため、ログを書き出して終了できるよう無視する）
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            app = self.app if self.app is not None else self.load_app()
+            config = uvicorn.Config(
+                app,
+                loop=self.loop,
+                http=self.http,
+                lifespan="on",
+                log_config=None,
+                access_log=False,
+                timeout_keep_alive=self.settings.server_keepalive_timeout,
+                timeout_graceful_shutdown=self.settings.server_graceful_timeout,
+            )
+            server = WorkerServer(config)
+            server.run(sockets=[self.socket])
+            if not server.started:
+                exit_code = WORKER_BOOT_ERROR
+        except BaseException:
+            logger.exception("ワーカーが異常終了しました")
+            exit_code = WORKER_BOOT_ERROR
+        finally:
+            shutdown_logging()
+            os._exit(exit_code)
+
+    def run(self) -> int:
+        """
+        ワーカーの終了を監視する（停止シグナルを受けるか、ワーカーの起動に失敗するまで戻らない）
+
+        Returns:
+            int: 終了コード
+        """
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        exit_code = 0
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, 0)
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+            started = self._children.pop(pid, None)
+            if started is None or self._stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if code == WORKER_BOOT_ERROR or time.monotonic() - started < WORKER_BOOT_TIMEOUT:
+                logger.error(f"ワーカーの起動に失敗しました: pid={pid}, code={code}（全体を停止します）")
+                exit_code = 1
+                self.stop()
+                continue
+            logger.warning(f"ワーカーが終了しました: pid={pid}, code={code}（作り直します）")
+            self.spawn()
+        if self.socket is not None:
+            self.socket.close()
+        logger.info("サーバーを停止しました")
+        return exit_code
+
+    def _handle_stop(self, signum: int, frame) -> None:
+        """停止シグナルのハンドラー"""
+        logger.info(f"停止シグナルを受信しました: {signal.Signals(signum).name}（処理中のリクエストの完了を待ちます）")
+        self.stop()
+
+    def stop(self) -> None:
+        """
+        全ワーカーに停止を指示する
+
+        各ワーカーは処理中のリクエストの完了を待って終了し、
+        server_graceful_timeout を過ぎても終了しないワーカーは強制終了する
+        """
+        if self._stopping:
+            return
+        self._stopping = True
+        # マスタープロセスの待ち受けソケットを閉じる（全ワーカーが閉じた時点で新しい接続は拒否される）
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+        for pid in list(self._children):
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.settings.server_graceful_timeout + WORKER_BOOT_TIMEOUT
+        while self._children and time.monotonic() < deadline:
+            for pid in list(self._children):
+                try:
+                    finished, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    finished = pid
+                if finished:
+                    self._children.pop(pid, None)
+            time.sleep(0.05)
+        for pid in list(self._children):
+            logger.warning(f"ワーカーが時間内に終了しないため強制終了します: pid={pid}")
+            self._signal(pid, signal.SIGKILL)
+
+    @staticmethod
+    def _signal(pid: int, signum: int) -> None:
+        """ワーカーにシグナルを送る（既に終了している場合は何もしない）"""
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """コマンドライン引数の定義（指定した項目は環境変数・.env の設定より優先する）"""
+    parser = argparse.ArgumentParser(description="本番用のマルチワーカーサーバー")
+    parser.add_argument("--host", help="待ち受けるアドレス（HOST）")
+    parser.add_argument("--port", type=int, help="待ち受けるポート（PORT）")
+    parser.add_argument("-w", "--workers", type=int, help="ワーカープロセス数、0でCPU数（SERVER_WORKERS）")
+    parser.add_argument("--loop", choices=["auto", "uvloop", "asyncio"], help="イベントループ（SERVER_LOOP）")
+    parser.add_argument("--http", choices=["auto", "httptools", "h11"], help="HTTPパーサー（SERVER_HTTP）")
+    parser.add_argument(
+        "--no-preload",
+        action="store_true",
+        help="fork 前に読み込まず、ワーカーごとに読み込む（SERVER_PRELOAD=false）"
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    settings = get_settings()
+    overrides = {
+        "host": args.host,
+        "port": args.port,
+        "server_workers": args.workers,
+        "server_loop": args.loop,
+        "server_http": args.http,
+        "server_preload": False if args.no_preload else None,
+    }
+    for name, value in overrides.items():
+        if value is not None:
+            setattr(settings, name, value)
+
+    setup_logging(settings)
+    server = MultiWorkerServer(settings)
+    server.start()
+    return server.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
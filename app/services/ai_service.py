@@ -0,0 +1,247 @@
+"""
+OpenAI API呼び出しサービス
+長期間使い回す非同期クライアント（コネクションプール）を1つだけ保持し、
+同時実行数の制限・タイムアウト・ジッター付きリトライ・応答キャッシュを提供する
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import unicodedata
+from typing import TYPE_CHECKING, Dict, Optional
+
+from app.services.ttl_cache import TTLCache
+
+if TYPE_CHECKING:
+    import openai
+
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache(TTLCache[str]):
+    """
+    OpenAI APIの応答キャッシュ（TTL付きLRU）
+
+    キーは正規化した入力のハッシュ値（内容アドレス）
+    """
+
+    @staticmethod
+    def make_key(**fields: str) -> str:
+        """
+        入力項目からキャッシュキーを生成する
+
+        全角・半角、前後の空白、英字の大文字・小文字の違いは同じキーとして扱う
+        """
+        normalized = {
+            name: unicodedata.normalize("NFKC", value or "").strip().lower()
+            for name, value in fields.items()
+        }
+        payload = json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AIService:
+    """
+    OpenAI APIを呼び出すサービス
+
+    - クライアントは最初の呼び出し時に1つだけ作成し、以降は同じコネクションプールを使い回す
+    - セマフォで同時実行数を制限する
+    - 一時的なエラー（429・5xx・タイムアウト・接続エラー）はジッター付き指数バックオフでリトライする
+    - 同じ入力（顧客・雇用形態・部署）の応答はTTL付きでキャッシュし、実行中の同一リクエストは1回にまとめる
+    """
+
+    # リトライ対象のHTTPステータス
+    RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+
+    SYSTEM_PROMPT = (
+        "あなたはBPO向けのIT管理者アシスタントです。"
+        "Microsoft Entra ID のユーザー作成について、入力された顧客・雇用形態・部署をもとに"
+        "注意点を日本語で2文以内で簡潔に説明してください。"
+    )
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        model: str = "gpt-4",
+        base_url: Optional[str] = None,
+        max_concurrency: int = 8,
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        cache_ttl: float = 3600.0,
+        cache_size: int = 1024
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = ResponseCache(max_size=cache_size, ttl=cache_ttl)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional["openai.AsyncOpenAI"] = None
+        self._inflight: Dict[str, "asyncio.Future[str]"] = {}
+        # 実行中の同一リクエストにまとめた件数
+        self.coalesced = 0
+
+    @classmethod
+    def from_settings(cls, settings) -> "AIService":
+        """アプリケーション設定からサービスを作成する"""
+        return cls(
+            api_key=settings.openai_api_key,
+            model=settings.openai_model,
+            base_url=settings.openai_base_url,
+            max_concurrency=settings.ai_max_concurrency,
+            timeout=settings.ai_timeout,
+            max_retries=settings.ai_max_retries,
+            cache_ttl=settings.ai_cache_ttl,
+            cache_size=settings.ai_cache_size
+        )
+
+    @property
+    def client(self) -> "openai.AsyncOpenAI":
+        """非同期クライアント（初回アクセス時に作成）"""
+        if self._client is None:
+            # openai パッケージの読み込みは数百ミリ秒かかるため、初回呼び出しまで遅延させる
+            import openai
+
+            if not self.api_key:
+                raise ValueError("OpenAI APIキーが設定されていません（OPENAI_API_KEY）")
+            # リトライはこのサービス側で制御するため、SDKのリトライは無効にする
+            self._client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=0
+            )
+        return self._client
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """リトライまでの待機時間（Retry-After があれば優先、無ければフルジッター）"""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _is_retryable(self, error: Exception) -> bool:
+        """一時的なエラーかどうか"""
+        import openai
+
+        if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code in self.RETRYABLE_STATUS
+        return False
+
+    async def _complete(self, prompt: str) -> str:
+        """チャット補完APIを呼び出す（同時実行数制限・リトライ付き）"""
+        async with self._semaphore:
+            attempt = 0
+            while True:
+                try:
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": self.SYSTEM_PROMPT},
+                            {"role": "user", "content": prompt},
+                        ],
+                        temperature=0
+                    )
+                    return (response.choices[0].message.content or "").strip()
+                except Exception as e:
+                    if attempt >= self.max_retries or not self._is_retryable(e):
+                        raise
+                    delay = self._backoff(attempt, e)
+                    attempt += 1
+                    logger.warning(
+                        f"OpenAI API呼び出しをリトライします ({attempt}/{self.max_retries}, "
+                        f"{delay:.2f}秒後): {type(e).__name__}"
+                    )
+                    await asyncio.sleep(delay)
+
+    async def generate_judgment_comment(
+        self,
+        company: str,
+        employment_type: str,
+        department: str
+    ) -> str:
+        """
+        判断結果に添える補足コメントを生成する
+
+        Args:
+            company: 顧客名
+            employment_type: 雇用形態
+            department: 部署
+
+        Returns:
+            str: 補足コメント
+
+        Raises:
+            openai.OpenAIError: API呼び出しに失敗した場合（リトライ後）
+        """
+        key = ResponseCache.make_key(
+            company=company,
+            employment_type=employment_type,
+            department=department
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        # 同じ入力のリクエストが実行中であれば、その結果を待つ
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        future: "asyncio.Future[str]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            prompt = f"顧客: {company}\n雇用形態: {employment_type}\n部署: {department}"
+            result = await self._complete(prompt)
+            self.cache.set(key, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # 待機中の呼び出しが無い場合に「取得されなかった例外」の警告を出さない
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def aclose(self) -> None:
+        """クライアントを閉じてコネクションプールを解放する"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+# アプリケーション全体で共有するサービス
+_ai_service: Optional[AIService] = None
+
+
+def get_ai_service() -> AIService:
+    """共有のAIサービスを取得する（初回呼び出し時に設定から作成）"""
+    global _ai_service
+    if _ai_service is None:
+        from app.config import get_settings
+        _ai_service = AIService.from_settings(get_settings())
+    return _ai_service
+
+
+async def close_ai_service() -> None:
+    """共有のAIサービスを閉じる（アプリケーション終了時）"""
+    global _ai_service
+    if _ai_service is not None:
+        await _ai_service.aclose()
+        _ai_service = None
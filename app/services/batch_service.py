@@ -0,0 +1,664 @@
+"""
+一括入社処理サービス
+HRエクスポート（CSV/JSONL）を逐次読み込み、行ごとに判断とコマンド生成を行う
+"""
+
+import codecs
+import csv
+import io
+import itertools
+import json
+import time
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.metrics import ERRORS_TOTAL, GENERATED_TOTAL, STAGE_SECONDS
+from app.models import (
+    CONTROL_CHARS_PATTERN, BatchRowResult, OnboardingRequest, OnboardingRow, RowValidationError, ValidationReport,
+    sanitize_onboarding_row
+)
+from app.services.columnar_batch import ColumnarBatch
+from app.services.command_generator import CommandGenerator
+from app.services.history_store import get_history_store
+from app.services.judgment_service import JudgmentService
+from app.services.upn_registry import UpnRegistry
+
+
+# 入力行の型: (行番号, 行データ or 解析エラー)
+RawRow = Tuple[int, object]
+
+# まとめて検証する行数
+VALIDATION_CHUNK_SIZE = 1000
+
+# 文字コードを確認する先頭のバイト数
+ENCODING_CHECK_SIZE = 64 * 1024
+
+# 一括検証: OnboardingRequest と同じ型・制約の行のリスト（検証関数を含まないため pydantic-core だけで完結する）
+_ROWS_ADAPTER = TypeAdapter(List[OnboardingRow])
+
+
+class BatchService:
+    """一括入社処理を実装するサービス"""
+
+    # サポートする入力形式
+    FORMAT_CSV = "csv"
+    FORMAT_JSONL = "jsonl"
+
+    # サポートする出力形式
+    OUTPUT_NDJSON = "ndjson"
+    OUTPUT_PS1 = "ps1"
+    OUTPUT_BUNDLE = "bundle"
+    OUTPUT_GRAPH = "graph"
+
+    # バンドル形式の出力形式 → CommandGenerator のレイアウト
+    BUNDLE_LAYOUTS = {
+        OUTPUT_BUNDLE: CommandGenerator.LAYOUT_BUNDLE,
+        OUTPUT_GRAPH: CommandGenerator.LAYOUT_GRAPH_BATCH,
+    }
+
+    @staticmethod
+    def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+        """
+        ファイル名・Content-Typeから入力形式を判定する
+
+        Args:
+            filename: アップロードされたファイル名
+            content_type: Content-Type
+
+        Returns:
+            str: "csv" または "jsonl"
+
+        Raises:
+            ValueError: 判定できない場合、またはJSON配列（.json）の場合
+        """
+        name = (filename or "").lower()
+        if name.endswith(".json"):
+            raise ValueError(
+                f"JSON配列（.json）には対応していません: {filename}（1行に1オブジェクトのJSONL（.jsonl）に変換してください）"
+            )
+        if name.endswith((".jsonl", ".ndjson")):
+            return BatchService.FORMAT_JSONL
+        if name.endswith((".csv", ".txt")):
+            return BatchService.FORMAT_CSV
+
+        content_type = (content_type or "").lower()
+        if "ndjson" in content_type or "jsonl" in content_type:
+            return BatchService.FORMAT_JSONL
+        if "csv" in content_type:
+            return BatchService.FORMAT_CSV
+
+        raise ValueError(f"入力形式を判定できません: {filename}（CSV または JSONL を指定してください）")
+
+    @staticmethod
+    def check_encoding(stream: BinaryIO, size: int = ENCODING_CHECK_SIZE) -> None:
+        """
+        入力の先頭がUTF-8（BOM付き可）として読み込めることを確認する
+
+        Shift_JIS などで保存されたファイルを、ストリーミングで結果を返し始める前にエラーとするため、
+        先頭 size バイトだけを確認してストリームの位置を先頭に戻す。
+
+        Args:
+            stream: バイナリストリーム（シーク可能なもの）
+            size: 確認するバイト数
+
+        Raises:
+            ValueError: UTF-8として読み込めない場合
+        """
+        head = stream.read(size)
+        stream.seek(0)
+        try:
+            # 末尾で途切れた複数バイト文字はエラーとしない
+            codecs.getincrementaldecoder("utf-8-sig")().decode(head, final=False)
+        except UnicodeDecodeError as e:
+            raise ValueError(BatchService.encoding_error_message(e)) from e
+
+    @staticmethod
+    def encoding_error_message(error: UnicodeDecodeError) -> str:
+        """文字コードのエラーメッセージ"""
+        return f"UTF-8 として読み込めません（{error.reason}）。UTF-8（BOM付き可）で保存し直してください"
+
+    @staticmethod
+    def iter_csv_rows(stream: BinaryIO) -> Iterator[RawRow]:
+        """
+        CSVを1行ずつ読み込む（BOM付きUTF-8にも対応）
+
+        Args:
+            stream: バイナリストリーム
+
+        Yields:
+            RawRow: (行番号, 行データの辞書 または 文字コードのエラー)
+        """
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        row_number = 0
+        try:
+            reader = csv.DictReader(text)
+            for row_number, row in enumerate(reader, start=1):
+                yield row_number, row
+        except UnicodeDecodeError as e:
+            # 途中でUTF-8として読み込めなくなった場合は、以降の行を読み込めないためエラー行として終了する
+            yield row_number + 1, e
+        finally:
+            # 元のストリームは呼び出し側で閉じるため切り離す
+            text.detach()
+
+    @staticmethod
+    def iter_jsonl_rows(stream: BinaryIO) -> Iterator[RawRow]:
+        """
+        JSONLを1行ずつ読み込む（空行は読み飛ばす）
+
+        Args:
+            stream: バイナリストリーム
+
+        Yields:
+            RawRow: (行番号, 行データの辞書 または 解析エラー)
+        """
+        row_number = 0
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            row_number += 1
+            try:
+                yield row_number, json.loads(line)
+            except ValueError as e:
+                yield row_number, e
+
+    @staticmethod
+    def iter_rows(stream: BinaryIO, input_format: str) -> Iterator[RawRow]:
+        """入力形式に応じて行を読み込む"""
+        if input_format == BatchService.FORMAT_CSV:
+            return BatchService.iter_csv_rows(stream)
+        return BatchService.iter_jsonl_rows(stream)
+
+    @staticmethod
+    def error_details(error: ValidationError) -> list:
+        """ValidationErrorを行ごとのエラー詳細（項目・理由）に変換する"""
+        return [
+            {
+                "field": ".".join(str(loc) for loc in e["loc"]),
+                "reason": e["msg"],
+            }
+            for e in error.errors()
+        ]
+
+    @staticmethod
+    def prepare_row(row_number: int, row: object) -> Union[Dict, BatchRowResult]:
+        """
+        検証前の行を準備する（解析エラー・不正な形式の行はエラー結果を返す）
+
+        Args:
+            row_number: 行番号
+            row: 行データ（辞書）または解析エラー
+
+        Returns:
+            Union[Dict, BatchRowResult]: 検証する行データ、またはエラー結果
+        """
+        if isinstance(row, UnicodeDecodeError):
+            ERRORS_TOTAL.inc("batch", type(row).__name__)
+            return BatchRowResult(
+                row=row_number,
+                status="error",
+                message=f"この行付近以降を読み込めません: {BatchService.encoding_error_message(row)}"
+            )
+        if isinstance(row, Exception):
+            ERRORS_TOTAL.inc("batch", type(row).__name__)
+            return BatchRowResult(
+                row=row_number,
+                status="error",
+                message=f"行を解析できません: {row}"
+            )
+        if not isinstance(row, dict):
+            ERRORS_TOTAL.inc("batch", "InvalidRow")
+            return BatchRowResult(
+                row=row_number,
+                status="error",
+                message="行の形式が不正です（オブジェクトを指定してください）"
+            )
+
+        # HRエクスポートにはタスク種別が無いことが多いため補完する
+        data: Dict = dict(row)
+        if not data.get("task_type"):
+            data["task_type"] = "onboarding"
+        return data
+
+    @staticmethod
+    def validation_error_result(row_number: int, data: Dict, error: ValidationError) -> BatchRowResult:
+        """検証エラーを行ごとのエラー結果に変換する"""
+        ERRORS_TOTAL.inc("batch", "ValidationError")
+        # JSONL では従業員名が文字列以外の場合もあるため、エラー結果には文字列の場合のみ含める
+        employee_name = data.get("employee_name")
+        return BatchRowResult(
+            row=row_number,
+            status="error",
+            employee_name=employee_name if isinstance(employee_name, str) else None,
+            message="入力値の検証に失敗しました",
+            details=BatchService.error_details(error)
+        )
+
+    @staticmethod
+    def validate_rows(rows: Sequence[RawRow]) -> List[Union[Dict, BatchRowResult]]:
+        """
+        複数行をまとめて検証する
+
+        OnboardingRequest を1行ずつ生成せず、同じ型・制約の行のリストとして pydantic-core で1回に検証し、
+        サニタイズはまとめて行う（結果は OnboardingRequest.model_validate(...).model_dump() と同じ辞書）。
+        不正な行は OnboardingRequest で検証し直し、行ごとの検証と同じエラー詳細を返す。
+
+        Args:
+            rows: (行番号, 行データ) のシーケンス
+
+        Returns:
+            List[Union[Dict, BatchRowResult]]: 入力と同じ順序の検証結果（検証済みの行データ または エラー結果）
+        """
+        prepared = [BatchService.prepare_row(row_number, row) for row_number, row in rows]
+        positions = [index for index, data in enumerate(prepared) if type(data) is dict]
+        if not positions:
+            return prepared
+
+        started = time.perf_counter()
+        invalid: Set[int] = set()
+        try:
+            validated = _ROWS_ADAPTER.validate_python([prepared[index] for index in positions])
+        except ValidationError as e:
+            # 不正な行を除いて検証し直す（エラーの位置は検証したリスト内の添字）
+            invalid = {positions[error["loc"][0]] for error in e.errors()}
+            positions = [index for index in positions if index not in invalid]
+            validated = _ROWS_ADAPTER.validate_python([prepared[index] for index in positions])
+
+        results: List[Union[Dict, BatchRowResult]] = list(prepared)
+        for index, data in zip(positions, validated):
+            if sanitize_onboarding_row(data):
+                results[index] = data
+            else:
+                invalid.add(index)
+        STAGE_SECONDS.observe(time.perf_counter() - started, "batch", "bulk_validation")
+
+        for index in invalid:
+            row_number = rows[index][0]
+            try:
+                results[index] = OnboardingRequest.model_validate(prepared[index]).model_dump()
+            except ValidationError as e:
+                results[index] = BatchService.validation_error_result(row_number, prepared[index], e)
+        return results
+
+    @staticmethod
+    def iter_validated(
+        rows: Iterable[RawRow],
+        chunk_size: int = VALIDATION_CHUNK_SIZE
+    ) -> Iterator[Tuple[int, Union[Dict, BatchRowResult]]]:
+        """
+        行を chunk_size 行ずつまとめて検証するジェネレーター
+
+        Args:
+            rows: (行番号, 行データ) のイテラブル
+            chunk_size: まとめて検証する行数
+
+        Yields:
+            Tuple[int, Union[Dict, BatchRowResult]]: (行番号, 検証済みの行データ または エラー結果)
+        """
+        iterator = iter(rows)
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                return
+            for (row_number, _), result in zip(chunk, BatchService.validate_rows(chunk)):
+                yield row_number, result
+
+    @staticmethod
+    def validation_report(rows: Iterable[RawRow]) -> ValidationReport:
+        """
+        入力全体を検証し、行ごとのエラー（行番号・項目・理由）を集約する（生成は行わない）
+
+        Args:
+            rows: (行番号, 行データ) のイテラブル
+
+        Returns:
+            ValidationReport: 行数とエラーの一覧
+        """
+        total = 0
+        invalid = 0
+        errors: List[RowValidationError] = []
+        for row_number, result in BatchService.iter_validated(rows):
+            total += 1
+            if not isinstance(result, BatchRowResult):
+                continue
+            invalid += 1
+            if result.details:
+                errors.extend(
+                    RowValidationError(row=row_number, field=detail["field"], reason=detail["reason"])
+                    for detail in result.details
+                )
+            else:
+                errors.append(RowValidationError(row=row_number, reason=result.message or ""))
+        return ValidationReport(total=total, valid=total - invalid, invalid=invalid, errors=errors)
+
+    @staticmethod
+    def generate_row(
+        row_number: int,
+        request_dict: Dict,
+        registry: Optional[UpnRegistry] = None,
+        mail_nickname: Optional[str] = None,
+        layout: Optional[str] = None
+    ) -> BatchRowResult:
+        """
+        検証済みの1行分の判断とコマンド生成を行う（エラーは結果として返す）
+
+        Args:
+            row_number: 行番号
+            request_dict: 検証済みの行データ（OnboardingRequest.model_dump() と同じ辞書）
+            registry: MailNicknameの重複管理（一括処理内の同姓同名に連番を付与する）
+            mail_nickname: 割り当て済みのMailNickname
+            layout: バンドル形式のレイアウト（指定時はスクリプト全体ではなく1行分を生成する）
+
+        Returns:
+            BatchRowResult: 行ごとの処理結果
+        """
+        started = time.perf_counter()
+        try:
+            judgment = JudgmentService.judge(request_dict)
+            judged = time.perf_counter()
+            STAGE_SECONDS.observe(judged - started, "batch", "judge")
+            if layout is not None:
+                powershell_command = CommandGenerator.generate_bundle_row(
+                    request_dict,
+                    judgment,
+                    row_number=row_number,
+                    registry=registry,
+                    mail_nickname=mail_nickname,
+                    layout=layout
+                )
+            else:
+                powershell_command = CommandGenerator.generate_command(
+                    request_dict,
+                    judgment=judgment,
+                    registry=registry,
+                    mail_nickname=mail_nickname
+                )
+            STAGE_SECONDS.observe(time.perf_counter() - judged, "batch", "generate")
+        except ValueError as e:
+            ERRORS_TOTAL.inc("batch", type(e).__name__)
+            return BatchRowResult(
+                row=row_number,
+                status="error",
+                employee_name=request_dict["employee_name"],
+                message=str(e)
+            )
+
+        GENERATED_TOTAL.inc("batch", judgment.employment_type, judgment.license_sku)
+        history_store = get_history_store()
+        if history_store is not None:
+            history_store.record("batch", request_dict, judgment, powershell_command)
+        STAGE_SECONDS.observe(time.perf_counter() - started, "batch", "total")
+        return BatchRowResult(
+            row=row_number,
+            status="success",
+            employee_name=request_dict["employee_name"],
+            judgment=JudgmentService.generate_judgment_text(judgment),
+            powershell_command=powershell_command
+        )
+
+    @staticmethod
+    def generate_rows(
+        rows: Sequence[Tuple[int, Union[Dict, BatchRowResult]]],
+        registry: Optional[UpnRegistry] = None,
+        mail_nicknames: Optional[Sequence[Optional[str]]] = None,
+        layout: Optional[str] = None
+    ) -> List[BatchRowResult]:
+        """
+        検証済みの複数行の判断とコマンド生成を列指向でまとめて行う（エラーは結果として返す）
+
+        顧客・雇用形態・部署が同じ行の判断とテンプレートの共通部分は1回だけ処理する（ColumnarBatch）。
+        結果は行ごとの generate_row と同じ（生成日時はチャンク内で共通）。
+
+        Args:
+            rows: (行番号, 検証済みの行データ または 検証エラーの結果) のシーケンス
+            registry: MailNicknameの重複管理（一括処理内の同姓同名に連番を付与する）
+            mail_nicknames: 行ごとの割り当て済みのMailNickname
+            layout: バンドル形式のレイアウト（指定時はスクリプト全体ではなく1行分を生成する）
+
+        Returns:
+            List[BatchRowResult]: 入力と同じ順序の処理結果
+        """
+        started = time.perf_counter()
+        positions = [index for index, (_, data) in enumerate(rows) if not isinstance(data, BatchRowResult)]
+        batch = ColumnarBatch(
+            [rows[index] for index in positions],
+            registry=registry,
+            mail_nicknames=[mail_nicknames[index] for index in positions] if mail_nicknames is not None else None,
+            layout=layout
+        )
+        prepared = time.perf_counter()
+        STAGE_SECONDS.observe(prepared - started, "batch", "columnar_prepare")
+        commands = batch.commands()
+        STAGE_SECONDS.observe(time.perf_counter() - prepared, "batch", "columnar_render")
+
+        results: List[BatchRowResult] = [data for _, data in rows]
+        group_rows = [0] * len(batch.groups)
+        history_store = get_history_store()
+        for index, group_code, powershell_command in zip(positions, batch.group_codes, commands):
+            row_number, request_dict = rows[index]
+            group = batch.groups[group_code]
+            group_rows[group_code] += 1
+            if group.error is not None:
+                results[index] = BatchRowResult(
+                    row=row_number,
+                    status="error",
+                    employee_name=request_dict["employee_name"],
+                    message=str(group.error)
+                )
+                continue
+            if history_store is not None:
+                history_store.record("batch", request_dict, group.judgment, powershell_command)
+            results[index] = BatchRowResult.model_construct(
+                row=row_number,
+                status="success",
+                employee_name=request_dict["employee_name"],
+                judgment=group.judgment_text,
+                powershell_command=powershell_command
+            )
+
+        # メトリクスは組み合わせごとにまとめて加算する
+        for group, count in zip(batch.groups, group_rows):
+            if group.error is not None:
+                ERRORS_TOTAL.inc("batch", type(group.error).__name__, amount=count)
+            else:
+                GENERATED_TOTAL.inc("batch", group.judgment.employment_type, group.judgment.license_sku, amount=count)
+        STAGE_SECONDS.observe(time.perf_counter() - started, "batch", "columnar_total")
+        return results
+
+    @staticmethod
+    def process_row(
+        row_number: int,
+        row: object,
+        registry: Optional[UpnRegistry] = None,
+        mail_nickname: Optional[str] = None,
+        layout: Optional[str] = None
+    ) -> BatchRowResult:
+        """
+        1行分の検証・判断・コマンド生成を行う（エラーは結果として返す）
+
+        Args:
+            row_number: 行番号
+            row: 行データ（辞書）または解析エラー
+            registry: MailNicknameの重複管理（一括処理内の同姓同名に連番を付与する）
+            mail_nickname: 割り当て済みのMailNickname
+            layout: バンドル形式のレイアウト（指定時はスクリプト全体ではなく1行分を生成する）
+
+        Returns:
+            BatchRowResult: 行ごとの処理結果
+        """
+        data = BatchService.prepare_row(row_number, row)
+        if isinstance(data, BatchRowResult):
+            return data
+
+        started = time.perf_counter()
+        try:
+            request = OnboardingRequest.model_validate(data)
+        except ValidationError as e:
+            return BatchService.validation_error_result(row_number, data, e)
+        STAGE_SECONDS.observe(time.perf_counter() - started, "batch", "validation")
+        return BatchService.generate_row(row_number, request.model_dump(), registry, mail_nickname, layout)
+
+    @staticmethod
+    def process_rows(
+        rows: Iterable[RawRow],
+        registry: Optional[UpnRegistry] = None,
+        layout: Optional[str] = None
+    ) -> Iterator[BatchRowResult]:
+        """
+        行を逐次処理するジェネレーター（検証と生成は VALIDATION_CHUNK_SIZE 行ずつまとめて行う）
+
+        Args:
+            rows: (行番号, 行データ) のイテラブル
+            registry: MailNicknameの重複管理
+                （省略時は発行済みストア、ストアも無い場合はこの一括処理内のみで重複を確認する）
+            layout: バンドル形式のレイアウト（省略時は行ごとにスクリプト全体を生成する）
+        """
+        if registry is None:
+            registry = CommandGenerator.upn_registry or UpnRegistry()
+        try:
+            iterator = iter(rows)
+            while True:
+                chunk = list(itertools.islice(iterator, VALIDATION_CHUNK_SIZE))
+                if not chunk:
+                    return
+                validated = BatchService.validate_rows(chunk)
+                yield from BatchService.generate_rows(
+                    [(row_number, result) for (row_number, _), result in zip(chunk, validated)],
+                    registry,
+                    layout=layout
+                )
+        finally:
+            registry.flush()
+
+    @staticmethod
+    def render_ndjson(results: Iterable[BatchRowResult]) -> Iterator[bytes]:
+        """
+        処理結果をNDJSON（1行1結果）として出力する
+
+        Yields:
+            bytes: 1結果分のJSON行
+        """
+        for result in results:
+            yield result.model_dump_json(exclude_none=True).encode("utf-8") + b"\n"
+
+    @staticmethod
+    def render_ps1(results: Iterable[BatchRowResult]) -> Iterator[bytes]:
+        """
+        処理結果を1つの連結された .ps1 として出力する
+        エラー行はコメントとして出力し、スクリプト全体は中断しない
+
+        Yields:
+            bytes: 1結果分のスクリプト断片
+        """
+        for result in results:
+            if result.status == "success":
+                chunk = (
+                    f"{BatchService.row_header(result.row, result.employee_name or '')}\n"
+                    f"{result.powershell_command}\n\n"
+                )
+            else:
+                chunk = BatchService.error_comment(result) + "\n"
+            yield chunk.encode("utf-8")
+
+    @staticmethod
+    def row_header(row_number: int, employee_name: str) -> str:
+        """
+        連結された .ps1 の行ごとの見出しコメント
+
+        従業員名は検証時に制御文字を含まないことを確認済みだが、コメントの外に値が出ないよう
+        見出しでも制御文字を空白に置き換える
+
+        Args:
+            row_number: 行番号
+            employee_name: 従業員名
+
+        Returns:
+            str: 見出しコメント（改行なし）
+        """
+        return f"# ----- 行 {row_number}: {CONTROL_CHARS_PATTERN.sub(' ', employee_name)} -----"
+
+    @staticmethod
+    def error_comment(result: BatchRowResult) -> str:
+        """エラー行をスクリプト内のコメントに変換する"""
+        comment = f"# [ERROR] 行 {result.row}: {result.message}\n"
+        for detail in result.details or []:
+            comment += f"#   - {detail['field']}: {detail['reason']}\n"
+        return comment
+
+    @staticmethod
+    def render_bundle(
+        results: Iterable[BatchRowResult],
+        layout: str = CommandGenerator.LAYOUT_BUNDLE,
+        generated_at: Optional[str] = None
+    ) -> Iterator[bytes]:
+        """
+        処理結果をバンドル形式の .ps1 として出力する
+        共通関数と Microsoft Graph への接続を先頭に1回だけ出力し、従業員ごとは1行にする
+
+        Args:
+            results: 処理結果（layout と同じレイアウトで生成したもの）
+            layout: レイアウト（bundle / graph）
+            generated_at: 生成日時（省略時は現在時刻）
+
+        Yields:
+            bytes: 先頭部分、1結果分の行、末尾部分
+        """
+        yield CommandGenerator.render_bundle_header(layout, generated_at).encode("utf-8")
+        yield from BatchService.render_bundle_rows(results)
+        yield CommandGenerator.bundle_footer(layout).encode("utf-8")
+
+    @staticmethod
+    def render_bundle_rows(results: Iterable[BatchRowResult]) -> Iterator[bytes]:
+        """
+        バンドル形式の従業員ごとの行を出力する（先頭・末尾部分を除く）
+
+        Yields:
+            bytes: 1結果分の行
+        """
+        for result in results:
+            if result.status == "success":
+                line = f"{result.powershell_command}\n"
+            else:
+                line = BatchService.error_comment(result)
+            yield line.encode("utf-8")
+
+    @staticmethod
+    def render_rows(results: Iterable[BatchRowResult], output_format: str) -> Iterator[bytes]:
+        """
+        処理結果を出力形式に応じて出力する（バンドル形式の先頭・末尾部分を除く）
+
+        非同期ジョブのようにチャンク単位で出力を追記する場合に使用する
+
+        Args:
+            results: 処理結果
+            output_format: 出力形式（ndjson / ps1 / bundle / graph）
+
+        Returns:
+            Iterator[bytes]: 出力のバイト列ジェネレーター
+        """
+        if output_format in BatchService.BUNDLE_LAYOUTS:
+            return BatchService.render_bundle_rows(results)
+        if output_format == BatchService.OUTPUT_PS1:
+            return BatchService.render_ps1(results)
+        return BatchService.render_ndjson(results)
+
+    @staticmethod
+    def stream(stream: BinaryIO, input_format: str, output_format: str) -> Iterator[bytes]:
+        """
+        入力ストリームから出力バイト列までのパイプラインを構築する
+
+        Args:
+            stream: 入力のバイナリストリーム
+            input_format: 入力形式（csv / jsonl）
+            output_format: 出力形式（ndjson / ps1 / bundle / graph）
+
+        Returns:
+            Iterator[bytes]: 出力のバイト列ジェネレーター
+        """
+        layout = BatchService.BUNDLE_LAYOUTS.get(output_format)
+        results = BatchService.process_rows(BatchService.iter_rows(stream, input_format), layout=layout)
+        if layout is not None:
+            return BatchService.render_bundle(results, layout)
+        return BatchService.render_rows(results, output_format)
@@ -0,0 +1,164 @@
+"""
+列指向の一括生成モジュール
+検証済みの行を列（従業員名・顧客・雇用形態・部署）ごとの配列に読み込み、繰り返しの多い列を
+重複を除いた値に置き換えて（factorize）、顧客・雇用形態・部署の組み合わせごとに1回だけ
+テナントドメインの解決・判断・テンプレートの共通部分の埋め込みを行う。
+行ごとには従業員名と MailNickname（と行番号）だけを埋め込む。
+
+HRエクスポートは同じ顧客・部署の行が大半を占めるため、組み合わせの数は行数よりはるかに少ない。
+出力は行ごとの JudgmentService.judge + CommandGenerator.generate_command と同じ
+（有効期限の基準日と生成日時はチャンク単位で1回だけ取得する）。
+"""
+
+from datetime import date, datetime
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from app.models import JudgmentResult
+from app.services.command_generator import CommandGenerator
+from app.services.judgment_service import JudgmentService
+from app.services.template_cache import CompiledTemplate
+from app.services.upn_registry import UpnRegistry
+
+
+def factorize(values: Sequence[Hashable]) -> Tuple[List[int], List[Hashable]]:
+    """
+    列を、行ごとのコードと重複を除いた値の一覧に変換する
+
+    Args:
+        values: 列の値
+
+    Returns:
+        Tuple[List[int], List[Hashable]]: (行ごとのコード, 出現順の値の一覧)
+    """
+    index: Dict[Hashable, int] = {}
+    codes = [index.setdefault(value, len(index)) for value in values]
+    return codes, list(index)
+
+
+class BatchGroup:
+    """顧客・雇用形態・部署が同じ行で共通の処理結果"""
+
+    __slots__ = ("tenant_domain", "judgment", "judgment_text", "template", "error")
+
+    def __init__(
+        self,
+        tenant_domain: str,
+        judgment: Optional[JudgmentResult] = None,
+        judgment_text: Optional[str] = None,
+        template: Optional[CompiledTemplate] = None,
+        error: Optional[ValueError] = None
+    ):
+        self.tenant_domain = tenant_domain
+        self.judgment = judgment
+        self.judgment_text = judgment_text
+        self.template = template
+        self.error = error
+
+
+class ColumnarBatch:
+    """
+    検証済みの行のチャンクを列指向で生成する
+
+    Args:
+        rows: (行番号, 検証済みの行データ) のシーケンス
+        registry: MailNicknameの重複管理（省略時は CommandGenerator.upn_registry）
+        mail_nicknames: 行ごとの割り当て済みのMailNickname（指定時は生成・重複確認を行わない）
+        layout: バンドル形式のレイアウト（指定時はスクリプト全体ではなく1行分を生成する）
+        today: 有効期限計算の基準日（省略時は当日）
+        generated_at: 生成日時（省略時は現在時刻）
+    """
+
+    def __init__(
+        self,
+        rows: Sequence[Tuple[int, Dict]],
+        registry: Optional[UpnRegistry] = None,
+        mail_nicknames: Optional[Sequence[Optional[str]]] = None,
+        layout: Optional[str] = None,
+        today: Optional[date] = None,
+        generated_at: Optional[str] = None
+    ):
+        if layout is not None:
+            CommandGenerator.get_bundle_layout(layout)
+        self.registry = registry or CommandGenerator.upn_registry
+        self.layout = layout
+        self.today = today or date.today()
+        self.generated_at = generated_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        # 列ごとの配列に読み込む
+        self.row_numbers = [row_number for row_number, _ in rows]
+        self.employee_names = [data.get("employee_name", "") for _, data in rows]
+        self.mail_nicknames = list(mail_nicknames) if mail_nicknames is not None else [None] * len(rows)
+        company_codes, self.companies = factorize([data.get("company", "") for _, data in rows])
+        keys = zip(
+            company_codes,
+            (data.get("employment_type") for _, data in rows),
+            (data.get("department", "") for _, data in rows)
+        )
+        self.group_codes, self.group_keys = factorize(list(keys))
+        self.groups = self._build_groups()
+
+    def _build_groups(self) -> List[BatchGroup]:
+        """組み合わせごとにテナントドメインの解決・判断・テンプレートの共通部分の埋め込みを行う"""
+        tenant_domains = [CommandGenerator.resolve_tenant_domain(company) for company in self.companies]
+        groups: List[BatchGroup] = []
+        for company_code, employment_type, department in self.group_keys:
+            tenant_domain = tenant_domains[company_code]
+            request_data = {
+                "company": self.companies[company_code],
+                "employment_type": employment_type,
+                "department": department,
+            }
+            try:
+                judgment = JudgmentService.judge(request_data, self.today)
+            except ValueError as e:
+                groups.append(BatchGroup(tenant_domain, error=e))
+                continue
+            variables = CommandGenerator.shared_variables(tenant_domain, department, judgment, self.generated_at)
+            if self.layout is not None:
+                template = CommandGenerator.bind_bundle_row(variables, self.layout)
+            else:
+                template = CommandGenerator.bind_command_template(variables, judgment)
+            groups.append(BatchGroup(
+                tenant_domain,
+                judgment=judgment,
+                judgment_text=JudgmentService.generate_judgment_text(judgment),
+                template=template
+            ))
+        return groups
+
+    def commands(self) -> List[Optional[str]]:
+        """
+        行ごとのスクリプトを生成する（MailNicknameの割り当ては行の順に行う）
+
+        Returns:
+            List[Optional[str]]: 行ごとのスクリプト（判断できない行は None）
+        """
+        # ローマ字への変換は従業員名ごとに1回だけ行う
+        romanized: Dict[str, str] = {}
+        literal = CommandGenerator.ps_literal
+        registry = self.registry
+        bundle = self.layout is not None
+        commands: List[Optional[str]] = []
+        for row_number, employee_name, mail_nickname, group_code in zip(
+            self.row_numbers, self.employee_names, self.mail_nicknames, self.group_codes
+        ):
+            group = self.groups[group_code]
+            if group.template is None:
+                commands.append(None)
+                continue
+            if mail_nickname is None:
+                mail_nickname = romanized.get(employee_name)
+                if mail_nickname is None:
+                    mail_nickname = romanized[employee_name] = CommandGenerator.generate_sam_account_name(employee_name)
+                if registry is not None:
+                    mail_nickname = registry.reserve(group.tenant_domain, mail_nickname)
+            if bundle:
+                variables = {
+                    "row": str(int(row_number)),
+                    "employee_name": literal(employee_name),
+                    "sam_account_name": literal(mail_nickname),
+                }
+            else:
+                variables = {"employee_name": employee_name, "sam_account_name": mail_nickname}
+            commands.append(group.template.render(variables))
+        return commands
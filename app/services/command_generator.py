@@ -3,12 +3,37 @@ PowerShellコマンド生成サービス
 テンプレートベースでPowerShellコマンドを生成する
 """
 
-import os
-import re
+import logging
+import time
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.metrics import TEMPLATE_SECONDS, register_cache_counters
 from app.models import JudgmentResult
+from app.services.template_cache import CompiledTemplate, TemplateCache, TemplateSlot
+from app.services.domain_resolver import DomainResolver, fallback_domain_base
+from app.services.romanizer import Romanizer
+from app.services.upn_registry import UpnRegistry
+
+logger = logging.getLogger(__name__)
+
+
+def load_precompiled_templates() -> Dict[str, CompiledTemplate]:
+    """
+    事前コンパイル済みのテンプレートを読み込む（python -m app.build で生成）
+    
+    Returns:
+        Dict[str, CompiledTemplate]: テンプレート名 → コンパイル済みテンプレート（未生成の場合は空）
+    """
+    try:
+        from app.services.precompiled_templates import TEMPLATES
+    except ImportError:
+        return {}
+    return {
+        name: CompiledTemplate.from_parts(name, parts, slots, digest)
+        for name, (digest, parts, slots) in TEMPLATES.items()
+    }
 
 
 class CommandGenerator:
@@ -20,45 +45,118 @@ class CommandGenerator:
     # テンプレートファイル名（Entra ID用）
     TEMPLATE_REGULAR = "onboarding_regular.ps1"  # 正社員用（Entra ID専用）
     TEMPLATE_CONTRACT = "onboarding_contract.ps1"  # 派遣用（Entra ID専用）
+    TEMPLATE_BUNDLE = "onboarding_bundle.ps1"  # 一括出力用（共通関数を1回だけ出力し、従業員ごとは1行の呼び出し）
+    TEMPLATE_GRAPH_BATCH = "onboarding_graph_batch.ps1"  # 一括出力用（Graph の $batch でまとめて送信）
+    
+    # バンドル形式のレイアウト（共通部分を先頭に1回だけ出力し、従業員ごとは1行）
+    LAYOUT_BUNDLE = "bundle"  # New-OnboardingUser の呼び出し（従業員ごとに Graph API を呼び出す）
+    LAYOUT_GRAPH_BATCH = "graph"  # $Users.Add(...) のデータ行（作成・ライセンス付与を $batch で20件ずつ送信）
+    
+    # レイアウト → (先頭部分のテンプレート, 末尾部分)
+    BUNDLE_LAYOUTS = {
+        LAYOUT_BUNDLE: (TEMPLATE_BUNDLE, "\nWrite-OnboardingSummary\n"),
+        LAYOUT_GRAPH_BATCH: (TEMPLATE_GRAPH_BATCH, "\nInvoke-OnboardingGraphBatch -Users $Users\n"),
+    }
+    
+    # バンドル形式の1行の書式: レイアウト → (先頭, 項目の区切り, 項目名の書式, 末尾)
+    BUNDLE_ROW_FORMATS = {
+        LAYOUT_BUNDLE: ("New-OnboardingUser ", " ", "-{} ", ""),
+        LAYOUT_GRAPH_BATCH: ("$Users.Add(@{ ", "; ", "{} = ", " })"),
+    }
+    
+    # 従業員ごとに異なる変数（それ以外の変数は顧客・雇用形態・部署が同じ行で共通）
+    PERSONAL_VARIABLES = ("employee_name", "sam_account_name")
+    
+    # PowerShell が単一引用符として扱う文字（文字列リテラル内では2つ重ねてエスケープする）
+    _PS_SINGLE_QUOTES = ("'", "\u2018", "\u2019", "\u201a", "\u201b")
+    
+    # コンパイル済みテンプレートのキャッシュ（ファイル更新時は自動で再読み込み）
+    # python -m app.build で生成した事前コンパイル済みモジュールがあれば初期状態として使用する
+    template_cache = TemplateCache(TEMPLATE_DIR, precompiled=load_precompiled_templates())
+    
+    # 氏名の読み辞書（姓・名のトライ木、初回使用時に1回だけ読み込む）
+    READINGS_PATH = Path(__file__).parent.parent.parent / "data" / "name_readings.tsv"
+    romanizer: Optional[Romanizer] = None
+    
+    # 顧客名 → テナントドメインのインデックス（起動時に load_domain_map でマッピング表を読み込む）
+    domain_resolver = DomainResolver()
+    
+    # 発行済みMailNicknameの重複管理（起動時に configure_upn_registry でストアを設定する）
+    upn_registry: Optional[UpnRegistry] = None
+    
+    @staticmethod
+    def get_romanizer() -> Romanizer:
+        """氏名の読み辞書を取得する（初回呼び出し時に読み込む）"""
+        if CommandGenerator.romanizer is None:
+            CommandGenerator.romanizer = Romanizer.from_file(CommandGenerator.READINGS_PATH)
+        return CommandGenerator.romanizer
     
     @staticmethod
     def generate_sam_account_name(employee_name: str) -> str:
         """
         従業員名からMailNicknameを生成（Entra ID用）
         
+        漢字・かなの氏名は読み辞書でローマ字に変換し、姓と名を "." で連結する
+        
         Args:
             employee_name: 従業員名（例: "山田 太郎"）
             
         Returns:
             str: MailNickname（例: "yamada.taro"）
         """
-        # 日本語名をローマ字に変換する簡易実装
-        # 実際の運用では、より正確なローマ字変換ライブラリを使用することを推奨
-        name = employee_name.strip()
-        
-        # スペースを削除
-        name = name.replace(" ", "").replace("　", "")
-        
-        # 簡易的な変換テーブル（実際の運用ではより完全な変換が必要）
-        # ここでは英数字のみを許可し、その他は削除
-        name = re.sub(r'[^a-zA-Z0-9]', '', name)
+        name = CommandGenerator.get_romanizer().romanize(employee_name.strip())
         
-        # 小文字に変換
-        name = name.lower()
-        
-        # 空の場合はデフォルト値を返す
+        # 変換できない場合（読み辞書に無い漢字を含む場合など）はデフォルト値を返す
         if not name:
+            logger.warning("従業員名をローマ字に変換できないため、MailNickname に既定値 \"user\" を使用します")
             name = "user"
         
-        # Entra ID の MailNickname は64文字まで
-        name = name[:64]
-        
         return name
     
     @staticmethod
+    def assign_mail_nickname(
+        employee_name: str,
+        tenant_domain: str,
+        registry: Optional[UpnRegistry] = None
+    ) -> str:
+        """
+        テナント内で重複しないMailNicknameを割り当てる
+        
+        Args:
+            employee_name: 従業員名
+            tenant_domain: テナントドメイン
+            registry: 重複管理（省略時は upn_registry、どちらも無い場合は重複確認しない）
+            
+        Returns:
+            str: MailNickname（重複時は "yamada.taro2" のように連番を付与）
+        """
+        mail_nickname = CommandGenerator.generate_sam_account_name(employee_name)
+        registry = registry or CommandGenerator.upn_registry
+        if registry is not None:
+            mail_nickname = registry.reserve(tenant_domain, mail_nickname)
+        return mail_nickname
+    
+    @staticmethod
+    def configure_upn_registry(store_path: Optional[str]) -> Optional[UpnRegistry]:
+        """
+        発行済みMailNicknameのストアを設定する
+        
+        Args:
+            store_path: SQLiteストアのパス（省略時は単発リクエストの重複確認を行わない）
+            
+        Returns:
+            Optional[UpnRegistry]: 設定した重複管理
+        """
+        if CommandGenerator.upn_registry is not None:
+            CommandGenerator.upn_registry.close()
+        CommandGenerator.upn_registry = UpnRegistry(store_path) if store_path else None
+        return CommandGenerator.upn_registry
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
     def generate_company_domain(company: str) -> str:
         """
-        顧客名からドメイン名を生成
+        顧客名からドメイン名を生成（マッピング表に無い場合の簡易生成）
         
         Args:
             company: 顧客名（例: "株式会社サンプル"）
@@ -66,25 +164,42 @@ class CommandGenerator:
         Returns:
             str: ドメイン名（例: "sample.co.jp"）
         """
-        # 会社名からドメインを生成する簡易実装
-        # 実際の運用では、会社名とドメインのマッピングテーブルを使用することを推奨
+        # 全角・半角の統一と「株式会社」「有限会社」などの除去を行い、英数字のみを使用
+        domain_base = fallback_domain_base(company)
         
-        # 会社名の前後の「株式会社」「有限会社」などを削除
-        domain_base = re.sub(r'^(株式会社|有限会社|合同会社|合資会社|合名会社)', '', company)
-        domain_base = re.sub(r'(株式会社|有限会社|合同会社|合資会社|合名会社)$', '', domain_base)
-        
-        # 英数字以外を削除
-        domain_base = re.sub(r'[^a-zA-Z0-9]', '', domain_base)
+        # ドメイン形式に変換（簡易版: .co.jpを追加）
+        return f"{domain_base}.co.jp"
+    
+    @staticmethod
+    def resolve_tenant_domain(company: str) -> str:
+        """
+        顧客名からテナントドメインを解決する
         
-        # 小文字に変換
-        domain_base = domain_base.lower()
+        マッピング表（顧客名・別名 → テナントドメイン）を優先し、
+        該当しない場合は顧客名から簡易生成した onmicrosoft.com ドメインを返す
         
-        # 空の場合はデフォルト値を返す
-        if not domain_base:
-            domain_base = "company"
+        Args:
+            company: 顧客名（例: "株式会社サンプル"）
+            
+        Returns:
+            str: テナントドメイン（例: "sample.onmicrosoft.com"）
+        """
+        return CommandGenerator.domain_resolver.resolve(company)
+    
+    @staticmethod
+    def load_domain_map(path: Optional[str]) -> DomainResolver:
+        """
+        顧客名 → テナントドメインのマッピング表（CSV/SQLite）を読み込む
         
-        # ドメイン形式に変換（簡易版: .co.jpを追加）
-        return f"{domain_base}.co.jp"
+        Args:
+            path: マッピング表のパス（省略時はマッピングなし）
+            
+        Returns:
+            DomainResolver: 読み込んだインデックス
+        """
+        resolver = DomainResolver.from_file(Path(path)) if path else DomainResolver()
+        CommandGenerator.domain_resolver = resolver
+        return resolver
     
     @staticmethod
     def load_template(template_name: str) -> str:
@@ -109,66 +224,315 @@ class CommandGenerator:
             return f.read()
     
     @staticmethod
-    def generate_command(
+    def get_compiled_template(template_name: str) -> CompiledTemplate:
+        """
+        コンパイル済みのPowerShellテンプレートをキャッシュから取得する
+        
+        Args:
+            template_name: テンプレートファイル名
+            
+        Returns:
+            CompiledTemplate: コンパイル済みテンプレート
+            
+        Raises:
+            FileNotFoundError: テンプレートファイルが見つからない場合
+        """
+        return CommandGenerator.template_cache.get(template_name)
+    
+    @staticmethod
+    def preload_templates() -> None:
+        """起動時に全テンプレートをコンパイルしてキャッシュし、読み辞書を読み込む"""
+        CommandGenerator.template_cache.preload()
+        CommandGenerator.get_romanizer()
+    
+    @staticmethod
+    def build_variables(
         request_data: Dict,
-        judgment: JudgmentResult
-    ) -> str:
+        judgment: JudgmentResult,
+        registry: Optional[UpnRegistry] = None,
+        mail_nickname: Optional[str] = None
+    ) -> Dict[str, str]:
         """
-        PowerShellコマンドを生成する（Entra ID用、AI判断結果に基づく）
+        テンプレートに埋め込む変数を準備する（テナントドメインの解決とMailNicknameの割り当てを含む）
         
         Args:
             request_data: リクエストデータ
             judgment: AI判断結果（ライセンス種別を含む）
+            registry: MailNicknameの重複管理（省略時は upn_registry を使用）
+            mail_nickname: 割り当て済みのMailNickname（指定時は生成・重複確認を行わない）
             
         Returns:
-            str: 生成されたPowerShellコマンド
+            Dict[str, str]: 変数名（波括弧なし）と値の辞書
         """
-        # テンプレートを選択（雇用形態に基づく）
-        if judgment.employment_type == "正社員":
-            template_name = CommandGenerator.TEMPLATE_REGULAR
-        else:  # 派遣
-            template_name = CommandGenerator.TEMPLATE_CONTRACT
-        
-        # テンプレートを読み込む
-        template = CommandGenerator.load_template(template_name)
-        
-        # 変数を準備
         employee_name = request_data.get("employee_name", "")
         company = request_data.get("company", "")
         department = request_data.get("department", "")
         
-        # MailNicknameを生成（英数字のみ）
-        mail_nickname = CommandGenerator.generate_sam_account_name(employee_name)
-        
-        # テナントドメインを生成（簡易版）
-        company_domain_base = CommandGenerator.generate_company_domain(company)
-        # onmicrosoft.com形式に変換
-        tenant_domain = f"{company_domain_base.split('.')[0]}.onmicrosoft.com"
+        # テナントドメインを解決（マッピング表 → 簡易生成の順）
+        tenant_domain = CommandGenerator.resolve_tenant_domain(company)
         
-        # UserPrincipalNameを生成
-        user_principal_name = f"{mail_nickname}@{tenant_domain}"
+        # MailNicknameを生成（ローマ字、英数字と "."）し、テナント内で重複しないよう連番を付与
+        if mail_nickname is None:
+            mail_nickname = CommandGenerator.assign_mail_nickname(
+                employee_name,
+                tenant_domain,
+                registry
+            )
         
         generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         # 変数をマッピング
         variables = {
-            "{employee_name}": employee_name,
-            "{sam_account_name}": mail_nickname,
-            "{company_domain}": tenant_domain,
-            "{department}": department,
-            "{generated_at}": generated_at,
-            "{license_sku}": judgment.license_sku,
-            "{license_type}": judgment.license_type,
+            "employee_name": employee_name,
+            "sam_account_name": mail_nickname,
+        }
+        variables.update(CommandGenerator.shared_variables(tenant_domain, department, judgment, generated_at))
+        return variables
+    
+    @staticmethod
+    def shared_variables(
+        tenant_domain: str,
+        department: str,
+        judgment: JudgmentResult,
+        generated_at: str
+    ) -> Dict[str, str]:
+        """
+        テンプレートに埋め込む変数のうち、従業員ごとに異ならないもの
+        
+        Args:
+            tenant_domain: テナントドメイン
+            department: 部署
+            judgment: AI判断結果（ライセンス種別を含む）
+            generated_at: 生成日時
+            
+        Returns:
+            Dict[str, str]: 変数名（波括弧なし）と値の辞書（PERSONAL_VARIABLES 以外）
+        """
+        variables = {
+            "company_domain": tenant_domain,
+            "department": department,
+            "generated_at": generated_at,
+            "license_sku": judgment.license_sku,
+            "license_type": judgment.license_type,
         }
         
         # 派遣の場合は有効期限も追加
         if judgment.expiration_date:
-            variables["{contract_end_date}"] = judgment.expiration_date
+            variables["contract_end_date"] = judgment.expiration_date
+        return variables
+    
+    @staticmethod
+    def select_template(judgment: JudgmentResult) -> str:
+        """雇用形態に基づいてテンプレートを選択する"""
+        if judgment.employment_type == "正社員":
+            return CommandGenerator.TEMPLATE_REGULAR
+        return CommandGenerator.TEMPLATE_CONTRACT  # 派遣
+    
+    @staticmethod
+    def generate_command(
+        request_data: Dict,
+        judgment: JudgmentResult,
+        registry: Optional[UpnRegistry] = None,
+        mail_nickname: Optional[str] = None
+    ) -> str:
+        """
+        PowerShellコマンドを生成する（Entra ID用、AI判断結果に基づく）
+        
+        Args:
+            request_data: リクエストデータ
+            judgment: AI判断結果（ライセンス種別を含む）
+            registry: MailNicknameの重複管理（省略時は upn_registry を使用）
+            mail_nickname: 割り当て済みのMailNickname（指定時は生成・重複確認を行わない）
+            
+        Returns:
+            str: 生成されたPowerShellコマンド
+        """
+        # コンパイル済みテンプレートを取得（雇用形態に基づいて選択、キャッシュ済み）
+        started = time.perf_counter()
+        template = CommandGenerator.get_compiled_template(CommandGenerator.select_template(judgment))
+        TEMPLATE_SECONDS.observe(time.perf_counter() - started, "load")
+        
+        variables = CommandGenerator.build_variables(request_data, judgment, registry, mail_nickname)
+        
+        # テンプレート内の変数を1回の走査で置換
+        started = time.perf_counter()
+        command = template.render(variables)
+        TEMPLATE_SECONDS.observe(time.perf_counter() - started, "render")
+        return command
+    
+    @staticmethod
+    def ps_literal(value: str) -> str:
+        """
+        文字列をPowerShellの単一引用符リテラルに変換する（変数展開・式の評価を行わない）
+        
+        Args:
+            value: 文字列
+            
+        Returns:
+            str: 単一引用符で囲んだリテラル（例: 'O''Brien'）
+        """
+        for quote in CommandGenerator._PS_SINGLE_QUOTES:
+            if quote in value:
+                value = value.replace(quote, quote * 2)
+        return f"'{value}'"
+    
+    @staticmethod
+    def get_bundle_layout(layout: str) -> Tuple[str, str]:
+        """
+        バンドル形式のレイアウトを取得する
+        
+        Args:
+            layout: レイアウト（bundle / graph）
+            
+        Returns:
+            Tuple[str, str]: (先頭部分のテンプレート名, 末尾部分)
+            
+        Raises:
+            ValueError: 未対応のレイアウトの場合
+        """
+        try:
+            return CommandGenerator.BUNDLE_LAYOUTS[layout]
+        except KeyError:
+            raise ValueError(f"未対応の出力レイアウトです: {layout}") from None
+    
+    @staticmethod
+    def render_bundle_header(layout: str = LAYOUT_BUNDLE, generated_at: Optional[str] = None) -> str:
+        """
+        バンドル形式の先頭部分（共通関数の定義と Microsoft Graph への接続）を生成する
+        
+        Args:
+            layout: レイアウト（bundle / graph）
+            generated_at: 生成日時（省略時は現在時刻）
+            
+        Returns:
+            str: スクリプトの先頭部分
+        """
+        template_name, _ = CommandGenerator.get_bundle_layout(layout)
+        template = CommandGenerator.get_compiled_template(template_name)
+        if generated_at is None:
+            generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return template.render({"generated_at": generated_at})
+    
+    @staticmethod
+    def bundle_footer(layout: str = LAYOUT_BUNDLE) -> str:
+        """バンドル形式の末尾部分（従業員ごとの行の後に出力する）を取得する"""
+        return CommandGenerator.get_bundle_layout(layout)[1]
+    
+    @staticmethod
+    def generate_bundle_row(
+        request_data: Dict,
+        judgment: JudgmentResult,
+        row_number: int = 1,
+        registry: Optional[UpnRegistry] = None,
+        mail_nickname: Optional[str] = None,
+        layout: str = LAYOUT_BUNDLE
+    ) -> str:
+        """
+        バンドル形式の従業員1名分の行を生成する
         
-        # テンプレート内の変数を置換
-        command = template
-        for key, value in variables.items():
-            command = command.replace(key, str(value))
+        - bundle: New-OnboardingUser の呼び出し
+        - graph: $Users.Add(@{ ... }) のデータ行
         
+        Args:
+            request_data: リクエストデータ
+            judgment: AI判断結果（ライセンス種別を含む）
+            row_number: 行番号（実行時のメッセージ・$batch の要求IDに使用）
+            registry: MailNicknameの重複管理（省略時は upn_registry を使用）
+            mail_nickname: 割り当て済みのMailNickname（指定時は生成・重複確認を行わない）
+            layout: レイアウト（bundle / graph）
+            
+        Returns:
+            str: 1行分のスクリプト
+        """
+        CommandGenerator.get_bundle_layout(layout)
+        started = time.perf_counter()
+        variables = CommandGenerator.build_variables(request_data, judgment, registry, mail_nickname)
+        literal = CommandGenerator.ps_literal
+        fields = [
+            ("Row", str(int(row_number))),
+            ("DisplayName", literal(variables["employee_name"])),
+            ("MailNickname", literal(variables["sam_account_name"])),
+            *CommandGenerator.bundle_shared_fields(variables),
+        ]
+        command = "".join(CommandGenerator.bundle_row_values(fields, layout))
+        TEMPLATE_SECONDS.observe(time.perf_counter() - started, "render")
         return command
+    
+    @staticmethod
+    def bundle_shared_fields(variables: Dict[str, str]) -> List[Tuple[str, str]]:
+        """バンドル形式の1行の項目のうち、従業員ごとに異ならないもの（項目名, PowerShellのリテラル）"""
+        literal = CommandGenerator.ps_literal
+        fields = [
+            ("Domain", literal(variables["company_domain"])),
+            ("Department", literal(variables["department"])),
+            ("LicenseSku", literal(variables["license_sku"])),
+            ("LicenseType", literal(variables["license_type"])),
+        ]
+        if "contract_end_date" in variables:
+            fields.append(("ContractEndDate", literal(variables["contract_end_date"])))
+        return fields
+    
+    @staticmethod
+    def bundle_row_values(fields: Sequence[Tuple[str, str]], layout: str) -> List[str]:
+        """
+        バンドル形式の1行を、連結する文字列の並びとして組み立てる
+        
+        - bundle: New-OnboardingUser -Row 1 -DisplayName '...' ...
+        - graph: $Users.Add(@{ Row = 1; DisplayName = '...'; ... })
+        
+        Args:
+            fields: (項目名, 値) のリスト（値には TemplateSlot も指定できる）
+            layout: レイアウト（bundle / graph）
+            
+        Returns:
+            List[str]: 連結すると1行になる文字列の並び
+        """
+        prefix, separator, label, suffix = CommandGenerator.BUNDLE_ROW_FORMATS[layout]
+        values = [prefix]
+        for index, (name, value) in enumerate(fields):
+            values.append((separator if index else "") + label.format(name))
+            values.append(value)
+        values.append(suffix)
+        return values
+    
+    @staticmethod
+    def bind_bundle_row(variables: Dict[str, str], layout: str = LAYOUT_BUNDLE) -> CompiledTemplate:
+        """
+        従業員ごとに異ならない項目を埋め込んだ、バンドル形式の1行のテンプレートを作成する（一括処理用）
+        
+        残りの変数（row / employee_name / sam_account_name）には PowerShell のリテラルに変換済みの値を渡す
+        
+        Args:
+            variables: 従業員ごとに異ならない変数（shared_variables）
+            layout: レイアウト（bundle / graph）
+            
+        Returns:
+            CompiledTemplate: 1行分のテンプレート
+        """
+        CommandGenerator.get_bundle_layout(layout)
+        fields = [
+            ("Row", TemplateSlot("row")),
+            ("DisplayName", TemplateSlot("employee_name")),
+            ("MailNickname", TemplateSlot("sam_account_name")),
+            *CommandGenerator.bundle_shared_fields(variables),
+        ]
+        return CompiledTemplate.from_values(f"{layout}_row", CommandGenerator.bundle_row_values(fields, layout))
+    
+    @staticmethod
+    def bind_command_template(variables: Dict[str, str], judgment: JudgmentResult) -> CompiledTemplate:
+        """
+        従業員ごとに異ならない変数を埋め込んだスクリプトのテンプレートを作成する（一括処理用）
+        
+        Args:
+            variables: 従業員ごとに異ならない変数（shared_variables）
+            judgment: AI判断結果（テンプレートの選択に使用）
+            
+        Returns:
+            CompiledTemplate: employee_name / sam_account_name だけを変数として残したテンプレート
+        """
+        template = CommandGenerator.get_compiled_template(CommandGenerator.select_template(judgment))
+        return template.bind(variables)
+
+# テンプレートキャッシュのヒット・ミス件数を /metrics に公開
+register_cache_counters("template_cache", CommandGenerator.template_cache, "テンプレートキャッシュ")
 
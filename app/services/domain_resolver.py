@@ -0,0 +1,188 @@
+"""
+テナントドメイン解決サービス
+顧客名（別名を含む）からテナントドメインへのマッピング表をメモリ上のインデックスとして保持する
+"""
+
+import csv
+import html
+import re
+import sqlite3
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+
+# 法人格の表記（前株・後株の両方を除去する）
+_LEGAL_FORMS = (
+    "株式会社", "有限会社", "合同会社", "合資会社", "合名会社",
+    "一般社団法人", "一般財団法人", "(株)", "(有)", "(同)",
+)
+_LEGAL_FORM_PATTERN = "|".join(re.escape(form) for form in _LEGAL_FORMS)
+_LEGAL_PREFIX_PATTERN = re.compile(rf"^(?:{_LEGAL_FORM_PATTERN})+")
+_LEGAL_SUFFIX_PATTERN = re.compile(rf"(?:{_LEGAL_FORM_PATTERN})+$")
+# 英語表記の法人格（例: "Contoso Co., Ltd."）
+_LEGAL_SUFFIX_EN_PATTERN = re.compile(
+    r"[\s,.]+(?:co\.?,?\s*ltd\.?|inc\.?|corp\.?|corporation|k\.?k\.?|llc|ltd\.?)$",
+    re.IGNORECASE
+)
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_NON_DOMAIN_CHARS_PATTERN = re.compile(r"[^a-z0-9]")
+
+# マッピング表の別名の区切り文字
+ALIAS_SEPARATOR = "|"
+
+
+def normalize_company_name(company: str) -> str:
+    """
+    顧客名を検索用に正規化する
+
+    - HTMLエスケープの解除（リクエストはエスケープ済みのため）
+    - 全角・半角の統一（NFKC）、英字の小文字化
+    - 空白の除去
+    - 法人格（株式会社・(株)・Co., Ltd. など）の除去
+
+    Args:
+        company: 顧客名
+
+    Returns:
+        str: 正規化した顧客名
+    """
+    name = unicodedata.normalize("NFKC", html.unescape(company)).strip()
+    name = _LEGAL_SUFFIX_EN_PATTERN.sub("", name)
+    name = _WHITESPACE_PATTERN.sub("", name)
+    name = _LEGAL_PREFIX_PATTERN.sub("", name)
+    name = _LEGAL_SUFFIX_PATTERN.sub("", name)
+    return name.lower()
+
+
+def fallback_domain_base(company: str) -> str:
+    """
+    マッピング表に無い顧客名からドメインの元になる文字列を生成する
+
+    正規化後の英数字のみを使用し、残らない場合は "company" を返す
+
+    Args:
+        company: 顧客名
+
+    Returns:
+        str: ドメインの元になる文字列（例: "sample"）
+    """
+    return _NON_DOMAIN_CHARS_PATTERN.sub("", normalize_company_name(company)) or "company"
+
+
+class DomainResolver:
+    """
+    顧客名からテナントドメインを解決するインデックス
+
+    正規化済みの顧客名・別名をキーとする辞書で検索し、
+    マッピング表に無い顧客名は簡易生成（フォールバック）する。
+    同じ顧客名の解決結果は上限付きのLRUキャッシュに保持する。
+    """
+
+    def __init__(self, cache_size: int = 65536):
+        self._index: Dict[str, str] = {}
+        self.source: Optional[str] = None
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def add(self, company: str, domain: str, aliases: Iterable[str] = ()) -> None:
+        """
+        マッピングを1件追加する
+
+        Args:
+            company: 顧客名
+            domain: テナントドメイン（例: "contoso.onmicrosoft.com"）
+            aliases: 顧客名の別名
+        """
+        domain = domain.strip().lower()
+        if not domain:
+            raise ValueError(f"ドメインが空です: {company}")
+        for name in (company, *aliases):
+            key = normalize_company_name(name)
+            if key:
+                self._index[key] = domain
+        self.resolve.cache_clear()
+
+    def load(self, entries: Iterable[Tuple[str, str, str]]) -> int:
+        """
+        (顧客名, ドメイン, 別名) の組をまとめて読み込む
+
+        Returns:
+            int: 読み込んだ件数
+        """
+        count = 0
+        for company, domain, aliases in entries:
+            alias_list = [a for a in (aliases or "").split(ALIAS_SEPARATOR) if a.strip()]
+            self.add(company, domain, alias_list)
+            count += 1
+        return count
+
+    @classmethod
+    def from_file(cls, path: Path, cache_size: int = 65536) -> "DomainResolver":
+        """
+        マッピング表（CSV または SQLite）を読み込む
+
+        CSV: ヘッダー行 company,domain,aliases（別名は | 区切り、省略可）
+        SQLite: company_domains テーブル（company, domain, aliases 列）
+
+        Args:
+            path: マッピング表のパス
+            cache_size: LRUキャッシュの上限件数
+
+        Returns:
+            DomainResolver: 読み込み済みのインデックス
+
+        Raises:
+            FileNotFoundError: ファイルが見つからない場合
+            ValueError: 必須の列（company, domain）が無い場合、またはドメインが空の行がある場合
+        """
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"ドメインマッピング表が見つかりません: {path}")
+
+        resolver = cls(cache_size=cache_size)
+        if path.suffix.lower() in (".db", ".sqlite", ".sqlite3"):
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                rows = conn.execute("SELECT company, domain, aliases FROM company_domains")
+                resolver.load(rows)
+            except sqlite3.OperationalError as e:
+                raise ValueError(f"ドメインマッピング表を読み込めません: {path}（{e}）") from e
+            finally:
+                conn.close()
+        else:
+            with open(path, "r", encoding="utf-8-sig", newline="") as f:
+                reader = csv.DictReader(f)
+                missing = [name for name in ("company", "domain") if name not in (reader.fieldnames or [])]
+                if missing:
+                    raise ValueError(
+                        f"ドメインマッピング表に必須の列がありません: {path}（{', '.join(missing)}）"
+                    )
+                try:
+                    resolver.load(
+                        (row["company"] or "", row["domain"] or "", row.get("aliases") or "")
+                        for row in reader
+                    )
+                except ValueError as e:
+                    raise ValueError(f"ドメインマッピング表の {reader.line_num} 行目を読み込めません: {path}（{e}）") from e
+        resolver.source = str(path)
+        return resolver
+
+    def lookup(self, company: str) -> Optional[str]:
+        """
+        マッピング表のみを検索する（フォールバックしない）
+
+        Returns:
+            Optional[str]: テナントドメイン（該当なしの場合は None）
+        """
+        return self._index.get(normalize_company_name(company))
+
+    def _resolve(self, company: str) -> str:
+        """テナントドメインを解決する（LRUキャッシュ経由で呼び出す）"""
+        domain = self._index.get(normalize_company_name(company))
+        if domain is not None:
+            return domain
+        return f"{fallback_domain_base(company)}.onmicrosoft.com"
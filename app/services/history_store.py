@@ -0,0 +1,336 @@
+"""
+生成履歴ストア
+生成したPowerShellコマンドを、リクエスト内容・判断結果とともに追記専用で保存し、
+顧客名・従業員名・雇用形態・日時で検索できるようにする。
+
+書き込みはリクエストの処理から切り離し、バックグラウンドのスレッドがまとめて行う。
+検索は生成日時の降順のキーセットページネーション（前ページ最後の (生成日時, ID) より前のものを取得）で、
+件数が増えても OFFSET のように読み飛ばす行が増えない。
+"""
+
+import hashlib
+import html
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.metrics import HISTORY_TOTAL
+from app.models import HistoryEntry
+
+logger = logging.getLogger(__name__)
+
+
+# 検索結果で返す列（リクエスト内容・スクリプト本文は1件取得時のみ）
+HISTORY_COLUMNS = (
+    "id", "created_at", "endpoint", "company", "employee_name", "employment_type",
+    "department", "user_type", "license_sku", "script_sha256", "script_bytes"
+)
+
+
+class HistoryStore:
+    """
+    生成履歴の SQLite ストア（WAL）
+
+    - record: 書き込みキューに追加するだけで、リクエストの処理をブロックしない
+      （キューが満杯の場合は破棄して件数を記録する）
+    - 書き込みスレッド: flush_size 件または flush_interval 秒ごとに1トランザクションでまとめて書き込む
+    - search: 顧客名・雇用形態は完全一致、従業員名は前方一致、日時は範囲で絞り込み、新しい順に返す
+    """
+
+    def __init__(
+        self,
+        store_path: str,
+        flush_size: int = 500,
+        flush_interval: float = 0.5,
+        queue_size: int = 10000
+    ):
+        self.store_path = store_path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue(maxsize=queue_size)
+        self._read_lock = threading.Lock()
+        self._write_conn = self._connect(Path(store_path))
+        self._read_conn = sqlite3.connect(store_path, check_same_thread=False, timeout=30)
+        self._writer = threading.Thread(target=self._run_writer, name="history-writer", daemon=True)
+        self._writer.start()
+
+    @staticmethod
+    def _connect(path: Path) -> sqlite3.Connection:
+        """SQLite ストアを開き、テーブルとインデックスを作成する"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS generation_history ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " created_at REAL NOT NULL,"
+            " endpoint TEXT NOT NULL,"
+            " company TEXT NOT NULL,"
+            " employee_name TEXT NOT NULL,"
+            " employment_type TEXT NOT NULL,"
+            " department TEXT,"
+            " user_type TEXT,"
+            " license_sku TEXT,"
+            " request TEXT NOT NULL,"
+            " script_sha256 TEXT NOT NULL,"
+            " script_bytes INTEGER NOT NULL,"
+            " script_zlib BLOB NOT NULL"
+            ")"
+        )
+        # 絞り込み条件 + 生成日時（並び順）の複合インデックスで、条件に一致する行を新しい順に読み進める
+        # （インデックスの末尾には暗黙に ID が含まれるため、(生成日時, ID) の順に並ぶ）
+        conn.execute("CREATE INDEX IF NOT EXISTS history_company ON generation_history (company, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS history_employee ON generation_history (employee_name, created_at)")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS history_employment ON generation_history (employment_type, created_at)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS history_created ON generation_history (created_at)")
+        conn.commit()
+        return conn
+
+    def record(self, endpoint: str, request_data: Dict, judgment, script: str) -> bool:
+        """
+        生成結果を書き込みキューに追加する
+
+        Args:
+            endpoint: 生成元（onboarding / batch）
+            request_data: 検証済みのリクエストデータ
+            judgment: 判断結果（JudgmentResult）
+            script: 生成したPowerShellコマンド
+
+        Returns:
+            bool: キューに追加できた場合は True（満杯で破棄した場合は False）
+        """
+        # JSON化・ハッシュ値の計算・圧縮は書き込みスレッドで行う
+        row = (time.time(), endpoint, request_data, judgment.user_type, judgment.license_sku, script)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            HISTORY_TOTAL.inc("dropped")
+            return False
+        HISTORY_TOTAL.inc("queued")
+        return True
+
+    def _run_writer(self) -> None:
+        """書き込みキューから取り出した行をまとめて書き込む（書き込みスレッド）"""
+        pending: List[Tuple] = []
+        running = True
+        while running:
+            deadline = time.monotonic() + self.flush_interval
+            while len(pending) < self.flush_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if row is None:
+                    self._queue.task_done()
+                    running = False
+                    break
+                pending.append(row)
+            if pending:
+                self._write([self._to_record(row) for row in pending])
+                for _ in pending:
+                    self._queue.task_done()
+                pending = []
+
+    @staticmethod
+    def _to_record(row: Tuple) -> Tuple:
+        """キューの行を保存する形式（リクエストのJSON・スクリプトのハッシュ値と圧縮データ）に変換する"""
+        created_at, endpoint, request_data, user_type, license_sku, script = row
+        encoded = script.encode("utf-8")
+        return (
+            created_at,
+            endpoint,
+            request_data.get("company", ""),
+            request_data.get("employee_name", ""),
+            request_data.get("employment_type", ""),
+            request_data.get("department"),
+            user_type,
+            license_sku,
+            json.dumps(request_data, ensure_ascii=False, separators=(",", ":")),
+            hashlib.sha256(encoded).hexdigest(),
+            len(encoded),
+            zlib.compress(encoded, 6),
+        )
+
+    def _write(self, rows: List[Tuple]) -> None:
+        """1トランザクションで書き込む（失敗しても書き込みスレッドは止めない）"""
+        try:
+            with self._write_conn:
+                self._write_conn.executemany(
+                    "INSERT INTO generation_history (created_at, endpoint, company, employee_name,"
+                    " employment_type, department, user_type, license_sku, request, script_sha256,"
+                    " script_bytes, script_zlib) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+            HISTORY_TOTAL.inc("written", amount=len(rows))
+        except sqlite3.Error as e:
+            HISTORY_TOTAL.inc("failed", amount=len(rows))
+            logger.error(f"生成履歴の書き込みに失敗しました（{len(rows)} 件）: {e}")
+
+    def search(
+        self,
+        company: Optional[str] = None,
+        employee_name: Optional[str] = None,
+        employment_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[Tuple[float, int]] = None,
+        limit: int = 50
+    ) -> List[Dict]:
+        """
+        生成履歴を新しい順に検索する（スクリプト本文は含まない）
+
+        Args:
+            company: 顧客名（完全一致）
+            employee_name: 従業員名（前方一致）
+            employment_type: 雇用形態（完全一致）
+            since: この日時以降
+            until: この日時より前
+            cursor: 前ページの最後の (生成日時, ID)（キーセットページネーションのカーソル、parse_cursor で取得）
+            limit: 取得件数
+
+        Returns:
+            List[Dict]: 生成履歴（新しい順）
+        """
+        conditions: List[str] = []
+        params: List[object] = []
+        # 保存されている値はリクエストの検証時にHTMLエスケープ済みのため、検索条件も同じ形にする
+        if company:
+            conditions.append("company = ?")
+            params.append(html.escape(company))
+        if employee_name:
+            # 前方一致はインデックスを使えるよう範囲条件にする（LIKE は大文字小文字を区別しないため使わない）
+            prefix = html.escape(employee_name.strip())
+            conditions.append("employee_name >= ? AND employee_name < ?")
+            params.extend([prefix, prefix + "\U0010ffff"])
+        if employment_type:
+            conditions.append("employment_type = ?")
+            params.append(employment_type)
+        # 従業員名の指定時は、期間（1か月分など）より絞り込める従業員名のインデックスを使わせる
+        created_at = "+created_at" if employee_name else "created_at"
+        if since is not None:
+            conditions.append(f"{created_at} >= ?")
+            params.append(since.timestamp())
+        if until is not None:
+            conditions.append(f"{created_at} < ?")
+            params.append(until.timestamp())
+        if cursor is not None:
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend(cursor)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = (
+            f"SELECT {', '.join(HISTORY_COLUMNS)} FROM generation_history{where}"
+            " ORDER BY created_at DESC, id DESC LIMIT ?"
+        )
+        params.append(limit)
+        with self._read_lock:
+            rows = self._read_conn.execute(sql, params).fetchall()
+        return [dict(zip(HISTORY_COLUMNS, row)) for row in rows]
+
+    def get(self, history_id: int) -> Optional[Dict]:
+        """
+        生成履歴を1件取得する（リクエスト内容・スクリプト本文を含む）
+
+        Args:
+            history_id: 生成履歴の ID
+
+        Returns:
+            Optional[Dict]: 生成履歴（存在しない場合は None）
+        """
+        with self._read_lock:
+            row = self._read_conn.execute(
+                f"SELECT {', '.join(HISTORY_COLUMNS)}, request, script_zlib FROM generation_history WHERE id = ?",
+                (history_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(HISTORY_COLUMNS, row))
+        entry["request"] = json.loads(row[-2])
+        entry["powershell_command"] = zlib.decompress(row[-1]).decode("utf-8")
+        return entry
+
+    @staticmethod
+    def make_cursor(entry: Dict) -> str:
+        """検索結果の最後の履歴から次のページのカーソルを作成する"""
+        return f"{entry['created_at']!r}_{entry['id']}"
+
+    @staticmethod
+    def parse_cursor(cursor: str) -> Tuple[float, int]:
+        """
+        カーソルを (生成日時, ID) に変換する
+
+        Raises:
+            ValueError: カーソルの形式が不正な場合
+        """
+        created_at, _, history_id = cursor.partition("_")
+        return float(created_at), int(history_id)
+
+    @staticmethod
+    def to_entry(entry: Dict) -> HistoryEntry:
+        """検索結果・1件取得の結果をAPIのレスポンスに変換する"""
+        return HistoryEntry(
+            **{**entry, "created_at": datetime.fromtimestamp(entry["created_at"]).isoformat(timespec="seconds")}
+        )
+
+    def flush(self) -> None:
+        """キューに追加済みの行がすべて書き込まれるまで待つ（ベンチマーク・CLIなどで検索の前に反映させる場合）"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """キューに残っている分を書き込んでストアを閉じる"""
+        self._queue.put(None)
+        self._writer.join()
+        self._write_conn.close()
+        with self._read_lock:
+            self._read_conn.close()
+
+
+# アプリケーション全体で共有するストア
+_history_store: Optional[HistoryStore] = None
+
+
+def get_history_store() -> Optional[HistoryStore]:
+    """共有の生成履歴ストアを取得する（未設定の場合は None）"""
+    return _history_store
+
+
+def configure_history_store(settings) -> Optional[HistoryStore]:
+    """
+    共有の生成履歴ストアを設定する（アプリケーション起動時）
+
+    Args:
+        settings: アプリケーション設定（history_store_path が未指定の場合は履歴を保存しない）
+
+    Returns:
+        Optional[HistoryStore]: 生成履歴ストア
+    """
+    global _history_store
+    close_history_store()
+    if settings.history_store_path:
+        _history_store = HistoryStore(
+            settings.history_store_path,
+            flush_size=settings.history_flush_size,
+            flush_interval=settings.history_flush_interval,
+            queue_size=settings.history_queue_size
+        )
+    return _history_store
+
+
+def close_history_store() -> None:
+    """共有の生成履歴ストアを閉じる（アプリケーション終了時）"""
+    global _history_store
+    if _history_store is not None:
+        _history_store.close()
+        _history_store = None
@@ -0,0 +1,241 @@
+"""
+冪等性ストア
+同じ入社処理リクエスト（Idempotency-Key ヘッダー、または有効にした場合は内容のハッシュ値）に対して、
+以前に生成したレスポンスを返すための上限・有効期間付きストア。
+メモリ上のLRU層と、再起動後も残り複数ワーカーで共有できるSQLite層の2段構成。
+
+内容のハッシュ値による判定は、同じ顧客・部署・雇用形態の同姓同名の別人にも同じスクリプト
+（同じ MailNickname）を返してしまうため、既定では無効とし、有効にする場合も二重クリックや
+プロキシのリトライを吸収する程度の短い有効期間（秒単位）で使用する。
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.services.ttl_cache import TTLCache
+
+
+# Idempotency-Key ヘッダーの最大長
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# 保存するレコード: (リクエスト内容のハッシュ値, レスポンスJSON)
+StoredResponse = Tuple[str, str]
+
+
+class IdempotencyConflictError(ValueError):
+    """同じ Idempotency-Key が異なるリクエスト内容で使用された場合のエラー"""
+
+
+def request_fingerprint(request_data: Dict) -> str:
+    """
+    リクエスト内容のハッシュ値を求める（項目の順序に依存しない）
+
+    Args:
+        request_data: 検証済みのリクエストデータ
+
+    Returns:
+        str: SHA-256 のハッシュ値
+    """
+    payload = json.dumps(request_data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    冪等性キー → 生成済みレスポンスのストア
+
+    - メモリ層: TTL付きLRU（プロセス内）
+    - SQLite層（store_path 指定時）: 主キー検索、期限切れのレコードは定期的に削除する
+    """
+
+    # 期限切れのレコードを削除する間隔（保存回数）
+    PURGE_EVERY = 1000
+
+    def __init__(self, max_size: int = 10000, ttl: float = 86400.0, store_path: Optional[str] = None):
+        self.ttl = ttl
+        self.store_path = store_path
+        self._memory: TTLCache[StoredResponse] = TTLCache(max_size=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        if store_path:
+            self._conn = self._connect(Path(store_path))
+
+    @staticmethod
+    def _connect(path: Path) -> sqlite3.Connection:
+        """SQLite ストアを開き、テーブルを作成する"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency_keys ("
+            " key TEXT NOT NULL PRIMARY KEY,"
+            " fingerprint TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " expires_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        conn.commit()
+        return conn
+
+    @staticmethod
+    def make_key(idempotency_key: Optional[str], fingerprint: str, hash_fallback: bool = False) -> Optional[str]:
+        """
+        ストアのキーを生成する
+
+        Idempotency-Key ヘッダーがあればその値、無ければ hash_fallback の場合のみリクエスト内容の
+        ハッシュ値を使用する（両者が衝突しないよう接頭辞で区別する）
+
+        Returns:
+            Optional[str]: ストアのキー（重複を判定しない場合は None）
+        """
+        if idempotency_key:
+            return f"key:{idempotency_key}"
+        if hash_fallback:
+            return f"hash:{fingerprint}"
+        return None
+
+    def get(self, key: str, fingerprint: str) -> Optional[str]:
+        """
+        保存済みのレスポンスを取得する
+
+        Args:
+            key: ストアのキー（make_key で生成）
+            fingerprint: 今回のリクエスト内容のハッシュ値
+
+        Returns:
+            Optional[str]: レスポンスJSON（未保存・期限切れの場合は None）
+
+        Raises:
+            IdempotencyConflictError: 同じキーが異なるリクエスト内容で保存されている場合
+        """
+        with self._lock:
+            stored = self._memory.get(key)
+            if stored is None and self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT fingerprint, response, expires_at FROM idempotency_keys WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                if row is not None and row[2] > time.time():
+                    stored = (row[0], row[1])
+                    self._memory.set(key, stored, ttl=row[2] - time.time())
+        if stored is None:
+            return None
+        if stored[0] != fingerprint:
+            raise IdempotencyConflictError("Idempotency-Key が異なるリクエスト内容で既に使用されています")
+        return stored[1]
+
+    def put(self, key: str, fingerprint: str, response: str, ttl: Optional[float] = None) -> str:
+        """
+        レスポンスを保存する
+
+        他のリクエストが先に同じキーを保存していた場合は、そちらのレスポンスを返す
+        （同時に届いた重複リクエストにも同じ結果を返すため）
+
+        Args:
+            key: ストアのキー
+            fingerprint: リクエスト内容のハッシュ値
+            response: レスポンスJSON
+            ttl: 保持期間（秒、省略時は既定の保持期間）
+
+        Returns:
+            str: 保存されているレスポンスJSON
+
+        Raises:
+            IdempotencyConflictError: 同じキーが異なるリクエスト内容で先に保存されている場合
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            if self._conn is None:
+                stored = self._memory.get(key)
+                if stored is not None:
+                    if stored[0] != fingerprint:
+                        raise IdempotencyConflictError("Idempotency-Key が異なるリクエスト内容で既に使用されています")
+                    return stored[1]
+            else:
+                now = time.time()
+                with self._conn:
+                    # 期限切れのレコードは上書きできるよう先に削除する
+                    self._conn.execute(
+                        "DELETE FROM idempotency_keys WHERE key = ? AND expires_at <= ?",
+                        (key, now)
+                    )
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO idempotency_keys (key, fingerprint, response, expires_at)"
+                        " VALUES (?, ?, ?, ?)",
+                        (key, fingerprint, response, now + ttl)
+                    )
+                    row = self._conn.execute(
+                        "SELECT fingerprint, response FROM idempotency_keys WHERE key = ?",
+                        (key,)
+                    ).fetchone()
+                self._writes += 1
+                if self._writes % self.PURGE_EVERY == 0:
+                    self._purge_locked(now)
+                if row is not None:
+                    if row[0] != fingerprint:
+                        raise IdempotencyConflictError("Idempotency-Key が異なるリクエスト内容で既に使用されています")
+                    response = row[1]
+            self._memory.set(key, (fingerprint, response), ttl=ttl)
+            return response
+
+    async def get_async(self, key: str, fingerprint: str) -> Optional[str]:
+        """get をイベントループを止めずに実行する（SQLite層を使う場合はスレッドで実行）"""
+        if self._conn is None:
+            return self.get(key, fingerprint)
+        return await asyncio.to_thread(self.get, key, fingerprint)
+
+    async def put_async(self, key: str, fingerprint: str, response: str, ttl: Optional[float] = None) -> str:
+        """put をイベントループを止めずに実行する（SQLite層を使う場合はスレッドで実行）"""
+        if self._conn is None:
+            return self.put(key, fingerprint, response, ttl)
+        return await asyncio.to_thread(self.put, key, fingerprint, response, ttl)
+
+    def _purge_locked(self, now: float) -> None:
+        """期限切れのレコードを削除する（ロック取得済みで呼び出す）"""
+        with self._conn:
+            self._conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def close(self) -> None:
+        """ストアを閉じる"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# アプリケーション全体で共有するストア
+_idempotency_store: Optional[IdempotencyStore] = None
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """共有の冪等性ストアを取得する（初回呼び出し時に設定から作成）"""
+    global _idempotency_store
+    if _idempotency_store is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _idempotency_store = IdempotencyStore(
+            max_size=settings.idempotency_cache_size,
+            ttl=settings.idempotency_ttl,
+            store_path=settings.idempotency_store_path
+        )
+    return _idempotency_store
+
+
+def close_idempotency_store() -> None:
+    """共有の冪等性ストアを閉じる（アプリケーション終了時）"""
+    global _idempotency_store
+    if _idempotency_store is not None:
+        _idempotency_store.close()
+        _idempotency_store = None
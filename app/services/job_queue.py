@@ -0,0 +1,545 @@
+"""
+非同期ジョブキュー
+大量の一括処理（数千〜数万行）を受け付けてすぐにジョブIDを返し、
+バックグラウンドのワーカーがチャンク単位で判断・コマンド生成を行う。
+
+ジョブの状態と進捗は SQLite（<jobs_dir>/jobs.db）に、入力・出力のファイルは
+<jobs_dir>/<ジョブID>/ に保存する。チャンクごとに出力の追記と進捗の保存を行うため、
+再起動しても実行中のジョブは最後に保存したチャンクの続きから再開する。
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+from app.metrics import JOBS_TOTAL
+from app.models import BatchRowResult, JobResponse
+from app.services.batch_service import BatchService, RawRow
+from app.services.command_generator import CommandGenerator
+from app.services.upn_registry import UpnRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class JobNotFoundError(LookupError):
+    """指定されたジョブが存在しない場合のエラー"""
+
+
+class JobNotReadyError(RuntimeError):
+    """ジョブの成果物がまだ作成されていない場合のエラー"""
+
+
+class JobStore:
+    """
+    ジョブの状態・進捗を保存する SQLite ストア
+
+    進捗（処理済み行数・出力のバイト数）はチャンクごとに更新し、
+    再開時は処理済み行の読み飛ばしと、出力ファイルの切り詰めに使用する
+    """
+
+    COLUMNS = (
+        "id", "status", "input_format", "output_format", "filename", "generated_at",
+        "total_rows", "processed_rows", "succeeded", "failed", "artifact_bytes",
+        "error", "created_at", "updated_at", "finished_at"
+    )
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT NOT NULL PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " input_format TEXT NOT NULL,"
+            " output_format TEXT NOT NULL,"
+            " filename TEXT,"
+            " generated_at TEXT NOT NULL,"
+            " total_rows INTEGER,"
+            " processed_rows INTEGER NOT NULL DEFAULT 0,"
+            " succeeded INTEGER NOT NULL DEFAULT 0,"
+            " failed INTEGER NOT NULL DEFAULT 0,"
+            " artifact_bytes INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " finished_at REAL"
+            ")"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._conn.commit()
+
+    def create(
+        self,
+        job_id: str,
+        input_format: str,
+        output_format: str,
+        filename: Optional[str],
+        generated_at: str
+    ) -> Dict:
+        """ジョブを登録する（状態は queued）"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, input_format, output_format, filename, generated_at,"
+                " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, JobQueue.STATUS_QUEUED, input_format, output_format, filename, generated_at, now, now)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """ジョブを取得する（存在しない場合は None）"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        return dict(zip(self.COLUMNS, row)) if row is not None else None
+
+    def update(self, job_id: str, **fields) -> None:
+        """ジョブの項目を更新する（更新日時も記録する）"""
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id)
+            )
+
+    def unfinished(self) -> List[str]:
+        """未完了（queued / running）のジョブIDを登録順に取得する"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JobQueue.STATUS_QUEUED, JobQueue.STATUS_RUNNING)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def finished_before(self, before: float) -> List[str]:
+        """指定時刻より前に完了したジョブIDを取得する"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (before,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete(self, job_id: str) -> None:
+        """ジョブを削除する"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def close(self) -> None:
+        """ストアを閉じる"""
+        with self._lock:
+            self._conn.close()
+
+
+class _JobRun:
+    """実行中のジョブ（入力の読み込み位置・MailNicknameの重複管理・出力ファイル）"""
+
+    def __init__(self, job: Dict, job_dir: Path):
+        self.job_id: str = job["id"]
+        self.output_format: str = job["output_format"]
+        self.layout: Optional[str] = BatchService.BUNDLE_LAYOUTS.get(self.output_format)
+        self.processed_rows: int = job["processed_rows"]
+        self.succeeded: int = job["succeeded"]
+        self.failed: int = job["failed"]
+        self.input = open(job_dir / JobQueue.INPUT_NAME, "rb")
+        rows = BatchService.iter_rows(self.input, job["input_format"])
+        # 処理済みの行は読み飛ばす（行番号は入力ファイル内の位置のまま）
+        self.rows: Iterator[RawRow] = itertools.islice(rows, self.processed_rows, None)
+
+        # 発行済みストアが無い場合は、ジョブごとのストアで一括処理内の重複を管理する
+        # （チャンクの終了時にだけ書き込み、再開時は処理済みチャンクで発行した名前を引き継ぐ）
+        self.own_registry = CommandGenerator.upn_registry is None
+        if self.own_registry:
+            self.registry = UpnRegistry(str(job_dir / JobQueue.REGISTRY_NAME), exclusive=True)
+        else:
+            self.registry = CommandGenerator.upn_registry
+
+        # 前回保存したチャンクの後に書きかけの出力があれば切り詰める
+        self.output = open(job_dir / JobQueue.PARTIAL_NAME, "ab")
+        self.output.truncate(job["artifact_bytes"])
+        self.output.seek(job["artifact_bytes"])
+        if job["artifact_bytes"] == 0 and self.layout is not None:
+            header = CommandGenerator.render_bundle_header(self.layout, job["generated_at"])
+            self.output.write(header.encode("utf-8"))
+
+    def count(self, results: Iterable[BatchRowResult]) -> Iterator[BatchRowResult]:
+        """成功・失敗の件数を数えながら結果を渡す"""
+        for result in results:
+            if result.status == "success":
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            self.processed_rows += 1
+            yield result
+
+    def close(self) -> None:
+        """ファイル・ジョブごとのストアを閉じる"""
+        self.input.close()
+        self.output.close()
+        if self.own_registry:
+            self.registry.close()
+
+
+class JobQueue:
+    """
+    一括処理のジョブキュー
+
+    - submit: 入力ファイルを保存してジョブを登録し、すぐに返す
+    - ワーカー（asyncio タスク、workers 個）: ジョブを1件ずつ取り出し、
+      chunk_size 行ごとにスレッドで処理して出力の追記・進捗の保存を行う
+    - start: 未完了のジョブを登録順にキューへ戻す（再起動後の再開）
+    """
+
+    # ジョブの状態
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+
+    # ジョブディレクトリ内のファイル名
+    INPUT_NAME = "input"
+    PARTIAL_NAME = "output.part"
+    REGISTRY_NAME = "upns.db"
+
+    # 出力形式 → 成果物のファイル名
+    ARTIFACT_NAMES = {
+        BatchService.OUTPUT_NDJSON: "onboarding_batch.ndjson",
+        BatchService.OUTPUT_PS1: "onboarding_batch.ps1",
+        BatchService.OUTPUT_BUNDLE: "onboarding_batch.ps1",
+        BatchService.OUTPUT_GRAPH: "onboarding_batch.ps1",
+    }
+
+    def __init__(self, jobs_dir: str, workers: int = 2, chunk_size: int = 500, ttl: float = 86400.0):
+        self.jobs_dir = Path(jobs_dir)
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.ttl = ttl
+        self.store: Optional[JobStore] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    @classmethod
+    def from_settings(cls, settings) -> "JobQueue":
+        """設定からジョブキューを作成する"""
+        return cls(
+            jobs_dir=settings.jobs_dir,
+            workers=settings.job_workers,
+            chunk_size=settings.job_chunk_size,
+            ttl=settings.job_ttl
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """実行待ちのジョブ数"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def job_dir(self, job_id: str) -> Path:
+        """ジョブのファイルを保存するディレクトリ"""
+        return self.jobs_dir / job_id
+
+    async def start(self) -> None:
+        """ストアを開き、未完了のジョブを再登録してワーカーを起動する"""
+        self.store = JobStore(self.jobs_dir / "jobs.db")
+        self._queue = asyncio.Queue()
+        self._stopping = False
+        self.purge_expired()
+        resumed = self.store.unfinished()
+        for job_id in resumed:
+            self._queue.put_nowait(job_id)
+        if resumed:
+            logger.info(f"未完了のジョブを再開します: {len(resumed)} 件")
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """
+        ワーカーを停止する
+
+        実行中のジョブは処理中のチャンクを書き終えた時点で中断し、状態は running のまま残す
+        （次回の起動時に続きから再開する）
+        """
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    async def submit(
+        self,
+        stream: BinaryIO,
+        filename: Optional[str],
+        input_format: str,
+        output_format: str
+    ) -> Dict:
+        """
+        入力ファイルを保存してジョブを登録する
+
+        Args:
+            stream: 入力のバイナリストリーム
+            filename: アップロードされたファイル名
+            input_format: 入力形式（csv / jsonl）
+            output_format: 出力形式（ndjson / ps1 / bundle / graph）
+
+        Returns:
+            Dict: 登録したジョブ
+        """
+        job_id = uuid.uuid4().hex
+        job_dir = self.job_dir(job_id)
+        await asyncio.to_thread(self._save_input, stream, job_dir)
+        generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        job = self.store.create(job_id, input_format, output_format, filename, generated_at)
+        JOBS_TOTAL.inc(self.STATUS_QUEUED)
+        self._queue.put_nowait(job_id)
+        logger.info(f"ジョブを登録しました: {job_id} (format={input_format}, output={output_format})")
+        return job
+
+    @staticmethod
+    def _save_input(stream: BinaryIO, job_dir: Path) -> None:
+        """入力ファイルをジョブディレクトリに保存する"""
+        job_dir.mkdir(parents=True, exist_ok=True)
+        with open(job_dir / JobQueue.INPUT_NAME, "wb") as f:
+            shutil.copyfileobj(stream, f, 1024 * 1024)
+
+    def get(self, job_id: str) -> Dict:
+        """
+        ジョブを取得する
+
+        Raises:
+            JobNotFoundError: ジョブが存在しない場合
+        """
+        job = self.store.get(job_id) if self.store is not None else None
+        if job is None:
+            raise JobNotFoundError(f"ジョブが見つかりません: {job_id}")
+        return job
+
+    def artifact_path(self, job_id: str) -> Path:
+        """
+        完了したジョブの成果物のパスを取得する
+
+        Raises:
+            JobNotFoundError: ジョブが存在しない場合
+            JobNotReadyError: ジョブが完了していない場合
+        """
+        job = self.get(job_id)
+        if job["status"] != self.STATUS_SUCCEEDED:
+            raise JobNotReadyError(f"ジョブはまだ完了していません（状態: {job['status']}）")
+        return self.job_dir(job_id) / self.ARTIFACT_NAMES[job["output_format"]]
+
+    @staticmethod
+    def to_response(job: Dict) -> JobResponse:
+        """
+        ジョブをAPIのレスポンスに変換する
+
+        Args:
+            job: ストアから取得したジョブ
+
+        Returns:
+            JobResponse: ジョブの状態・進捗・URL
+        """
+        total_rows = job["total_rows"]
+        if job["status"] == JobQueue.STATUS_SUCCEEDED:
+            progress = 1.0
+        elif total_rows:
+            progress = round(min(job["processed_rows"] / total_rows, 1.0), 4)
+        else:
+            progress = 0.0
+        status_url = f"/api/jobs/{job['id']}"
+        return JobResponse(
+            job_id=job["id"],
+            status=job["status"],
+            input_format=job["input_format"],
+            output_format=job["output_format"],
+            filename=job["filename"],
+            total_rows=total_rows,
+            processed_rows=job["processed_rows"],
+            succeeded=job["succeeded"],
+            failed=job["failed"],
+            progress=progress,
+            created_at=datetime.fromtimestamp(job["created_at"]).isoformat(timespec="seconds"),
+            finished_at=(
+                datetime.fromtimestamp(job["finished_at"]).isoformat(timespec="seconds")
+                if job["finished_at"] is not None else None
+            ),
+            error=job["error"],
+            status_url=status_url,
+            artifact_url=f"{status_url}/artifact" if job["status"] == JobQueue.STATUS_SUCCEEDED else None
+        )
+
+    def purge_expired(self) -> None:
+        """保持期間を過ぎた完了済みジョブを削除する"""
+        for job_id in self.store.finished_before(time.time() - self.ttl):
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+            self.store.delete(job_id)
+
+    async def _worker(self) -> None:
+        """キューからジョブを取り出して実行する"""
+        while not self._stopping:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"ジョブの実行に失敗しました: {job_id}")
+                self.store.update(job_id, status=self.STATUS_FAILED, error=str(e), finished_at=time.time())
+                JOBS_TOTAL.inc(self.STATUS_FAILED)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        """ジョブをチャンク単位で実行する"""
+        job = self.store.get(job_id)
+        if job is None or job["status"] not in (self.STATUS_QUEUED, self.STATUS_RUNNING):
+            return
+        job_dir = self.job_dir(job_id)
+        artifact_name = self.ARTIFACT_NAMES[job["output_format"]]
+        if (job_dir / artifact_name).exists():
+            # 成果物のファイル名に変更した後、状態を更新する前に停止した場合は完了として扱う
+            # （出力を作り直すと、空の書きかけのファイルで成果物を置き換えてしまうため）
+            await asyncio.to_thread(self._mark_succeeded, job_id, job_dir, artifact_name)
+            JOBS_TOTAL.inc(self.STATUS_SUCCEEDED)
+            logger.info(f"ジョブは完了済みです: {job_id}")
+            return
+        if job["total_rows"] is None:
+            total_rows = await asyncio.to_thread(self._count_rows, job_dir, job["input_format"])
+            self.store.update(job_id, total_rows=total_rows)
+        self.store.update(job_id, status=self.STATUS_RUNNING)
+        logger.info(f"ジョブを開始します: {job_id}（処理済み {job['processed_rows']} 行から）")
+
+        run = await asyncio.to_thread(_JobRun, job, job_dir)
+        try:
+            done = False
+            while not done:
+                done = await self._run_shielded(self._run_chunk, run)
+            # 出力の完成・状態の更新・後片付けも、停止時に途中で中断しないよう最後まで実行する
+            await self._run_shielded(self._complete, run, job_dir)
+        finally:
+            run.close()
+        JOBS_TOTAL.inc(self.STATUS_SUCCEEDED)
+        logger.info(f"ジョブが完了しました: {job_id}（成功 {run.succeeded} 件 / 失敗 {run.failed} 件）")
+        self.purge_expired()
+
+    @staticmethod
+    async def _run_shielded(func, *args):
+        """
+        関数をスレッドで実行する（停止時にタスクが取り消されても、完了を待ってから中断する）
+
+        Returns:
+            関数の戻り値
+        """
+        task = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            await task
+            raise
+
+    @staticmethod
+    def _count_rows(job_dir: Path, input_format: str) -> int:
+        """入力ファイルの行数を数える（進捗の表示用）"""
+        with open(job_dir / JobQueue.INPUT_NAME, "rb") as f:
+            return sum(1 for _ in BatchService.iter_rows(f, input_format))
+
+    def _run_chunk(self, run: _JobRun) -> bool:
+        """
+        1チャンク分の行を処理して出力に追記し、進捗を保存する（スレッドで実行）
+
+        Returns:
+            bool: 全行を処理し終えた場合は True
+        """
+        chunk = list(itertools.islice(run.rows, self.chunk_size))
+        if chunk:
+            results = run.count(BatchService.process_rows(chunk, run.registry, layout=run.layout))
+            for data in BatchService.render_rows(results, run.output_format):
+                run.output.write(data)
+            run.output.flush()
+            os.fsync(run.output.fileno())
+            self.store.update(
+                run.job_id,
+                processed_rows=run.processed_rows,
+                succeeded=run.succeeded,
+                failed=run.failed,
+                artifact_bytes=run.output.tell()
+            )
+        return len(chunk) < self.chunk_size
+
+    def _finish(self, run: _JobRun, job_dir: Path) -> None:
+        """出力を完成させて成果物のファイル名に変更する（スレッドで実行）"""
+        if run.layout is not None:
+            run.output.write(CommandGenerator.bundle_footer(run.layout).encode("utf-8"))
+        run.output.flush()
+        os.fsync(run.output.fileno())
+        run.output.close()
+        os.replace(job_dir / self.PARTIAL_NAME, job_dir / self.ARTIFACT_NAMES[run.output_format])
+
+    def _complete(self, run: _JobRun, job_dir: Path) -> None:
+        """出力を完成させ、ジョブを完了にして後片付けをする（スレッドで実行）"""
+        self._finish(run, job_dir)
+        run.close()
+        self._mark_succeeded(run.job_id, job_dir, self.ARTIFACT_NAMES[run.output_format])
+
+    def _mark_succeeded(self, job_id: str, job_dir: Path, artifact_name: str) -> None:
+        """ジョブを完了にして、成果物以外のファイルを削除する（スレッドで実行）"""
+        self.store.update(job_id, status=self.STATUS_SUCCEEDED, finished_at=time.time())
+        self._cleanup(job_dir, artifact_name)
+
+    @staticmethod
+    def _cleanup(job_dir: Path, artifact_name: str) -> None:
+        """成果物以外のファイル（入力・ジョブごとのストア）を削除する"""
+        for path in job_dir.iterdir():
+            if path.name != artifact_name:
+                path.unlink()
+
+
+# アプリケーション全体で共有するジョブキュー
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> Optional[JobQueue]:
+    """共有のジョブキューを取得する（未起動の場合は None）"""
+    return _job_queue
+
+
+async def start_job_queue(settings) -> Optional[JobQueue]:
+    """
+    共有のジョブキューを起動する（アプリケーション起動時）
+
+    ジョブディレクトリを作成できない環境（読み取り専用のファイルシステムなど）では
+    警告を出力してジョブ機能を無効にする
+    """
+    global _job_queue
+    queue = JobQueue.from_settings(settings)
+    try:
+        await queue.start()
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"ジョブキューを起動できないため無効にします: {e}")
+        return None
+    _job_queue = queue
+    logger.info(f"ジョブキュー: workers={queue.workers}, chunk_size={queue.chunk_size}, dir={queue.jobs_dir}")
+    return _job_queue
+
+
+async def close_job_queue() -> None:
+    """共有のジョブキューを停止する（アプリケーション終了時）"""
+    global _job_queue
+    if _job_queue is not None:
+        await _job_queue.stop()
+        _job_queue = None
@@ -3,15 +3,17 @@
 雇用形態に基づいてユーザータイプ、ライセンスタイプを決定する
 """
 
-from datetime import datetime, timedelta
-from typing import Dict
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
 from app.models import JudgmentResult
+from app.services.rule_engine import RuleEngine
 
 
 class JudgmentService:
     """判断ロジックを実装するサービス（AI判断のみ）"""
     
-    # 判断ルール定義（固定ルール）
+    # 既定の判断ルール（ルールファイルで顧客・部署ごとに上書き可能）
     JUDGMENT_RULES = {
         "正社員": {
             "user_type": "標準ユーザー",
@@ -27,54 +29,87 @@ class JudgmentService:
         }
     }
     
+    # コンパイル済みの判断ルール（起動時に load_rules でルールファイルを読み込む）
+    rule_engine: RuleEngine = RuleEngine.from_dict(JUDGMENT_RULES)
+    
     @staticmethod
-    def judge(request_data: Dict) -> JudgmentResult:
+    def load_rules(rules_path: Optional[str] = None) -> RuleEngine:
         """
-        雇用形態に基づいて判断を行う
+        ルールファイルを読み込み、判断ルールを差し替える
+        
+        ルールファイルに定義が無い雇用形態は JUDGMENT_RULES の既定ルールを使用する
+        
+        Args:
+            rules_path: ルールファイル（JSON）のパス（省略時は既定ルールのみ）
+            
+        Returns:
+            RuleEngine: 読み込んだルールエンジン
+        """
+        if rules_path:
+            engine = RuleEngine.from_file(Path(rules_path), defaults=JudgmentService.JUDGMENT_RULES)
+        else:
+            engine = RuleEngine.from_dict(JudgmentService.JUDGMENT_RULES)
+        JudgmentService.rule_engine = engine
+        return engine
+    
+    @staticmethod
+    def judge(request_data: Dict, today: Optional[date] = None) -> JudgmentResult:
+        """
+        顧客・雇用形態・部署に基づいて判断を行う
         
         Args:
             request_data: リクエストデータ（辞書形式）
+            today: 有効期限計算の基準日（省略時は当日）
             
         Returns:
             JudgmentResult: 判断結果
         """
         employment_type = request_data.get("employment_type")
         
-        if employment_type not in JudgmentService.JUDGMENT_RULES:
+        rule = JudgmentService.rule_engine.lookup(
+            request_data.get("company", ""),
+            employment_type,
+            request_data.get("department", "")
+        )
+        if rule is None:
             raise ValueError(f"不正な雇用形態: {employment_type}")
         
-        rule = JudgmentService.JUDGMENT_RULES[employment_type]
-        
-        # 有効期限の計算（派遣の場合のみ）
+        # 有効期限の計算（契約期間は顧客ごとのルールに従う）
         expiration_date = None
-        if rule["has_expiration"]:
-            # デフォルトで1年後を設定
-            expiration_date = (datetime.now() + timedelta(days=365)).strftime("%Y-%m-%d")
-        
-        # UI表示用の説明文を生成
-        if employment_type == "正社員":
-            explanation = (
-                f"このユーザーは【{employment_type}】のため、"
-                f"{rule['license_type']}を付与する{rule['user_type']}として作成します。"
-            )
-        else:  # 派遣
-            explanation = (
-                f"このユーザーは【{employment_type}】のため、"
-                f"{rule['license_type']}を付与する{rule['user_type']}として作成します。"
-                f"また、契約終了日（{expiration_date}）に有効期限を設定します。"
+        explanation = rule.explanation
+        if rule.has_expiration:
+            expiration_date = JudgmentService.rule_engine.expiration_date(
+                today or date.today(),
+                rule.contract_days
             )
+            explanation += rule.expiration_explanation.format(expiration_date)
         
         return JudgmentResult(
             employment_type=employment_type,
-            user_type=rule["user_type"],
-            license_type=rule["license_type"],
-            license_sku=rule["license_sku"],
+            user_type=rule.user_type,
+            license_type=rule.license_type,
+            license_sku=rule.license_sku,
             license_enabled=True,  # AI判断では常にライセンスを付与
-            has_expiration=rule["has_expiration"],
+            has_expiration=rule.has_expiration,
             expiration_date=expiration_date,
             explanation=explanation
         )
     
+    @staticmethod
+    def judge_many(requests: List[Dict], today: Optional[date] = None) -> List[JudgmentResult]:
+        """
+        複数のリクエストをまとめて判断する（基準日の取得は1回のみ）
+        
+        Args:
+            requests: リクエストデータ（辞書形式）のリスト
+            today: 有効期限計算の基準日（省略時は当日）
+            
+        Returns:
+            List[JudgmentResult]: 判断結果（入力と同じ順序）
+        """
+        today = today or date.today()
+        return [JudgmentService.judge(request_data, today) for request_data in requests]
+    
     @staticmethod
     def generate_judgment_text(judgment: JudgmentResult) -> str:
         """
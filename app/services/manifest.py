@@ -0,0 +1,243 @@
+"""
+増分生成のマニフェスト
+前回の生成時に入力行ごとのハッシュ値と割り当てたMailNicknameを保存し、
+次回は新規・変更された行だけを生成できるようにする（毎週全件が送られてくるHRファイル向け）。
+
+行は (顧客名, 従業員名, 同じ組み合わせの通し番号) で識別し、生成結果に影響する項目だけを
+正規化してハッシュ値を求める。判断ルール・テンプレート・ドメインマッピング表・出力レイアウトの
+いずれかが変わった場合は、前回のハッシュ値を使わずに全件を生成する。
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models import OnboardingRequest
+from app.services.command_generator import CommandGenerator
+from app.services.judgment_service import JudgmentService
+from app.services.upn_registry import UpnRegistry
+
+
+# マニフェストの形式（生成ロジックを変更して前回の結果を使えなくなった場合は上げる）
+MANIFEST_FORMAT = 1
+
+# ハッシュ値の対象にする項目（生成結果に影響する項目のみ、列の順序や余分な列は無視する）
+FINGERPRINT_FIELDS = tuple(OnboardingRequest.model_fields)
+
+
+def normalize_row(row: Dict) -> Dict[str, str]:
+    """
+    入力行を正規化する（対象の項目のみ、値は文字列、タスク種別は補完）
+
+    Args:
+        row: 入力行
+
+    Returns:
+        Dict[str, str]: 正規化した行
+    """
+    data = {field: "" if row.get(field) is None else str(row.get(field)) for field in FINGERPRINT_FIELDS}
+    if not data["task_type"]:
+        data["task_type"] = "onboarding"
+    return data
+
+
+def row_fingerprint(row: Dict) -> str:
+    """正規化した入力行のハッシュ値（SHA-256）を求める"""
+    payload = json.dumps(normalize_row(row), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def generation_version(layout: Optional[str] = None, domain_map_path: Optional[str] = None) -> str:
+    """
+    生成結果に影響する設定のバージョンを求める
+
+    判断ルールのバージョン・テンプレートのハッシュ値・ドメインマッピング表の内容・出力レイアウトから求める
+
+    Args:
+        layout: バンドル形式のレイアウト（省略時は行ごとにスクリプト全体を生成）
+        domain_map_path: ドメインマッピング表のパス
+
+    Returns:
+        str: バージョン（SHA-256 の先頭16文字）
+    """
+    template_names = [CommandGenerator.TEMPLATE_REGULAR, CommandGenerator.TEMPLATE_CONTRACT]
+    if layout is not None:
+        template_names.append(CommandGenerator.get_bundle_layout(layout)[0])
+    domain_map = ""
+    if domain_map_path:
+        domain_map = hashlib.sha256(Path(domain_map_path).read_bytes()).hexdigest()
+    payload = json.dumps({
+        "format": MANIFEST_FORMAT,
+        "rules": JudgmentService.rule_engine.version,
+        "templates": {name: CommandGenerator.get_compiled_template(name).digest for name in template_names},
+        "layout": layout or "script",
+        "domain_map": domain_map,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class Manifest:
+    """
+    増分生成のマニフェスト（JSON）
+
+    - plan: 今回の入力を前回と比較し、行ごとに new / changed / unchanged を判定する
+      （前回割り当てたMailNicknameは発行済みとして登録し、新規の行に割り当てないようにする）
+    - record: 生成した行の結果を記録する
+    - save: 今回の結果を書き出す（変更されていない行・生成に失敗した行は前回の記録を引き継ぐ）
+    """
+
+    STATUS_NEW = "new"
+    STATUS_CHANGED = "changed"
+    STATUS_UNCHANGED = "unchanged"
+
+    def __init__(self, path: str, version: str):
+        self.path = Path(path)
+        self.version = version
+        self.previous_version: Optional[str] = None
+        self._previous: Dict[str, Dict] = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.previous_version = data.get("version")
+            self._previous = data.get("rows", {})
+        self._current: Dict[str, Dict] = {}
+        self._keys: Dict[int, str] = {}
+        self._fingerprints: Dict[int, str] = {}
+        self.counts = {self.STATUS_NEW: 0, self.STATUS_CHANGED: 0, self.STATUS_UNCHANGED: 0}
+
+    @property
+    def version_changed(self) -> bool:
+        """前回と生成ルール・テンプレートなどが変わったか（初回は False）"""
+        return self.previous_version is not None and self.previous_version != self.version
+
+    @staticmethod
+    def row_key(company: str, employee_name: str, occurrence: int) -> str:
+        """
+        行の識別キー（顧客名・従業員名・同じ組み合わせの通し番号のJSON配列）
+
+        顧客名・従業員名にはタブなど任意の文字が含まれうるため、区切り文字で連結しない
+        """
+        return json.dumps([company.strip(), employee_name.strip(), occurrence], ensure_ascii=False)
+
+    @staticmethod
+    def key_parts(key: str) -> Tuple[str, str, int]:
+        """row_key で生成したキーを (顧客名, 従業員名, 通し番号) に戻す"""
+        company, employee_name, occurrence = json.loads(key)
+        return company, employee_name, occurrence
+
+    def plan(self, rows: Iterable[Tuple[int, object]], registry: UpnRegistry) -> Tuple[Dict[int, str], Dict[int, str]]:
+        """
+        今回の入力を前回と比較する
+
+        同じ顧客名・従業員名の行が複数ある場合は、内容が一致する前回の行を優先して対応付ける
+        （途中の行が削除・追加されても、後続の同姓同名の行が changed にならないようにする）
+
+        Args:
+            rows: (行番号, 行データ) のイテラブル
+            registry: MailNicknameの重複管理（前回割り当てた名前を発行済みとして登録する）
+
+        Returns:
+            Tuple[Dict[int, str], Dict[int, str]]:
+                行番号 → 判定（new / changed / unchanged）、行番号 → 引き継ぐMailNickname
+                （解析できない行は new として扱い、毎回生成してエラーを出力する）
+        """
+        statuses: Dict[int, str] = {}
+        groups: Dict[Tuple[str, str], List[Tuple[int, Dict]]] = {}
+        for row_number, row in rows:
+            if not isinstance(row, dict):
+                statuses[row_number] = self.STATUS_NEW
+                self.counts[self.STATUS_NEW] += 1
+                continue
+            pair = (str(row.get("company") or "").strip(), str(row.get("employee_name") or "").strip())
+            groups.setdefault(pair, []).append((row_number, row))
+            self._fingerprints[row_number] = row_fingerprint(row)
+
+        previous_groups: Dict[Tuple[str, str], List[str]] = {}
+        for key in self._previous:
+            company, employee_name, _ = self.key_parts(key)
+            previous_groups.setdefault((company, employee_name), []).append(key)
+
+        nicknames: Dict[int, str] = {}
+        for pair, group in groups.items():
+            candidates = previous_groups.get(pair, [])
+            matched: Dict[int, str] = {}
+            if not self.version_changed:
+                # 内容が一致する前回の行 → unchanged
+                by_fingerprint: Dict[str, List[str]] = {}
+                for key in candidates:
+                    by_fingerprint.setdefault(self._previous[key]["fingerprint"], []).append(key)
+                for row_number, _ in group:
+                    keys = by_fingerprint.get(self._fingerprints[row_number])
+                    if keys:
+                        matched[row_number] = keys.pop(0)
+            # 残りの行は前回の行と出現順に対応付け（changed）、前回の行が足りなければ新しい番号を振る（new）
+            used = set(matched.values())
+            remaining = [key for key in candidates if key not in used]
+            next_occurrence = max((self.key_parts(key)[2] for key in candidates), default=0) + 1
+            for row_number, row in group:
+                key = matched.get(row_number)
+                if key is not None:
+                    status = self.STATUS_UNCHANGED
+                    self._current[key] = dict(self._previous[key], row=row_number)
+                elif remaining:
+                    key = remaining.pop(0)
+                    status = self.STATUS_CHANGED
+                else:
+                    key = self.row_key(pair[0], pair[1], next_occurrence)
+                    next_occurrence += 1
+                    status = self.STATUS_NEW
+                self._keys[row_number] = key
+                statuses[row_number] = status
+                self.counts[status] += 1
+
+                # 前回割り当てた名前は同じテナントであれば引き継ぐ（連番がずれないよう、新規の行より先に登録する）
+                previous = self._previous.get(key)
+                if previous is not None and previous.get("mail_nickname") and pair[0]:
+                    tenant = CommandGenerator.resolve_tenant_domain(pair[0])
+                    if previous.get("tenant") == tenant:
+                        registry.claim(tenant, previous["mail_nickname"])
+                        nicknames[row_number] = previous["mail_nickname"]
+        return statuses, nicknames
+
+    def record(self, row_number: int, ok: bool, tenant: Optional[str], mail_nickname: Optional[str]) -> None:
+        """
+        生成した行の結果を記録する
+
+        生成に失敗した行は前回の記録を引き継ぎ（次回も changed として再生成する）、
+        前回の記録も無い場合は記録しない（次回も new として再生成する）
+        """
+        key = self._keys.get(row_number)
+        if key is None:
+            return
+        if ok:
+            company, employee_name, _ = self.key_parts(key)
+            self._current[key] = {
+                "fingerprint": self._fingerprints[row_number],
+                "row": row_number,
+                "company": company,
+                "employee_name": employee_name,
+                "tenant": tenant,
+                "mail_nickname": mail_nickname,
+            }
+        elif key in self._previous:
+            self._current[key] = self._previous[key]
+
+    def removed(self) -> List[Dict]:
+        """前回の入力にあり、今回の入力に無い行"""
+        current_keys = set(self._keys.values())
+        return [entry for key, entry in self._previous.items() if key not in current_keys]
+
+    def save(self) -> None:
+        """今回の結果を書き出す（書き込み途中で中断しても前回のマニフェストが残るよう、置き換えで保存する）"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": self.version,
+                "updated_at": datetime.now().isoformat(timespec="seconds"),
+                "rows": self._current,
+            }, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temp_path, self.path)
@@ -0,0 +1,89 @@
+"""
+事前コンパイル済みのPowerShellテンプレート
+このファイルは `python -m app.build` で自動生成される。直接編集しないこと。
+"""
+
+# テンプレート名 → (本文のハッシュ値, リテラルと変数スロットのリスト, (位置, 変数名) のリスト)
+TEMPLATES = {
+    'create_entra_user_with_license.ps1': (
+        '03d7d58db0d617b3544af98bddad19493d6cbff3c4504872cc67a2c509977e7f',
+        [
+            '<#\n.SYNOPSIS\n    Microsoft Entra ID ユーザー作成と Microsoft 365 ライセンス付与ツール\n\n.DESCRIPTION\n    Azure VM（Windows）上で動作する、Entra ID ユーザー作成と Microsoft 365 E3 ライセンス付与を\n    安全に実行する PowerShell スクリプトです。\n    \n    - オンプレミス Active Directory は使用しません\n    - Microsoft Entra ID（Azure AD）ネイティブのみを使用\n    - Microsoft Graph PowerShell SDK を使用\n    - Dry-run モードで事前確認が可能\n    - 半自動実行モデル（人が実行）\n\n.PARAMETER DryRun\n    Dry-run モードの有効/無効を指定します。\n    $true: 実行内容を表示するのみ（実際には実行しない）\n    $false: 実際にユーザー作成とライセンス付与を実行\n\n.PARAMETER AssignLicense\n    ライセンス付与の有効/無効を指定します。\n    $true: ユーザー作成後に Microsoft 365 E3 ライセンスを付与\n    $false: ライセンス付与をスキップ（ユーザー作成のみ）\n    デフォルト: $false（PoC / BPO用途でライセンスが無いテナントでも動作するように）\n\n.EXAMPLE\n    # Dry-run モードで実行（推奨：まずはこちらで確認）\n    .\\create_entra_user_with_license.ps1 -DryRun $true -AssignLicense $false\n\n.EXAMPLE\n    # ユーザー作成のみ実行（ライセンス付与なし）\n    .\\create_entra_user_with_license.ps1 -DryRun $false -AssignLicense $false\n\n.EXAMPLE\n    # ユーザー作成とライセンス付与を実行\n    .\\create_entra_user_with_license.ps1 -DryRun $false -AssignLicense $true\n\n.NOTES\n    作成日: 2026-01-11\n    バージョン: 2.1.0\n    要件: Microsoft.Graph モジュールが必要\n    必要な権限: User.ReadWrite.All, Directory.ReadWrite.All, Organization.Read.All\n    改修内容: AssignLicenseパラメータを追加（ライセンス付与をオプション化）\n#>\n\n[CmdletBinding()]\nparam(\n    [Parameter(Mandatory = $true)]\n    [bool]$DryRun,\n    \n    [Parameter(Mandatory = $false)]\n    [bool]$AssignLicense = $false\n)\n\n# ============================================================================\n# 設定セクション\n# ============================================================================\n\n# ユーザー情報の定義\n$DisplayName = "山田 太郎"\n$MailNickname = "yamada.taro"  # UserPrincipalName の @ より前の部分（英数字のみ、記号は自動除去）\n$UserPrincipalName = "$MailNickname@yourtenant.onmicrosoft.com"  # テナント名を変更してください（必ず @xxxx.onmicrosoft.com 形式）\n$Department = "営業部"\n$UsageLocation = "JP"  # 日本\n$InitialPassword = "TempPassword123!"  # 初期パスワード（強力なパスワードを推奨、画面には表示されません）\n\n# ライセンス情報\n$LicenseSkuPartNumber = "ENTERPRISEPACK"  # Microsoft 365 E3\n\n# ============================================================================\n# 関数定義\n# ============================================================================\n\nfunction Write-InfoMessage {\n    <#\n    .SYNOPSIS\n        情報メッセージを表示\n    #>\n    param([string]$Message)\n    Write-Host "[INFO] $Message" -ForegroundColor Cyan\n}\n\nfunction Write-SuccessMessage {\n    <#\n    .SYNOPSIS\n        成功メッセージを表示\n    #>\n    param([string]$Message)\n    Write-Host "[SUCCESS] $Message" -ForegroundColor Green\n}\n\nfunction Write-WarningMessage {\n    <#\n    .SYNOPSIS\n        警告メッセージを表示\n    #>\n    param([string]$Message)\n    Write-Host "[WARNING] $Message" -ForegroundColor Yellow\n}\n\nfunction Write-ErrorMessage {\n    <#\n    .SYNOPSIS\n        エラーメッセージを表示（日本語で明確に）\n    #>\n    param([string]$Message)\n    Write-Error "[ERROR] $Message"\n}\n\nfunction Test-MicrosoftGraphModule {\n    <#\n    .SYNOPSIS\n        Microsoft.Graph モジュールの存在確認\n    #>\n    try {\n        $module = Get-Module -ListAvailable -Name "Microsoft.Graph" -ErrorAction SilentlyContinue\n        if ($null -eq $module) {\n            return $false\n        }\n        return $true\n    }\n    catch {\n        return $false\n    }\n}\n\nfunction Test-MgGraphConnection {\n    <#\n    .SYNOPSIS\n        Microsoft Graph への接続を確認\n    #>\n    try {\n        $context = Get-MgContext\n        if ($null -eq $context) {\n            return $false\n        }\n        return $true\n    }\n    catch {\n        return $false\n    }\n}\n\nfunction Connect-ToMicrosoftGraph {\n    <#\n    .SYNOPSIS\n        Microsoft Graph に接続\n    #>\n    Write-InfoMessage "Microsoft Graph への接続を開始します..."\n    \n    # 必要なスコープを定義\n    $RequiredScopes = @(\n        "User.ReadWrite.All",\n        "Directory.ReadWrite.All",\n        "Organization.Read.All"\n    )\n    \n    try {\n        # Microsoft Graph に接続\n        Connect-MgGraph -Scopes $RequiredScopes -NoWelcome\n        \n        # 接続確認\n        $context = Get-MgContext\n        if ($null -eq $context) {\n            Write-ErrorMessage "Microsoft Graph への接続に失敗しました。接続を確認してください。"\n            exit 1\n        }\n        \n        Write-SuccessMessage "Microsoft Graph に接続しました"\n        Write-InfoMessage "接続テナント: $($context.TenantId)"\n        Write-InfoMessage "接続ユーザー: $($context.Account)"\n        \n        return $true\n    }\n    catch {\n        Write-ErrorMessage "Microsoft Graph への接続中にエラーが発生しました: $($_.Exception.Message)"\n        exit 1\n    }\n}\n\nfunction Format-MailNickname {\n    <#\n    .SYNOPSIS\n        MailNickname から英数字以外の記号を除去\n    #>\n    param([string]$MailNickname)\n    \n    # 英数字以外の文字を除去\n    $cleaned = $MailNickname -replace \'[^a-zA-Z0-9]\', \'\'\n    \n    return $cleaned\n}\n\nfunction Test-UserExists {\n    <#\n    .SYNOPSIS\n        ユーザーの存在確認（Get-MgUser -UserId を使用）\n    #>\n    param([string]$UserPrincipalName)\n    \n    try {\n        # Get-MgUser -UserId でユーザーを取得（存在しない場合はエラー）\n        $user = Get-MgUser -UserId $UserPrincipalName -ErrorAction SilentlyContinue\n        if ($null -ne $user) {\n            return $true\n        }\n        return $false\n    }\n    catch {\n        # ユーザーが存在しない場合は false を返す（エラーではない）\n        return $false\n    }\n}\n\nfunction Get-LicenseSkuId {\n    <#\n    .SYNOPSIS\n        ライセンス SKU ID を取得\n    #>\n    param([string]$SkuPartNumber)\n    \n    try {\n        Write-InfoMessage "利用可能なライセンス SKU を取得しています..."\n        $skus = Get-MgSubscribedSku\n        \n        # 指定された SKU Part Number を検索\n        $targetSku = $skus | Where-Object { $_.SkuPartNumber -eq $SkuPartNumber }\n        \n        if ($null -eq $targetSku) {\n            Write-WarningMessage "指定されたライセンス SKU \'$SkuPartNumber\' が見つかりません。テナントにこのライセンスが割り当てられていない可能性があります。"\n            Write-InfoMessage "利用可能な SKU 一覧:"\n            $skus | ForEach-Object {\n                Write-Host "  - $($_.SkuPartNumber): $($_.SkuId)" -ForegroundColor Gray\n            }\n            Write-WarningMessage "ライセンス付与はスキップされますが、ユーザー作成は続行します。"\n            return $null\n        }\n        \n        Write-SuccessMessage "ライセンス SKU を取得しました: $($targetSku.SkuPartNumber) (ID: $($targetSku.SkuId))"\n        return $targetSku.SkuId\n    }\n    catch {\n        Write-WarningMessage "ライセンス SKU 取得中にエラーが発生しました: $($_.Exception.Message)"\n        Write-WarningMessage "ライセンス付与はスキップされますが、ユーザー作成は続行します。"\n        return $null\n    }\n}\n\nfunction New-EntraUser {\n    <#\n    .SYNOPSIS\n        Entra ID ユーザーを作成（New-MgUser のみ使用）\n    #>\n    param(\n        [string]$DisplayName,\n        [string]$UserPrincipalName,\n        [string]$MailNickname,\n        [string]$Department,\n        [string]$UsageLocation,\n        [string]$Password\n    )\n    \n    try {\n        Write-InfoMessage "Entra ID ユーザーを作成しています..."\n        \n        # パスワードプロファイルを作成\n        $PasswordProfile = @{\n            Password = $Password\n            ForceChangePasswordNextSignIn = $true  # 初回ログイン時にパスワード変更を強制\n        }\n        \n        # ユーザー作成パラメータ\n        $UserParams = @{\n            DisplayName = $DisplayName\n            UserPrincipalName = $UserPrincipalName\n            MailNickname = $MailNickname\n            Department = $Department\n            UsageLocation = $UsageLocation\n            PasswordProfile = $PasswordProfile\n            AccountEnabled = $true\n        }\n        \n        # ユーザー作成（New-MgUser のみ使用）\n        $newUser = New-MgUser @UserParams\n        \n        Write-SuccessMessage "ユーザーを作成しました: $($newUser.DisplayName) ($($newUser.UserPrincipalName))"\n        Write-InfoMessage "ユーザー ID: $($newUser.Id)"\n        \n        return $newUser\n    }\n    catch {\n        Write-ErrorMessage "ユーザー作成中にエラーが発生しました: $($_.Exception.Message)"\n        return $null\n    }\n}\n\nfunction Set-UserLicense {\n    <#\n    .SYNOPSIS\n        ユーザーにライセンスを付与\n    #>\n    param(\n        [string]$UserId,\n        [string]$SkuId\n    )\n    \n    try {\n        Write-InfoMessage "ユーザーにライセンスを付与しています..."\n        \n        # ライセンス付与パラメータ\n        $LicenseParams = @{\n            UserId = $UserId\n            AddLicenses = @(\n                @{\n                    SkuId = $SkuId\n                }\n            )\n            RemoveLicenses = @()\n        }\n        \n        # ライセンス付与\n        Set-MgUserLicense @LicenseParams\n        \n        Write-SuccessMessage "ライセンスを付与しました: $SkuId"\n        return $true\n    }\n    catch {\n        Write-ErrorMessage "ライセンス付与中にエラーが発生しました: $($_.Exception.Message)"\n        return $false\n    }\n}\n\nfunction Show-DryRunPreview {\n    <#\n    .SYNOPSIS\n        Dry-run モードでの実行内容プレビューを表示\n    #>\n    param([bool]$AssignLicense)\n    \n    Write-Host ""\n    Write-Host "========================================" -ForegroundColor Yellow\n    Write-Host "  DRY-RUN モード: 実行内容プレビュー" -ForegroundColor Yellow\n    Write-Host "========================================" -ForegroundColor Yellow\n    Write-Host ""\n    \n    Write-Host "【実行される操作】" -ForegroundColor Cyan\n    Write-Host "1. ユーザー存在確認" -ForegroundColor White\n    Write-Host "   UserPrincipalName: $UserPrincipalName" -ForegroundColor Gray\n    Write-Host ""\n    \n    Write-Host "2. Entra ID ユーザー作成" -ForegroundColor White\n    Write-Host "   DisplayName: $DisplayName" -ForegroundColor Gray\n    Write-Host "   UserPrincipalName: $UserPrincipalName" -ForegroundColor Gray\n    Write-Host "   MailNickname: $MailNickname" -ForegroundColor Gray\n    Write-Host "   Department: $Department" -ForegroundColor Gray\n    Write-Host "   UsageLocation: $UsageLocation" -ForegroundColor Gray\n    Write-Host "   AccountEnabled: True" -ForegroundColor Gray\n    Write-Host "   ForceChangePasswordNextSignIn: True" -ForegroundColor Gray\n    Write-Host "   初期パスワード: [非表示]" -ForegroundColor Gray\n    Write-Host ""\n    \n    if ($AssignLicense) {\n        Write-Host "3. ライセンス SKU 取得" -ForegroundColor White\n        Write-Host "   SkuPartNumber: $LicenseSkuPartNumber" -ForegroundColor Gray\n        Write-Host ""\n        \n        Write-Host "4. Microsoft 365 ライセンス付与" -ForegroundColor White\n        Write-Host "   ライセンス: $LicenseSkuPartNumber (Microsoft 365 E3)" -ForegroundColor Gray\n        Write-Host ""\n    }\n    else {\n        Write-Host "3. ライセンス付与: スキップ" -ForegroundColor White\n        Write-Host "   AssignLicense = `$false のため、ライセンス付与は実行されません" -ForegroundColor Gray\n        Write-Host ""\n    }\n    \n    Write-Host "========================================" -ForegroundColor Yellow\n    Write-Host "  実際には実行されません" -ForegroundColor Yellow\n    Write-Host "  実行するには -DryRun `$false を指定してください" -ForegroundColor Yellow\n    Write-Host "========================================" -ForegroundColor Yellow\n    Write-Host ""\n}\n\nfunction Show-ExecutionResult {\n    <#\n    .SYNOPSIS\n        実行結果を表示（パスワードは表示しない）\n    #>\n    param(\n        [object]$User,\n        [string]$SkuPartNumber,\n        [bool]$AssignLicense,\n        [bool]$LicenseAssigned = $false\n    )\n    \n    Write-Host ""\n    Write-Host "========================================" -ForegroundColor Green\n    Write-Host "  実行結果" -ForegroundColor Green\n    Write-Host "========================================" -ForegroundColor Green\n    Write-Host ""\n    \n    if ($null -ne $User) {\n        Write-SuccessMessage "ユーザー作成: 成功"\n        Write-Host "  表示名: $($User.DisplayName)" -ForegroundColor White\n        Write-Host "  UPN: $($User.UserPrincipalName)" -ForegroundColor White\n        Write-Host "  ユーザー ID: $($User.Id)" -ForegroundColor White\n        Write-Host "  部署: $($User.Department)" -ForegroundColor White\n        \n        if ($AssignLicense -and $LicenseAssigned) {\n            Write-Host "  ライセンス: $SkuPartNumber" -ForegroundColor White\n            Write-SuccessMessage "ライセンス付与: 成功"\n        }\n        elseif ($AssignLicense -and -not $LicenseAssigned) {\n            Write-Host "  ライセンス: 付与されませんでした（SKUが見つからないか、エラーが発生しました）" -ForegroundColor Yellow\n            Write-WarningMessage "ユーザーは作成されましたが、ライセンスは付与されていません"\n        }\n        else {\n            Write-Host "  ライセンス: 付与されていません（AssignLicense = `$false）" -ForegroundColor Gray\n        }\n        \n        Write-Host ""\n        Write-WarningMessage "初期パスワードは設定されていますが、セキュリティのため表示していません"\n        Write-WarningMessage "初回ログイン時にパスワード変更が求められます"\n    }\n    else {\n        Write-ErrorMessage "ユーザー作成: 失敗"\n    }\n    \n    Write-Host ""\n}\n\n# ============================================================================\n# メイン処理\n# ============================================================================\n\nWrite-Host ""\nWrite-Host "========================================" -ForegroundColor Cyan\nWrite-Host "  Entra ID ユーザー作成ツール" -ForegroundColor Cyan\nWrite-Host "========================================" -ForegroundColor Cyan\nWrite-Host ""\n\n# Microsoft.Graph モジュールの存在確認\nWrite-InfoMessage "Microsoft.Graph モジュールの存在を確認しています..."\nif (-not (Test-MicrosoftGraphModule)) {\n    Write-ErrorMessage "Microsoft.Graph モジュールがインストールされていません"\n    Write-InfoMessage "以下のコマンドでインストールしてください:"\n    Write-Host "  Install-Module -Name Microsoft.Graph -Scope CurrentUser" -ForegroundColor Yellow\n    Write-InfoMessage "インストール後、PowerShell を再起動してから再度実行してください"\n    exit 1\n}\nWrite-SuccessMessage "Microsoft.Graph モジュールが見つかりました"\n\n# MailNickname の記号除去処理\n$MailNickname = Format-MailNickname -MailNickname $MailNickname\nWrite-InfoMessage "MailNickname を処理しました: $MailNickname"\n\n# UserPrincipalName の再構築（MailNickname が変更された場合）\nif ($UserPrincipalName -notmatch "^$MailNickname@") {\n    $UserPrincipalName = "$MailNickname@$($UserPrincipalName -split \'@\')[1]"\n    Write-InfoMessage "UserPrincipalName を更新しました: $UserPrincipalName"\n}\n\nWrite-Host ""\n\n# Dry-run モードの表示\nif ($DryRun) {\n    Write-WarningMessage "Dry-run モード: 有効（実際には実行しません）"\n}\nelse {\n    Write-WarningMessage "Dry-run モード: 無効（実際に実行します）"\n}\n\n# AssignLicense パラメータの表示\nif ($AssignLicense) {\n    Write-InfoMessage "ライセンス付与: 有効（Microsoft 365 E3 を付与します）"\n}\nelse {\n    Write-InfoMessage "ライセンス付与: 無効（ユーザー作成のみ実行します）"\n    Write-InfoMessage "このテナントにはライセンスが存在しない想定です"\n}\nWrite-Host ""\n\n# Microsoft Graph への接続確認\nif (-not (Test-MgGraphConnection)) {\n    Write-InfoMessage "Microsoft Graph に接続されていません。接続を開始します..."\n    Connect-ToMicrosoftGraph\n}\nelse {\n    $context = Get-MgContext\n    Write-InfoMessage "既に Microsoft Graph に接続されています"\n    Write-InfoMessage "接続テナント: $($context.TenantId)"\n    Write-InfoMessage "接続ユーザー: $($context.Account)"\n    Write-Host ""\n}\n\n# Dry-run モードの場合\nif ($DryRun) {\n    Show-DryRunPreview -AssignLicense $AssignLicense\n    Write-InfoMessage "Dry-run モードのため、実際の操作は実行されませんでした"\n    exit 0\n}\n\n# ============================================================================\n# 実際の実行処理（Dry-run = false の場合のみ）\n# ============================================================================\n\nWrite-Host ""\nWrite-Host "========================================" -ForegroundColor Green\nWrite-Host "  実際の実行を開始します" -ForegroundColor Green\nWrite-Host "========================================" -ForegroundColor Green\nWrite-Host ""\n\n# 1. ユーザー存在確認\nWrite-InfoMessage "ユーザーの存在確認を実行しています..."\nif (Test-UserExists -UserPrincipalName $UserPrincipalName) {\n    Write-ErrorMessage "ユーザー \'$UserPrincipalName\' は既に存在します。処理を中断します。"\n    exit 1\n}\nWrite-SuccessMessage "ユーザー \'$UserPrincipalName\' は存在しません（作成可能）"\nWrite-Host ""\n\n# 2. ライセンス SKU ID を取得（AssignLicense = $true の場合のみ）\n$SkuId = $null\nif ($AssignLicense) {\n    $SkuId = Get-LicenseSkuId -SkuPartNumber $LicenseSkuPartNumber\n    if ($null -eq $SkuId) {\n        Write-WarningMessage "ライセンス SKU ID の取得に失敗しました。"\n        Write-WarningMessage "ライセンス付与はスキップされますが、ユーザー作成は続行します。"\n    }\n    Write-Host ""\n}\nelse {\n    Write-InfoMessage "ライセンス付与はスキップされました（AssignLicense = `$false）"\n    Write-InfoMessage "このテナントにはライセンスが存在しない想定です"\n    Write-Host ""\n}\n\n# 3. Entra ID ユーザーを作成\n$newUser = New-EntraUser `\n    -DisplayName $DisplayName `\n    -UserPrincipalName $UserPrincipalName `\n    -MailNickname $MailNickname `\n    -Department $Department `\n    -UsageLocation $UsageLocation `\n    -Password $InitialPassword\n\nif ($null -eq $newUser) {\n    Write-ErrorMessage "ユーザー作成に失敗しました。処理を中断します。"\n    exit 1\n}\nWrite-Host ""\n\n# 4. ライセンスを付与（AssignLicense = $true かつ SKU ID が取得できた場合のみ）\n$LicenseAssigned = $false\nif ($AssignLicense -and $null -ne $SkuId) {\n    $licenseResult = Set-UserLicense -UserId $newUser.Id -SkuId $SkuId\n    if ($licenseResult) {\n        Write-SuccessMessage "ライセンスを付与しました"\n        $LicenseAssigned = $true\n    }\n    else {\n        Write-WarningMessage "ライセンス付与に失敗しました。"\n        Write-WarningMessage "ユーザーは作成されましたが、ライセンスは付与されていません"\n        Write-WarningMessage "手動でライセンスを付与してください: $($newUser.UserPrincipalName)"\n    }\n    Write-Host ""\n}\nelseif ($AssignLicense -and $null -eq $SkuId) {\n    Write-WarningMessage "ライセンス SKU が取得できなかったため、ライセンス付与をスキップしました"\n    Write-WarningMessage "ユーザーは正常に作成されました"\n    Write-Host ""\n}\nelse {\n    Write-InfoMessage "ライセンス付与はスキップされました（AssignLicense = `$false）"\n    Write-InfoMessage "このテナントにはライセンスが存在しない想定です"\n    Write-Host ""\n}\n\n# 5. 実行結果を表示\nShow-ExecutionResult -User $newUser -SkuPartNumber $LicenseSkuPartNumber -AssignLicense $AssignLicense -LicenseAssigned $LicenseAssigned\n\nWrite-SuccessMessage "すべての処理が正常に完了しました"\nWrite-Host ""\n',
+        ],
+        [],
+    ),
+    'onboarding_bundle.ps1': (
+        '08b5189d42c251045e844b683acab593e9676c11c3a6b7a778ca1e21eaf155a7',
+        [
+            '# =========================================\n# Entra ID ユーザー一括作成（バンドル形式）\n# Generated at: ',
+            '{generated_at}',
+            '\n#\n# 共通の関数と Microsoft Graph への接続はこのファイルの先頭で1回だけ定義し、\n# 従業員ごとの処理は末尾の New-OnboardingUser の呼び出し（1行1名）で行います。\n# =========================================\n\n$UsageLocation = "JP"\n$script:SkuIds = $null\n$script:Succeeded = 0\n$script:Failed = 0\n\nfunction Connect-OnboardingGraph {\n  # 未接続の場合のみ Microsoft Graph に接続する\n  if ($null -eq (Get-MgContext)) {\n    Write-Host "[INFO] Microsoft Graph に接続します"\n    Connect-MgGraph -Scopes "User.ReadWrite.All", "Organization.Read.All" -NoWelcome\n  }\n}\n\nfunction Get-OnboardingSkuId {\n  param([string]$SkuPartNumber)\n  # テナントのライセンス一覧は最初の1回だけ取得し、以降は SkuPartNumber で引く\n  if ($null -eq $script:SkuIds) {\n    $script:SkuIds = @{}\n    foreach ($sku in Get-MgSubscribedSku) {\n      $script:SkuIds[$sku.SkuPartNumber] = $sku.SkuId\n    }\n  }\n  return $script:SkuIds[$SkuPartNumber]\n}\n\nfunction New-OnboardingUser {\n  param(\n    [int]$Row,\n    [string]$DisplayName,\n    [string]$MailNickname,\n    [string]$Domain,\n    [string]$Department,\n    [string]$LicenseSku,\n    [string]$LicenseType,\n    [string]$ContractEndDate = ""\n  )\n\n  $UserPrincipalName = "$MailNickname@$Domain"\n  Write-Host "[INFO] 行 $Row`: Entra ID ユーザーを作成します（$DisplayName）"\n\n  try {\n    $newUser = New-MgUser `\n      -DisplayName $DisplayName `\n      -UserPrincipalName $UserPrincipalName `\n      -MailNickname $MailNickname `\n      -Department $Department `\n      -UsageLocation $UsageLocation `\n      -AccountEnabled $true `\n      -PasswordProfile @{\n          ForceChangePasswordNextSignIn = $true\n          Password = (New-Guid).Guid\n      } `\n      -ErrorAction Stop\n  }\n  catch {\n    Write-Host "[ERROR] 行 $Row`: ユーザー作成に失敗しました: $($_.Exception.Message)" -ForegroundColor Red\n    $script:Failed++\n    return\n  }\n\n  $skuId = Get-OnboardingSkuId -SkuPartNumber $LicenseSku\n  if ($skuId) {\n    Set-MgUserLicense `\n      -UserId $newUser.Id `\n      -AddLicenses @{ SkuId = $skuId } `\n      -RemoveLicenses @()\n\n    Write-Host "[SUCCESS] $LicenseType ライセンスを付与しました"\n  } else {\n    Write-Host "[WARN] $LicenseType ライセンスが見つからないためスキップしました"\n  }\n\n  Write-Host "[SUCCESS] ユーザー作成完了: $DisplayName ($UserPrincipalName)" -ForegroundColor Green\n  if ($ContractEndDate) {\n    # 注意: Entra ID では AccountExpirationDate は制限付きの機能です（必要に応じて別途設定してください）\n    Write-Host "[INFO] 有効期限: $ContractEndDate" -ForegroundColor Yellow\n  }\n  $script:Succeeded++\n}\n\nfunction Write-OnboardingSummary {\n  Write-Host "[INFO] 完了: 成功 $script:Succeeded 件 / 失敗 $script:Failed 件"\n}\n\nConnect-OnboardingGraph\n\n# ----- 従業員ごとの処理（1行1名） -----\n',
+        ],
+        [(1, 'generated_at')],
+    ),
+    'onboarding_contract.ps1': (
+        '0e7d039b0f0f7f4ebf08458e962e176c980262f9739112cd4669dac46bf0e71b',
+        [
+            '# =========================================\n# Entra ID ユーザー作成（派遣社員）\n# Generated at: ',
+            '{generated_at}',
+            '\n# 契約終了日: ',
+            '{contract_end_date}',
+            '\n# =========================================\n\n$DisplayName = "',
+            '{employee_name}',
+            '"\n$UserPrincipalName = "',
+            '{sam_account_name}',
+            '@',
+            '{company_domain}',
+            '"\n$MailNickname = "',
+            '{sam_account_name}',
+            '"\n$Department = "',
+            '{department}',
+            '"\n$UsageLocation = "JP"\n$AccountExpirationDate = Get-Date "',
+            '{contract_end_date}',
+            '"\n$TempPassword = (New-Guid).Guid\n\nWrite-Host "[INFO] Entra ID ユーザーを作成します（制限ユーザー・有効期限あり、Dry-run前提）"\n\n$newUser = New-MgUser `\n  -DisplayName $DisplayName `\n  -UserPrincipalName $UserPrincipalName `\n  -MailNickname $MailNickname `\n  -Department $Department `\n  -UsageLocation $UsageLocation `\n  -AccountEnabled $true `\n  -PasswordProfile @{\n      ForceChangePasswordNextSignIn = $true\n      Password = $TempPassword\n  }\n\n# 注意: Entra ID では AccountExpirationDate は制限付きの機能です\n# 必要に応じて別途設定してください\n\n$sku = Get-MgSubscribedSku | Where-Object { $_.SkuPartNumber -eq "',
+            '{license_sku}',
+            '" }\n\nif ($sku) {\n  Set-MgUserLicense `\n    -UserId $newUser.Id `\n    -AddLicenses @{ SkuId = $sku.SkuId } `\n    -RemoveLicenses @()\n\n  Write-Host "[SUCCESS] ',
+            '{license_type}',
+            ' ライセンスを付与しました"\n} else {\n  Write-Host "[WARN] ',
+            '{license_type}',
+            ' ライセンスが見つからないためスキップしました"\n}\n\nWrite-Host "[SUCCESS] ユーザー作成完了: $DisplayName ($UserPrincipalName)" -ForegroundColor Green\nWrite-Host "[INFO] 有効期限: ',
+            '{contract_end_date}',
+            '" -ForegroundColor Yellow\n',
+        ],
+        [(1, 'generated_at'), (3, 'contract_end_date'), (5, 'employee_name'), (7, 'sam_account_name'), (9, 'company_domain'), (11, 'sam_account_name'), (13, 'department'), (15, 'contract_end_date'), (17, 'license_sku'), (19, 'license_type'), (21, 'license_type'), (23, 'contract_end_date')],
+    ),
+    'onboarding_graph_batch.ps1': (
+        '11692df026c4bc6454d6b3f31203192b4165f2b70fc89b0e5208a769d8396b74',
+        [
+            '# =========================================\n# Entra ID ユーザー一括作成（Microsoft Graph JSON バッチ）\n# Generated at: ',
+            '{generated_at}',
+            '\n#\n# ライセンス SKU はスクリプトの開始時に1回だけ取得して対応表にし、\n# ユーザー作成とライセンス付与は $batch リクエスト（1回あたり最大20件）にまとめて送信します。\n# スロットリング（429 / 503 / 504）された要求は Retry-After（無い場合は指数バックオフ）に従って再送します。\n# 従業員ごとのデータは末尾の $Users.Add(...)（1行1名）で定義します。\n# =========================================\n\n$UsageLocation = "JP"\n$BatchSize = 20\n$MaxAttempts = 6\n$BatchUri = \'https://graph.microsoft.com/v1.0/$batch\'\n\nif ($null -eq (Get-MgContext)) {\n  Write-Host "[INFO] Microsoft Graph に接続します"\n  Connect-MgGraph -Scopes "User.ReadWrite.All", "Organization.Read.All" -NoWelcome\n}\n\n# ライセンス SKU の対応表（SkuPartNumber → SkuId）\n$SkuIds = @{}\nforeach ($sku in Get-MgSubscribedSku) {\n  $SkuIds[$sku.SkuPartNumber] = $sku.SkuId\n}\n\nfunction Invoke-GraphBatch {\n  # 要求を最大 $BatchSize 件ずつ $batch で送信し、id → 応答（status / headers / body）の対応表を返す\n  param(\n    [object[]]$Requests,\n    [int[]]$RetryStatus = @(429, 503, 504)\n  )\n\n  $responses = @{}\n  for ($offset = 0; $offset -lt $Requests.Count; $offset += $BatchSize) {\n    $last = [Math]::Min($offset + $BatchSize, $Requests.Count) - 1\n    $pending = @($Requests[$offset..$last])\n    $attempt = 0\n    while ($pending.Count -gt 0) {\n      $attempt++\n      $body = @{ requests = $pending } | ConvertTo-Json -Depth 10 -Compress\n      try {\n        $result = Invoke-MgGraphRequest -Method POST -Uri $BatchUri -Body $body -ContentType "application/json" -OutputType PSObject\n      }\n      catch {\n        # $batch 自体がスロットリングされた場合は全件を再送する\n        $status = 0\n        if ($_.Exception.Response) { $status = [int]$_.Exception.Response.StatusCode }\n        if ($RetryStatus -notcontains $status -or $attempt -ge $MaxAttempts) { throw }\n        $wait = [Math]::Min(60, [Math]::Pow(2, $attempt))\n        Write-Host "[WARN] バッチ要求がスロットリングされました。$wait 秒後に再送します（$attempt 回目）" -ForegroundColor Yellow\n        Start-Sleep -Seconds $wait\n        continue\n      }\n\n      $retry = [System.Collections.Generic.List[object]]::new()\n      $wait = 0\n      foreach ($response in $result.responses) {\n        if ($RetryStatus -contains [int]$response.status -and $attempt -lt $MaxAttempts) {\n          $retry.Add(($pending | Where-Object { $_.id -eq $response.id }))\n          if ($response.headers -and $response.headers.\'Retry-After\') {\n            $wait = [Math]::Max($wait, [int]$response.headers.\'Retry-After\')\n          }\n        }\n        else {\n          $responses[$response.id] = $response\n        }\n      }\n      if ($retry.Count -gt 0) {\n        if ($wait -le 0) { $wait = [Math]::Min(60, [Math]::Pow(2, $attempt)) }\n        Write-Host "[WARN] $($retry.Count) 件の要求がスロットリングされました。$wait 秒後に再送します（$attempt 回目）" -ForegroundColor Yellow\n        Start-Sleep -Seconds $wait\n      }\n      $pending = $retry.ToArray()\n    }\n  }\n  return $responses\n}\n\nfunction Get-GraphErrorMessage {\n  param([object]$Response)\n  if ($null -eq $Response) { return "応答がありません" }\n  if ($Response.body -and $Response.body.error) { return $Response.body.error.message }\n  return "HTTP $($Response.status)"\n}\n\nfunction Invoke-OnboardingGraphBatch {\n  param([System.Collections.Generic.List[hashtable]]$Users)\n\n  if ($Users.Count -eq 0) {\n    Write-Host "[INFO] 作成するユーザーがありません"\n    return\n  }\n\n  # 1. ユーザー作成（$batch）\n  Write-Host "[INFO] $($Users.Count) 名の Entra ID ユーザーを作成します"\n  $createRequests = [System.Collections.Generic.List[object]]::new()\n  foreach ($user in $Users) {\n    $createRequests.Add(@{\n      id = [string]$user.Row\n      method = "POST"\n      url = "/users"\n      headers = @{ "Content-Type" = "application/json" }\n      body = @{\n        accountEnabled = $true\n        displayName = $user.DisplayName\n        mailNickname = $user.MailNickname\n        userPrincipalName = "$($user.MailNickname)@$($user.Domain)"\n        department = $user.Department\n        usageLocation = $UsageLocation\n        passwordProfile = @{\n          forceChangePasswordNextSignIn = $true\n          password = (New-Guid).Guid\n        }\n      }\n    })\n  }\n  $created = Invoke-GraphBatch -Requests $createRequests.ToArray()\n\n  # 2. ライセンス付与（$batch、SKU は対応表から引く）\n  $succeeded = 0\n  $failed = 0\n  $licenseRequests = [System.Collections.Generic.List[object]]::new()\n  foreach ($user in $Users) {\n    $response = $created[[string]$user.Row]\n    if ($null -eq $response -or [int]$response.status -ne 201) {\n      Write-Host "[ERROR] 行 $($user.Row): ユーザー作成に失敗しました（$($user.DisplayName)）: $(Get-GraphErrorMessage $response)" -ForegroundColor Red\n      $failed++\n      continue\n    }\n    Write-Host "[SUCCESS] ユーザー作成完了: $($user.DisplayName) ($($response.body.userPrincipalName))" -ForegroundColor Green\n    if ($user.ContractEndDate) {\n      # 注意: Entra ID では AccountExpirationDate は制限付きの機能です（必要に応じて別途設定してください）\n      Write-Host "[INFO] 有効期限: $($user.ContractEndDate)" -ForegroundColor Yellow\n    }\n    $succeeded++\n\n    $skuId = $SkuIds[$user.LicenseSku]\n    if (-not $skuId) {\n      Write-Host "[WARN] 行 $($user.Row): $($user.LicenseType) ライセンスが見つからないためスキップしました"\n      continue\n    }\n    $licenseRequests.Add(@{\n      id = [string]$user.Row\n      method = "POST"\n      url = "/users/$($response.body.id)/assignLicense"\n      headers = @{ "Content-Type" = "application/json" }\n      body = @{\n        addLicenses = @(@{ skuId = $skuId })\n        removeLicenses = @()\n      }\n    })\n  }\n\n  if ($licenseRequests.Count -gt 0) {\n    # 作成直後のユーザーはディレクトリへの反映待ちで 404 になることがあるため、404 も再送する\n    $assigned = Invoke-GraphBatch -Requests $licenseRequests.ToArray() -RetryStatus @(404, 429, 503, 504)\n    foreach ($user in $Users) {\n      $response = $assigned[[string]$user.Row]\n      if ($null -eq $response) { continue }\n      if ([int]$response.status -eq 200) {\n        Write-Host "[SUCCESS] 行 $($user.Row): $($user.LicenseType) ライセンスを付与しました"\n      }\n      else {\n        Write-Host "[WARN] 行 $($user.Row): ライセンス付与に失敗しました: $(Get-GraphErrorMessage $response)" -ForegroundColor Yellow\n      }\n    }\n  }\n\n  Write-Host "[INFO] 完了: 成功 $succeeded 件 / 失敗 $failed 件"\n}\n\n$Users = [System.Collections.Generic.List[hashtable]]::new()\n\n# ----- 従業員ごとのデータ（1行1名） -----\n',
+        ],
+        [(1, 'generated_at')],
+    ),
+    'onboarding_regular.ps1': (
+        'cd25dd1e7176fafa0125039559f93240ddd680cdb3cb3a59cdb8fef136fbb511',
+        [
+            '# =========================================\n# Entra ID ユーザー作成（正社員）\n# Generated at: ',
+            '{generated_at}',
+            '\n# =========================================\n\n$DisplayName = "',
+            '{employee_name}',
+            '"\n$UserPrincipalName = "',
+            '{sam_account_name}',
+            '@',
+            '{company_domain}',
+            '"\n$MailNickname = "',
+            '{sam_account_name}',
+            '"\n$Department = "',
+            '{department}',
+            '"\n$UsageLocation = "JP"\n$TempPassword = (New-Guid).Guid\n\nWrite-Host "[INFO] Entra ID ユーザーを作成します（Dry-run前提）"\n\n$newUser = New-MgUser `\n  -DisplayName $DisplayName `\n  -UserPrincipalName $UserPrincipalName `\n  -MailNickname $MailNickname `\n  -Department $Department `\n  -UsageLocation $UsageLocation `\n  -AccountEnabled $true `\n  -PasswordProfile @{\n      ForceChangePasswordNextSignIn = $true\n      Password = $TempPassword\n  }\n\n$sku = Get-MgSubscribedSku | Where-Object { $_.SkuPartNumber -eq "',
+            '{license_sku}',
+            '" }\n\nif ($sku) {\n  Set-MgUserLicense `\n    -UserId $newUser.Id `\n    -AddLicenses @{ SkuId = $sku.SkuId } `\n    -RemoveLicenses @()\n\n  Write-Host "[SUCCESS] ',
+            '{license_type}',
+            ' ライセンスを付与しました"\n} else {\n  Write-Host "[WARN] ',
+            '{license_type}',
+            ' ライセンスが見つからないためスキップしました"\n}\n\nWrite-Host "[SUCCESS] ユーザー作成完了: $DisplayName ($UserPrincipalName)" -ForegroundColor Green\n',
+        ],
+        [(1, 'generated_at'), (3, 'employee_name'), (5, 'sam_account_name'), (7, 'company_domain'), (9, 'sam_account_name'), (11, 'department'), (13, 'license_sku'), (15, 'license_type'), (17, 'license_type')],
+    ),
+}
@@ -0,0 +1,313 @@
+"""
+氏名ローマ字変換サービス
+かな → ローマ字の変換表と、漢字の姓・名の読み辞書（トライ木）を使って
+従業員名から MailNickname（例: "yamada.taro"）を生成する。外部サービスは使用しない。
+"""
+
+import html
+import re
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# ひらがな → ローマ字（ヘボン式）
+KANA_TABLE: Dict[str, str] = {
+    "あ": "a", "い": "i", "う": "u", "え": "e", "お": "o",
+    "か": "ka", "き": "ki", "く": "ku", "け": "ke", "こ": "ko",
+    "さ": "sa", "し": "shi", "す": "su", "せ": "se", "そ": "so",
+    "た": "ta", "ち": "chi", "つ": "tsu", "て": "te", "と": "to",
+    "な": "na", "に": "ni", "ぬ": "nu", "ね": "ne", "の": "no",
+    "は": "ha", "ひ": "hi", "ふ": "fu", "へ": "he", "ほ": "ho",
+    "ま": "ma", "み": "mi", "む": "mu", "め": "me", "も": "mo",
+    "や": "ya", "ゆ": "yu", "よ": "yo",
+    "ら": "ra", "り": "ri", "る": "ru", "れ": "re", "ろ": "ro",
+    "わ": "wa", "ゐ": "i", "ゑ": "e", "を": "o", "ん": "n",
+    "が": "ga", "ぎ": "gi", "ぐ": "gu", "げ": "ge", "ご": "go",
+    "ざ": "za", "じ": "ji", "ず": "zu", "ぜ": "ze", "ぞ": "zo",
+    "だ": "da", "ぢ": "ji", "づ": "zu", "で": "de", "ど": "do",
+    "ば": "ba", "び": "bi", "ぶ": "bu", "べ": "be", "ぼ": "bo",
+    "ぱ": "pa", "ぴ": "pi", "ぷ": "pu", "ぺ": "pe", "ぽ": "po",
+    "ぁ": "a", "ぃ": "i", "ぅ": "u", "ぇ": "e", "ぉ": "o",
+    "ゃ": "ya", "ゅ": "yu", "ょ": "yo", "ゎ": "wa", "ゔ": "vu",
+}
+
+# 拗音・外来音（2文字で1音）
+YOUON_TABLE: Dict[str, str] = {
+    "きゃ": "kya", "きゅ": "kyu", "きょ": "kyo",
+    "しゃ": "sha", "しゅ": "shu", "しょ": "sho", "しぇ": "she",
+    "ちゃ": "cha", "ちゅ": "chu", "ちょ": "cho", "ちぇ": "che",
+    "にゃ": "nya", "にゅ": "nyu", "にょ": "nyo",
+    "ひゃ": "hya", "ひゅ": "hyu", "ひょ": "hyo",
+    "みゃ": "mya", "みゅ": "myu", "みょ": "myo",
+    "りゃ": "rya", "りゅ": "ryu", "りょ": "ryo",
+    "ぎゃ": "gya", "ぎゅ": "gyu", "ぎょ": "gyo",
+    "じゃ": "ja", "じゅ": "ju", "じょ": "jo", "じぇ": "je",
+    "ぢゃ": "ja", "ぢゅ": "ju", "ぢょ": "jo",
+    "びゃ": "bya", "びゅ": "byu", "びょ": "byo",
+    "ぴゃ": "pya", "ぴゅ": "pyu", "ぴょ": "pyo",
+    "ふぁ": "fa", "ふぃ": "fi", "ふぇ": "fe", "ふぉ": "fo",
+    "てぃ": "ti", "でぃ": "di", "とぅ": "tu", "どぅ": "du",
+    "うぃ": "wi", "うぇ": "we", "うぉ": "wo",
+    "ゔぁ": "va", "ゔぃ": "vi", "ゔぇ": "ve", "ゔぉ": "vo",
+}
+
+_VOWELS = frozenset("aeiou")
+_KATAKANA_OFFSET = ord("ア") - ord("あ")
+_NICKNAME_INVALID_PATTERN = re.compile(r"[^a-z0-9.]")
+_DOTS_PATTERN = re.compile(r"\.{2,}")
+
+# MailNickname の最大長（Entra ID の制限）
+MAX_NICKNAME_LENGTH = 64
+
+
+def katakana_to_hiragana(text: str) -> str:
+    """カタカナをひらがなに変換する（長音記号などはそのまま）"""
+    return "".join(
+        chr(ord(ch) - _KATAKANA_OFFSET) if "ァ" <= ch <= "ヴ" else ch
+        for ch in text
+    )
+
+
+def kana_to_romaji(kana: str) -> str:
+    """
+    かな文字列をローマ字に変換する（英数字はそのまま出力）
+
+    - 促音（っ）は次の子音を重ねる（例: はっとり → hattori）
+    - 長音（おう・おお・うう・ー）は省略する（例: さとう → sato、ゆうき → yuki）
+
+    Args:
+        kana: ひらがな・カタカナの文字列
+
+    Returns:
+        str: ローマ字（小文字）
+    """
+    kana = katakana_to_hiragana(kana)
+
+    # 第1段階: 音の単位に分割（英数字は1文字ずつ、長音の判定対象外）
+    units: List[Tuple[str, bool]] = []
+    i = 0
+    length = len(kana)
+    while i < length:
+        pair = kana[i:i + 2]
+        if pair in YOUON_TABLE:
+            units.append((YOUON_TABLE[pair], True))
+            i += 2
+            continue
+        ch = kana[i]
+        if ch in ("っ", "ー"):
+            units.append((ch, True))
+        elif ch in KANA_TABLE:
+            units.append((KANA_TABLE[ch], True))
+        elif ch.isascii() and ch.isalnum():
+            units.append((ch.lower(), False))
+        i += 1
+
+    # 第2段階: 促音・長音の処理
+    out: List[str] = []
+    prev_vowel = ""
+    for index, (unit, from_kana) in enumerate(units):
+        following = units[index + 1][0] if index + 1 < len(units) else ""
+        if not from_kana:
+            out.append(unit)
+            prev_vowel = ""
+            continue
+        if unit == "っ":
+            if following and following[0] not in _VOWELS and following[0].isalpha():
+                out.append("t" if following.startswith("ch") else following[0])
+            continue
+        if unit == "ー":
+            continue
+        # 長音: 「お段 + う/お」「う段 + う」（次が「あ」「え」の場合は別の音節とみなす: いのうえ → inoue）
+        if (
+            unit in ("u", "o")
+            and (prev_vowel == "o" or (prev_vowel == "u" and unit == "u"))
+            and following not in ("a", "e")
+        ):
+            continue
+        out.append(unit)
+        prev_vowel = unit[-1] if unit[-1] in _VOWELS else ""
+    return "".join(out)
+
+
+def is_kana(ch: str) -> bool:
+    """ひらがな・カタカナ（長音記号を含む）かどうか"""
+    return "ぁ" <= ch <= "ゖ" or "ァ" <= ch <= "ヺ" or ch == "ー"
+
+
+class ReadingTrie:
+    """
+    表記 → 読みのトライ木
+
+    各ノードは {文字: 子ノード} の辞書で、読みは空文字キーに格納する。
+    名前の先頭から最長一致で読みを検索するために使用する。
+    """
+
+    __slots__ = ("_root", "size")
+
+    def __init__(self):
+        self._root: Dict[str, object] = {}
+        self.size = 0
+
+    def insert(self, key: str, reading: str) -> None:
+        """表記と読みを登録する"""
+        node = self._root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        if "" not in node:
+            self.size += 1
+        node[""] = reading
+
+    def get(self, key: str) -> Optional[str]:
+        """表記に完全一致する読みを取得する"""
+        node = self._root
+        for ch in key:
+            node = node.get(ch)
+            if node is None:
+                return None
+        return node.get("")
+
+    def longest_prefix(self, text: str, start: int = 0) -> Optional[Tuple[int, str]]:
+        """
+        text[start:] の先頭に最長一致する表記を検索する
+
+        Returns:
+            Optional[Tuple[int, str]]: (一致した末尾の位置, 読み)、該当なしの場合は None
+        """
+        node = self._root
+        found = None
+        for i in range(start, len(text)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            reading = node.get("")
+            if reading is not None:
+                found = (i + 1, reading)
+        return found
+
+
+class Romanizer:
+    """
+    氏名 → ローマ字変換エンジン
+
+    姓・名それぞれの読み辞書（トライ木）と1文字の読み表を起動時に1回だけ読み込み、
+    変換結果は上限付きのLRUキャッシュに保持する。
+    """
+
+    def __init__(self, cache_size: int = 65536):
+        self.surnames = ReadingTrie()
+        self.given_names = ReadingTrie()
+        self.char_readings: Dict[str, str] = {}
+        self.romanize = lru_cache(maxsize=cache_size)(self._romanize)
+
+    @classmethod
+    def from_file(cls, path: Path, cache_size: int = 65536) -> "Romanizer":
+        """
+        読み辞書（TSV: 種別, 表記, 読み）を読み込む
+
+        種別: surname（姓）/ given（名）/ char（1文字の読み）。# で始まる行はコメント
+
+        Args:
+            path: 読み辞書のパス
+            cache_size: LRUキャッシュの上限件数
+
+        Returns:
+            Romanizer: 変換エンジン
+
+        Raises:
+            FileNotFoundError: 辞書ファイルが見つからない場合
+        """
+        romanizer = cls(cache_size=cache_size)
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                kind, key, reading = line.rstrip("\n").split("\t")[:3]
+                romanizer.add(kind, key, reading)
+        return romanizer
+
+    def add(self, kind: str, key: str, reading: str) -> None:
+        """読みを1件登録する"""
+        if kind == "surname":
+            self.surnames.insert(key, reading)
+        elif kind == "given":
+            self.given_names.insert(key, reading)
+        elif kind == "char":
+            self.char_readings[key] = reading
+        else:
+            raise ValueError(f"不正な読み辞書の種別: {kind}")
+        self.romanize.cache_clear()
+
+    def _read_token(self, token: str, primary: ReadingTrie, secondary: ReadingTrie) -> Optional[str]:
+        """
+        1語（姓または名）の読みを取得する
+
+        かな・英数字はそのまま、漢字は辞書の最長一致 → 1文字の読みの順に解決し、
+        「々」は直前の読みを繰り返す。アクセント付きのラテン文字は基底の文字として扱い、
+        中黒などの記号は読み飛ばす。読めない文字（辞書に無い漢字など）がある場合は None を返す
+        （一部の文字だけを読んだ名前は別人の名前と重複しうるため使用しない）
+        """
+        parts: List[str] = []
+        i = 0
+        length = len(token)
+        while i < length:
+            ch = token[i]
+            if is_kana(ch) or (ch.isascii() and ch.isalnum()):
+                parts.append(ch)
+                i += 1
+                continue
+            match = primary.longest_prefix(token, i) or secondary.longest_prefix(token, i)
+            if match is not None:
+                i, reading = match
+                parts.append(reading)
+                continue
+            i += 1
+            if ch == "々":
+                if not parts:
+                    return None
+                parts.append(parts[-1])
+                continue
+            reading = self.char_readings.get(ch)
+            if reading is not None:
+                parts.append(reading)
+                continue
+            base = unicodedata.normalize("NFKD", ch)[0]
+            if base.isascii() and base.isalnum():
+                parts.append(base)
+            elif unicodedata.category(ch)[0] in ("L", "N"):
+                return None
+        return kana_to_romaji("".join(parts))
+
+    def _romanize(self, name: str) -> str:
+        """氏名をローマ字に変換する（LRUキャッシュ経由で呼び出す）"""
+        name = unicodedata.normalize("NFKC", html.unescape(name)).strip()
+        tokens = name.split()
+        if not tokens:
+            return ""
+
+        if len(tokens) == 1 and not tokens[0].isascii():
+            token = tokens[0]
+            # 姓と名の間に空白が無い場合は、姓の辞書の最長一致で分割する
+            match = self.surnames.longest_prefix(token)
+            if match is not None and match[0] < len(token):
+                end, reading = match
+                tokens = [token[:end], token[end:]]
+
+        romaji: List[str] = []
+        for index, token in enumerate(tokens):
+            if token.isascii():
+                reading = token.lower()
+            elif index == 0:
+                reading = self._read_token(token, self.surnames, self.given_names)
+            else:
+                reading = self._read_token(token, self.given_names, self.surnames)
+            if reading is None:
+                # 読めない文字を含む場合は名前全体を変換できないものとする
+                return ""
+            romaji.append(reading)
+
+        nickname = ".".join(part for part in romaji if part)
+        nickname = _NICKNAME_INVALID_PATTERN.sub("", nickname)
+        nickname = _DOTS_PATTERN.sub(".", nickname).strip(".")
+        return nickname[:MAX_NICKNAME_LENGTH].rstrip(".")
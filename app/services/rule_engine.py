@@ -0,0 +1,239 @@
+"""
+判断ルールエンジン
+顧客・雇用形態・部署ごとの判断ルールをルールファイルから読み込み、
+検索用のインデックスにコンパイルする
+"""
+
+import hashlib
+import html
+import json
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+
+# 全ての顧客・部署に一致するワイルドカード
+WILDCARD = "*"
+
+# インデックスのキー: (顧客名, 雇用形態, 部署)
+RuleKey = Tuple[str, str, str]
+
+# ルールで上書きできる項目
+RULE_FIELDS = ("user_type", "license_type", "license_sku", "has_expiration", "contract_days")
+
+# 必須項目（既定ルールを含め、いずれかのルールで指定する必要がある）
+REQUIRED_FIELDS = ("user_type", "license_type", "license_sku")
+
+# 顧客のルールと部署のルールから解決した組み合わせをインデックスに追加する件数の上限
+MERGED_CACHE_SIZE = 4096
+
+
+class RuleDefinition(BaseModel):
+    """ルールファイル内の1ルール（未指定の項目はより一般的なルールから継承する）"""
+
+    company: str = Field(default=WILDCARD, description="顧客名（* は全顧客）")
+    employment_type: str = Field(..., description="雇用形態")
+    department: str = Field(default=WILDCARD, description="部署（* は全部署）")
+    user_type: Optional[str] = None
+    license_type: Optional[str] = None
+    license_sku: Optional[str] = None
+    has_expiration: Optional[bool] = None
+    contract_days: Optional[int] = Field(default=None, ge=1, description="契約期間（日数）")
+
+
+class RuleSet(BaseModel):
+    """ルールファイル全体"""
+
+    version: Optional[str] = Field(default=None, description="ルールのバージョン（省略時は内容のハッシュ）")
+    rules: List[RuleDefinition] = Field(default_factory=list)
+
+
+class CompiledRule:
+    """
+    コンパイル済みルール
+
+    継承関係を解決した最終的な設定値と、UI表示用の説明文テンプレートを保持する
+    """
+
+    __slots__ = (
+        "user_type", "license_type", "license_sku", "has_expiration",
+        "contract_days", "explanation", "expiration_explanation",
+    )
+
+    def __init__(self, employment_type: str, values: Dict):
+        self.user_type: str = values["user_type"]
+        self.license_type: str = values["license_type"]
+        self.license_sku: str = values["license_sku"]
+        self.has_expiration: bool = bool(values.get("has_expiration"))
+        self.contract_days: int = values.get("contract_days") or RuleEngine.DEFAULT_CONTRACT_DAYS
+
+        # UI表示用の説明文（有効期限の日付部分のみ判断時に埋め込む）
+        self.explanation = (
+            f"このユーザーは【{employment_type}】のため、"
+            f"{self.license_type}を付与する{self.user_type}として作成します。"
+        )
+        self.expiration_explanation = "また、契約終了日（{}）に有効期限を設定します。"
+
+
+class RuleEngine:
+    """
+    判断ルールのインデックス
+
+    (顧客名, 雇用形態, 部署) をキーとする辞書に、ルールファイルで定義されたキーだけを継承関係を解決して格納する。
+    判断時は最大4回の辞書参照（顧客+部署 → 顧客 → 部署 → 既定）で完了する。
+    顧客のルールと部署のルールがそれぞれ定義されている組み合わせは、初回の判断時に両方を継承したルールを
+    作成してインデックスに追加する（顧客数×部署数の組み合わせを事前に作成しない）。
+    """
+
+    # 有効期限の既定値（日数）
+    DEFAULT_CONTRACT_DAYS = 365
+
+    def __init__(self, rule_set: RuleSet, version: Optional[str] = None):
+        self.version = rule_set.version or version or ""
+        self._layers: Dict[RuleKey, Dict] = {}
+        self._declared: Dict[RuleKey, CompiledRule] = {}
+        self._index: Dict[RuleKey, CompiledRule] = {}
+        self._expiration_dates: Dict[Tuple[date, int], str] = {}
+        self._compile(rule_set.rules)
+
+    @classmethod
+    def from_dict(cls, rules: Dict[str, Dict]) -> "RuleEngine":
+        """
+        雇用形態をキーとする既定ルールの辞書からエンジンを構築する
+
+        Args:
+            rules: {雇用形態: {user_type, license_type, ...}} 形式の辞書
+
+        Returns:
+            RuleEngine: ルールエンジン
+        """
+        definitions = [
+            RuleDefinition(employment_type=employment_type, **values)
+            for employment_type, values in rules.items()
+        ]
+        payload = json.dumps(rules, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        return cls(RuleSet(rules=definitions), version=hashlib.sha256(payload).hexdigest()[:12])
+
+    @classmethod
+    def from_file(cls, path: Path, defaults: Optional[Dict[str, Dict]] = None) -> "RuleEngine":
+        """
+        ルールファイル（JSON）からエンジンを構築する
+
+        Args:
+            path: ルールファイルのパス
+            defaults: ルールファイルより優先度の低い既定ルール（雇用形態をキーとする辞書）
+
+        Returns:
+            RuleEngine: ルールエンジン
+
+        Raises:
+            FileNotFoundError: ルールファイルが見つからない場合
+            ValueError: ルールファイルの形式が不正な場合
+        """
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"ルールファイルが見つかりません: {path}")
+
+        raw = path.read_bytes()
+        rule_set = RuleSet.model_validate_json(raw)
+        if defaults:
+            # 既定ルールを先頭に置き、ルールファイルの定義で上書きする
+            base = [
+                RuleDefinition(employment_type=employment_type, **values)
+                for employment_type, values in defaults.items()
+            ]
+            rule_set = RuleSet(version=rule_set.version, rules=base + rule_set.rules)
+        return cls(rule_set, version=hashlib.sha256(raw).hexdigest()[:12])
+
+    @property
+    def employment_types(self) -> Tuple[str, ...]:
+        """ルールが定義されている雇用形態"""
+        return tuple(sorted({key[1] for key in self._declared}))
+
+    def _compile(self, definitions: Iterable[RuleDefinition]) -> None:
+        """ルール定義を継承関係を解決したインデックスに変換する"""
+        # 同じキーのルールは後から定義したものを優先してマージする
+        layers: Dict[RuleKey, Dict] = {}
+        for definition in definitions:
+            # リクエスト側はHTMLエスケープ済みのため、キーも同じ形式に揃える
+            key = (
+                html.escape(definition.company.strip()) or WILDCARD,
+                definition.employment_type,
+                html.escape(definition.department.strip()) or WILDCARD,
+            )
+            values = {
+                name: getattr(definition, name)
+                for name in RULE_FIELDS
+                if getattr(definition, name) is not None
+            }
+            layers.setdefault(key, {}).update(values)
+
+        self._layers = layers
+        for key in layers:
+            self._declared[key] = self._resolve(*key)
+        self._index = dict(self._declared)
+
+    def _resolve(self, company: str, employment_type: str, department: str) -> CompiledRule:
+        """
+        顧客・雇用形態・部署の組み合わせのルールを、定義されているルールを継承して作成する
+
+        Raises:
+            ValueError: 必須項目がいずれのルールにも無い場合
+        """
+        # 優先度の低い順: 既定 → 部署 → 顧客 → 顧客+部署
+        chain = (
+            (WILDCARD, employment_type, WILDCARD),
+            (WILDCARD, employment_type, department),
+            (company, employment_type, WILDCARD),
+            (company, employment_type, department),
+        )
+        merged: Dict = {}
+        for key in chain:
+            merged.update(self._layers.get(key, {}))
+        missing = [name for name in REQUIRED_FIELDS if name not in merged]
+        if missing:
+            raise ValueError(
+                f"ルールの必須項目が不足しています: {employment_type} "
+                f"(顧客: {company}, 部署: {department}) {', '.join(missing)}"
+            )
+        return CompiledRule(employment_type, merged)
+
+    def lookup(self, company: str, employment_type: str, department: str) -> Optional[CompiledRule]:
+        """
+        最も具体的なルールを取得する
+
+        Args:
+            company: 顧客名
+            employment_type: 雇用形態
+            department: 部署
+
+        Returns:
+            Optional[CompiledRule]: 一致したルール（該当なしの場合は None）
+        """
+        index = self._index
+        rule = index.get((company, employment_type, department))
+        if rule is not None:
+            return rule
+        company_rule = index.get((company, employment_type, WILDCARD))
+        department_rule = index.get((WILDCARD, employment_type, department))
+        if company_rule is not None and department_rule is not None and WILDCARD not in (company, department):
+            # 顧客のルールと部署のルールの両方を継承したルールを作成し、次回からは1回の参照で取得する
+            rule = self._resolve(company, employment_type, department)
+            if len(index) - len(self._declared) >= MERGED_CACHE_SIZE:
+                self._index = index = dict(self._declared)
+            index[(company, employment_type, department)] = rule
+            return rule
+        return company_rule or department_rule or index.get((WILDCARD, employment_type, WILDCARD))
+
+    def expiration_date(self, today: date, contract_days: int) -> str:
+        """有効期限（YYYY-MM-DD形式）を取得する（同じ日付・日数の計算結果は再利用する）"""
+        key = (today, contract_days)
+        value = self._expiration_dates.get(key)
+        if value is None:
+            if len(self._expiration_dates) > 1024:
+                self._expiration_dates.clear()
+            value = (today + timedelta(days=contract_days)).strftime("%Y-%m-%d")
+            self._expiration_dates[key] = value
+        return value
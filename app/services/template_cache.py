@@ -0,0 +1,297 @@
+"""
+PowerShellテンプレートキャッシュ
+テンプレートを起動時に一度だけ解析し、コンパイル済みの形でメモリに保持する
+"""
+
+import hashlib
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# テンプレート変数のパターン（例: {employee_name}）
+# PowerShellのハッシュテーブル（@{ ... }）やスクリプトブロック（{ $_ ... }）には一致しない
+PLACEHOLDER_PATTERN = re.compile(r"\{([a-z_][a-z0-9_]*)\}")
+
+
+def source_digest(source: str) -> str:
+    """テンプレート本文のハッシュ値（更新の有無の判定用）"""
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+class TemplateSlot(str):
+    """CompiledTemplate.from_values で変数スロットとして扱う値（文字列の値は変数名）"""
+
+
+class CompiledTemplate:
+    """
+    コンパイル済みテンプレート
+
+    テンプレート本文をリテラル部分と変数スロットに分割して保持し、
+    1回の走査で変数を埋め込んで出力する
+    """
+
+    __slots__ = ("name", "mtime_ns", "size", "digest", "_parts", "_slots")
+
+    def __init__(self, name: str, source: str, mtime_ns: int = 0, size: int = 0):
+        self.name = name
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = source_digest(source)
+
+        # _parts: リテラルと変数スロットを交互に並べたリスト
+        # _slots: (_parts内の位置, 変数名) のタプル
+        parts: List[str] = []
+        slots: List[Tuple[int, str]] = []
+        pos = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            parts.append(source[pos:match.start()])
+            slots.append((len(parts), match.group(1)))
+            # 未指定の変数は元の表記のまま出力する
+            parts.append(match.group(0))
+            pos = match.end()
+        parts.append(source[pos:])
+
+        self._parts = parts
+        self._slots = tuple(slots)
+
+    @classmethod
+    def from_parts(
+        cls,
+        name: str,
+        parts: Sequence[str],
+        slots: Sequence[Tuple[int, str]],
+        digest: str,
+        mtime_ns: int = 0,
+        size: int = 0
+    ) -> "CompiledTemplate":
+        """
+        分割済みのリテラル・変数スロットから復元する（事前コンパイル済みモジュール用）
+
+        Args:
+            name: テンプレート名
+            parts: リテラルと変数スロットを交互に並べたリスト
+            slots: (parts内の位置, 変数名) のリスト
+            digest: テンプレート本文のハッシュ値
+            mtime_ns: ファイルの更新時刻
+            size: ファイルサイズ
+
+        Returns:
+            CompiledTemplate: コンパイル済みテンプレート
+        """
+        template = cls.__new__(cls)
+        template.name = name
+        template.mtime_ns = mtime_ns
+        template.size = size
+        template.digest = digest
+        template._parts = list(parts)
+        template._slots = tuple((index, slot_name) for index, slot_name in slots)
+        return template
+
+    @classmethod
+    def from_values(cls, name: str, values: Sequence[str]) -> "CompiledTemplate":
+        """
+        リテラルと変数スロット（TemplateSlot）の並びから作成する
+
+        値を文字列として連結するだけなので、リテラルに波括弧が含まれていても変数として解釈しない
+
+        Args:
+            name: テンプレート名
+            values: リテラル（str）と変数スロット（TemplateSlot）の並び
+
+        Returns:
+            CompiledTemplate: コンパイル済みテンプレート
+        """
+        parts: List[str] = []
+        slots: List[Tuple[int, str]] = []
+        literal: List[str] = []
+        for value in values:
+            if isinstance(value, TemplateSlot):
+                parts.append("".join(literal))
+                literal = []
+                slots.append((len(parts), str(value)))
+                parts.append(f"{{{value}}}")
+            else:
+                literal.append(value)
+        parts.append("".join(literal))
+        return cls.from_parts(name, parts, slots, source_digest("".join(parts)))
+
+    def bind(self, variables: Dict[str, object]) -> "CompiledTemplate":
+        """
+        一部の変数を先に埋め込んだテンプレートを作成する（残りの変数は render で埋め込む）
+
+        共通の値を1回だけ埋め込んでおくと、render ではリテラルが連結済みのため
+        残りの変数スロットだけを置換すればよい
+
+        Args:
+            variables: 先に埋め込む変数名（波括弧なし）と値の辞書
+
+        Returns:
+            CompiledTemplate: variables に無い変数だけを変数スロットとして残したテンプレート
+        """
+        slot_names = dict(self._slots)
+        values: List[str] = []
+        for index, part in enumerate(self._parts):
+            slot_name = slot_names.get(index)
+            if slot_name is None:
+                values.append(part)
+                continue
+            value = variables.get(slot_name)
+            values.append(TemplateSlot(slot_name) if value is None else str(value))
+        return CompiledTemplate.from_values(self.name, values)
+
+    @property
+    def parts(self) -> Tuple[str, ...]:
+        """リテラルと変数スロットを交互に並べた値（変数スロットは元の表記）"""
+        return tuple(self._parts)
+
+    @property
+    def slots(self) -> Tuple[Tuple[int, str], ...]:
+        """(parts内の位置, 変数名) のタプル"""
+        return self._slots
+
+    @property
+    def placeholders(self) -> Tuple[str, ...]:
+        """テンプレート内の変数名（出現順、重複なし）"""
+        return tuple(dict.fromkeys(name for _, name in self._slots))
+
+    def render(self, variables: Dict[str, object]) -> str:
+        """
+        変数を埋め込んでテンプレートを出力する
+
+        Args:
+            variables: 変数名（波括弧なし）と値の辞書
+
+        Returns:
+            str: 変数展開後の文字列
+        """
+        parts = self._parts.copy()
+        for index, name in self._slots:
+            value = variables.get(name)
+            if value is not None:
+                parts[index] = str(value)
+        return "".join(parts)
+
+
+class TemplateCache:
+    """
+    テンプレート名をキーとするコンパイル済みテンプレートのキャッシュ
+
+    ファイルの更新時刻（mtime）とサイズを監視し、変更があれば再読み込みする。
+    監視のstat呼び出しは check_interval 秒に1回までに抑える。
+    事前コンパイル済みのテンプレート（precompiled）を渡すと、ファイルを解析せずに初期状態として使用する。
+    事前コンパイル済みのテンプレートは初回の使用時に本文のハッシュ値をファイルと比較し、
+    一致しない場合（python -m app.build を実行し忘れた場合など）はファイルから再コンパイルする。
+    ファイルが無い場合（テンプレートを含めずにデプロイした場合など）は事前コンパイル済みのものを使用する。
+    """
+
+    def __init__(
+        self,
+        template_dir: Path,
+        check_interval: float = 1.0,
+        precompiled: Optional[Dict[str, CompiledTemplate]] = None
+    ):
+        self.template_dir = Path(template_dir)
+        self.check_interval = check_interval
+        self._templates: Dict[str, CompiledTemplate] = dict(precompiled or {})
+        # 事前コンパイル済みのテンプレートは未確認（初回の使用時に確認する）
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _compile(self, template_name: str) -> CompiledTemplate:
+        """テンプレートファイルを読み込んでコンパイルする"""
+        template_path = self.template_dir / template_name
+
+        try:
+            stat = template_path.stat()
+            with open(template_path, "r", encoding="utf-8") as f:
+                source = f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"テンプレートファイルが見つかりません: {template_path}")
+
+        return CompiledTemplate(template_name, source, stat.st_mtime_ns, stat.st_size)
+
+    def _is_stale(self, template: CompiledTemplate) -> bool:
+        """
+        テンプレートファイルが更新されているか確認する
+
+        更新時刻・サイズが異なる場合は本文のハッシュ値も比較し、内容が同じであれば
+        （デプロイやチェックアウトで更新時刻だけが変わった場合など）再コンパイルしない
+        """
+        template_path = self.template_dir / template.name
+        try:
+            stat = template_path.stat()
+            if stat.st_mtime_ns == template.mtime_ns and stat.st_size == template.size:
+                return False
+            with open(template_path, "r", encoding="utf-8") as f:
+                source = f.read()
+        except FileNotFoundError:
+            return True
+        if source_digest(source) != template.digest:
+            return True
+        template.mtime_ns = stat.st_mtime_ns
+        template.size = stat.st_size
+        return False
+
+    def get(self, template_name: str) -> CompiledTemplate:
+        """
+        コンパイル済みテンプレートを取得する
+
+        Args:
+            template_name: テンプレートファイル名
+
+        Returns:
+            CompiledTemplate: コンパイル済みテンプレート
+
+        Raises:
+            FileNotFoundError: テンプレートファイルが見つからない場合
+        """
+        template = self._templates.get(template_name)
+
+        if template is not None:
+            now = time.monotonic()
+            checked_at = self._checked_at.get(template_name)
+            if checked_at is not None and (self.check_interval < 0 or now - checked_at < self.check_interval):
+                self.hits += 1
+                return template
+            self._checked_at[template_name] = now
+            if checked_at is None and not (self.template_dir / template_name).exists():
+                # ファイルを含めないデプロイでは事前コンパイル済みのテンプレートをそのまま使用する
+                self.hits += 1
+                return template
+            if not self._is_stale(template):
+                self.hits += 1
+                return template
+
+        with self._lock:
+            self.misses += 1
+            template = self._compile(template_name)
+            self._templates[template_name] = template
+            self._checked_at[template_name] = time.monotonic()
+            return template
+
+    def preload(self, template_names: Optional[List[str]] = None) -> List[str]:
+        """
+        テンプレートを事前にコンパイルする（起動時に使用）
+
+        Args:
+            template_names: 対象のテンプレート名（省略時はディレクトリ内の全 .ps1）
+
+        Returns:
+            List[str]: 読み込んだテンプレート名
+        """
+        if template_names is None:
+            template_names = sorted(p.name for p in self.template_dir.glob("*.ps1"))
+        for name in template_names:
+            self.get(name)
+        return list(template_names)
+
+    def clear(self) -> None:
+        """キャッシュを破棄する"""
+        with self._lock:
+            self._templates.clear()
+            self._checked_at.clear()
@@ -0,0 +1,60 @@
+"""
+TTL付きLRUキャッシュ
+上限件数と有効期間の両方で古いエントリを削除する、メモリ上の汎用キャッシュ
+"""
+
+import time
+from collections import OrderedDict
+from typing import Generic, Optional, Tuple, TypeVar
+
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    TTL付きのLRUキャッシュ
+
+    上限件数を超えた場合は最も古く使われたエントリから削除し、
+    有効期間を過ぎたエントリは参照時に削除する
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, V]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[V]:
+        """キャッシュを参照する（期限切れの場合は削除して None を返す）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: V, ttl: Optional[float] = None) -> None:
+        """キャッシュに保存する（ttl 省略時は既定の有効期間）"""
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        """エントリを削除する"""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """全エントリを削除する"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
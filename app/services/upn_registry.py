@@ -0,0 +1,230 @@
+"""
+UPN（MailNickname）重複管理サービス
+テナントごとに発行済みの MailNickname を管理し、同姓同名の従業員に
+連番（yamada.taro2 など）を決定的に割り当てる
+"""
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.services.romanizer import MAX_NICKNAME_LENGTH
+
+
+class UpnRegistry:
+    """
+    発行済み MailNickname のインデックス
+
+    - ストアを指定しない場合は、メモリ上のセット（テナントと名前の組）で重複を判定する
+      （1回の一括処理の範囲で使う想定のため、件数の上限は設けない）
+    - SQLite ストアを指定した場合は、割り当てのたびにストアへ INSERT し（主キーの一意制約）、
+      コミットしてから名前を返す。一意制約に違反した場合は次の連番で再試行するため、
+      マルチワーカーのサーバーや CLI の同時実行など複数のプロセスが同じストアを使っても
+      同じ名前を割り当てない。メモリ上には発行済みと確認した名前を最大 cache_size 件だけ保持する
+    - exclusive=True の場合は、ストアをこのインスタンスだけが使うものとして、新しく発行した名前を
+      flush() の呼び出し時にまとめて書き込む（非同期ジョブごとのストアで、チャンクの終了時にだけ書き込む）
+    """
+
+    # 発行済みと確認した名前・連番の開始位置をメモリ上に保持する件数の既定値
+    DEFAULT_CACHE_SIZE = 100_000
+
+    def __init__(
+        self,
+        store_path: Optional[str] = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        exclusive: bool = False
+    ):
+        self.store_path = store_path
+        self.cache_size = cache_size
+        self.exclusive = exclusive
+        # 発行済みと確認した (テナント, 名前)（ストアがある場合は古いものから捨てる）
+        self._issued: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._next_suffix: Dict[Tuple[str, str], int] = {}
+        # exclusive の場合の未書き込みの (テナント, 名前) → 発行日時
+        self._pending: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if store_path:
+            self._conn = self._connect(Path(store_path))
+
+    @staticmethod
+    def _connect(path: Path) -> sqlite3.Connection:
+        """SQLite ストアを開き、テーブルを作成する"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS issued_upns ("
+            " tenant TEXT NOT NULL,"
+            " nickname TEXT NOT NULL,"
+            " issued_at TEXT NOT NULL,"
+            " PRIMARY KEY (tenant, nickname)"
+            ") WITHOUT ROWID"
+        )
+        conn.commit()
+        return conn
+
+    def _remember(self, key: Tuple[str, str]) -> None:
+        """発行済みの名前をメモリ上に記録する（ストアがある場合は上限を超えた古いものを捨てる）"""
+        self._issued[key] = None
+        self._issued.move_to_end(key)
+        if self._conn is not None and len(self._issued) > self.cache_size:
+            self._issued.popitem(last=False)
+
+    def _is_known(self, key: Tuple[str, str]) -> bool:
+        """発行済みかどうかを判定する（メモリ → exclusive の場合はストアの順に参照）"""
+        if key in self._issued or key in self._pending:
+            return True
+        if self._conn is None or not self.exclusive:
+            return False
+        row = self._conn.execute(
+            "SELECT 1 FROM issued_upns WHERE tenant = ? AND nickname = ?",
+            key
+        ).fetchone()
+        if row is not None:
+            self._remember(key)
+            return True
+        return False
+
+    def _acquire(self, tenant: str, nickname: str) -> bool:
+        """
+        名前が空いていれば割り当てる
+
+        共有のストアでは INSERT してコミットし、一意制約に違反した場合（他のプロセスが
+        発行済み）は割り当てない
+
+        Returns:
+            bool: 割り当てた場合は True
+        """
+        key = (tenant, nickname)
+        if self._is_known(key):
+            return False
+        if self._conn is not None:
+            issued_at = datetime.now().isoformat(timespec="seconds")
+            if self.exclusive:
+                self._pending[key] = issued_at
+            else:
+                try:
+                    with self._conn:
+                        self._conn.execute(
+                            "INSERT INTO issued_upns (tenant, nickname, issued_at) VALUES (?, ?, ?)",
+                            (tenant, nickname, issued_at)
+                        )
+                except sqlite3.IntegrityError:
+                    self._remember(key)
+                    return False
+        self._remember(key)
+        return True
+
+    @staticmethod
+    def _with_suffix(nickname: str, suffix: int) -> str:
+        """連番付きの名前を生成する（最大長を超える場合は元の名前を切り詰める）"""
+        suffix_text = str(suffix)
+        base = nickname[:MAX_NICKNAME_LENGTH - len(suffix_text)].rstrip(".")
+        return f"{base}{suffix_text}"
+
+    def reserve(self, tenant: str, nickname: str) -> str:
+        """
+        テナント内で重複しない MailNickname を割り当てる
+
+        既に使われている場合は 2, 3, ... の連番を付けた最初の空き名を返す
+        （共有のストアでは、ストアへの書き込みをコミットしてから返す）
+
+        Args:
+            tenant: テナントドメイン
+            nickname: 希望する MailNickname
+
+        Returns:
+            str: 割り当てた MailNickname
+        """
+        tenant = tenant.lower()
+        with self._lock:
+            if self._acquire(tenant, nickname):
+                return nickname
+            key = (tenant, nickname)
+            suffix = self._next_suffix.pop(key, 2)
+            candidate = self._with_suffix(nickname, suffix)
+            while not self._acquire(tenant, candidate):
+                suffix += 1
+                candidate = self._with_suffix(nickname, suffix)
+            self._next_suffix[key] = suffix + 1
+            if len(self._next_suffix) > self.cache_size:
+                del self._next_suffix[next(iter(self._next_suffix))]
+            return candidate
+
+    def claim(self, tenant: str, nickname: str) -> None:
+        """
+        割り当て済みの MailNickname を発行済みとして登録する（連番は付与しない）
+
+        増分生成で前回割り当てた名前を引き継ぐ場合など、既に決まっている名前を
+        他の行に割り当てないようにするために使用する
+
+        Args:
+            tenant: テナントドメイン
+            nickname: 割り当て済みの MailNickname
+        """
+        tenant = tenant.lower()
+        key = (tenant, nickname)
+        with self._lock:
+            if key in self._issued or key in self._pending:
+                return
+            if self._conn is not None:
+                issued_at = datetime.now().isoformat(timespec="seconds")
+                if self.exclusive:
+                    self._pending[key] = issued_at
+                else:
+                    with self._conn:
+                        self._conn.execute(
+                            "INSERT OR IGNORE INTO issued_upns (tenant, nickname, issued_at) VALUES (?, ?, ?)",
+                            (tenant, nickname, issued_at)
+                        )
+            self._remember(key)
+
+    def release(self, tenant: str, nickname: str) -> None:
+        """
+        割り当てを取り消す（生成に失敗した行など）
+
+        Args:
+            tenant: テナントドメイン
+            nickname: 取り消す MailNickname
+        """
+        tenant = tenant.lower()
+        key = (tenant, nickname)
+        with self._lock:
+            self._issued.pop(key, None)
+            # 空いた連番を再び先頭から探せるよう、連番の開始位置をリセットする
+            self._next_suffix.clear()
+            if self._pending.pop(key, None) is None and self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "DELETE FROM issued_upns WHERE tenant = ? AND nickname = ?",
+                        key
+                    )
+
+    def _flush_locked(self) -> None:
+        """未書き込みの名前をまとめてストアに書き込む（exclusive の場合のみ、ロック取得済みで呼び出す）"""
+        if not self._pending or self._conn is None:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO issued_upns (tenant, nickname, issued_at) VALUES (?, ?, ?)",
+                [(tenant, nickname, issued_at) for (tenant, nickname), issued_at in self._pending.items()]
+            )
+        self._pending.clear()
+
+    def flush(self) -> None:
+        """未書き込みの名前をストアに書き込む（共有のストアは割り当てのたびに書き込み済み）"""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        """未書き込みの名前を書き込んでストアを閉じる"""
+        with self._lock:
+            self._flush_locked()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
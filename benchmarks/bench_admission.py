@@ -0,0 +1,117 @@
+"""
+流量制御の過負荷ベンチマーク
+処理能力を超える到着率（オープンループ）でリクエストを送り続け、
+流量制御の有無で「受け付けたリクエストのレイテンシ」と拒否件数を比較する
+
+処理内容は CPU を使う区間と await を交互に繰り返す疑似ハンドラー（1件あたり約 --work-ms ミリ秒）
+
+使い方:
+    python -m benchmarks.bench_admission --offered 2.0 --duration 3
+    python -m benchmarks.bench_admission --max-in-flight 4 --queue-size 16 --queue-timeout 0.05
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from app.admission import AdmissionController, AdmissionMiddleware
+from benchmarks.run import ASGIDriver, percentile
+
+
+def make_app(work_ms: float, steps: int = 4):
+    """約 work_ms ミリ秒の処理を steps 回に分けて行うASGIアプリケーション"""
+    slice_seconds = work_ms / 1000 / steps
+
+    async def app(scope, receive, send):
+        await receive()
+        for _ in range(steps):
+            deadline = time.perf_counter() + slice_seconds
+            while time.perf_counter() < deadline:
+                pass
+            await asyncio.sleep(0)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"status":"success"}'})
+
+    return app
+
+
+async def run_open_loop(app, rate: float, duration: float) -> Dict[str, float]:
+    """
+    1秒あたり rate 件の到着率で duration 秒間リクエストを送信する
+
+    Returns:
+        Dict[str, float]: 受け付け件数・拒否件数・受け付けたリクエストのレイテンシ
+    """
+    driver = ASGIDriver(app)
+    latencies: List[float] = []
+    rejected: Dict[int, int] = {}
+    tasks: List[asyncio.Task] = []
+
+    async def one():
+        started = time.perf_counter()
+        status = await driver.request("POST", "/api/onboarding", b"{}")
+        if status == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            rejected[status] = rejected.get(status, 0) + 1
+
+    tick = 0.01
+    started = time.perf_counter()
+    sent = 0
+    while time.perf_counter() - started < duration:
+        due = int((time.perf_counter() - started) * rate)
+        for _ in range(due - sent):
+            tasks.append(asyncio.ensure_future(one()))
+        sent = due
+        await asyncio.sleep(tick)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "sent": sent,
+        "ok": len(latencies),
+        "rejected_429": rejected.get(429, 0),
+        "rejected_503": rejected.get(503, 0),
+        "goodput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round((latencies[-1] if latencies else 0.0) * 1000, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="流量制御の過負荷ベンチマーク")
+    parser.add_argument("--work-ms", type=float, default=1.0, help="1件あたりの処理時間（ミリ秒）")
+    parser.add_argument("--offered", type=float, default=2.0, help="処理能力に対する到着率の倍率")
+    parser.add_argument("--duration", type=float, default=3.0, help="送信時間（秒）")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="同時に処理するリクエスト数の上限")
+    parser.add_argument("--queue-size", type=int, default=16, help="待ち行列の上限件数")
+    parser.add_argument("--queue-timeout", type=float, default=0.05, help="待ち行列で待機する最大時間（秒）")
+    args = parser.parse_args(argv)
+
+    rate = args.offered * 1000 / args.work_ms
+    inner = make_app(args.work_ms)
+    controller = AdmissionController(
+        max_in_flight=args.max_in_flight,
+        queue_size=args.queue_size,
+        queue_timeout=args.queue_timeout
+    )
+    cases = {
+        "no_admission": inner,
+        "admission": AdmissionMiddleware(inner, controller, paths=("/api/",)),
+    }
+
+    print(f"到着率 {rate:.0f} req/s（処理能力の {args.offered:.1f} 倍）, {args.duration:.0f} 秒間")
+    print(f"{'case':<16}{'sent':>8}{'ok':>8}{'429':>6}{'503':>8}{'goodput':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, app in cases.items():
+        result = asyncio.run(run_open_loop(app, rate, args.duration))
+        print(
+            f"{name:<16}{result['sent']:>8}{result['ok']:>8}{result['rejected_429']:>6}{result['rejected_503']:>8}"
+            f"{result['goodput_rps']:>10.1f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['max_ms']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+AIService のスループット計測
+スタブサーバー（benchmarks/stub_openai.py）に対して同時にリクエストを送り、
+同時実行数・キャッシュの効果を計測する
+
+使い方:
+    python -m benchmarks.stub_openai --port 8900 &
+    python -m benchmarks.bench_ai_service --base-url http://127.0.0.1:8900/v1 --requests 500 --distinct 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.services.ai_service import AIService
+
+
+EMPLOYMENT_TYPES = ("正社員", "派遣社員")
+
+
+async def run(args: argparse.Namespace) -> None:
+    service = AIService(
+        api_key="stub",
+        base_url=args.base_url,
+        max_concurrency=args.concurrency,
+        timeout=args.timeout,
+        max_retries=args.retries,
+        cache_ttl=args.cache_ttl
+    )
+    latencies = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        n = i % args.distinct
+        started = time.perf_counter()
+        try:
+            await service.generate_judgment_comment(
+                company=f"顧客{n // 2}",
+                employment_type=EMPLOYMENT_TYPES[n % 2],
+                department="営業部"
+            )
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+    finally:
+        await service.aclose()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    quantile = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+    print(f"requests      : {args.requests} (distinct inputs: {args.distinct})")
+    print(f"elapsed       : {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s)")
+    print(f"latency (ms)  : mean={statistics.mean(latencies) * 1000:.1f} "
+          f"p50={quantile(0.50):.1f} p95={quantile(0.95):.1f} p99={quantile(0.99):.1f}")
+    print(f"cache         : hits={service.cache.hits} misses={service.cache.misses} size={len(service.cache)} "
+          f"coalesced={service.coalesced}")
+    print(f"errors        : {errors}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AIService スループット計測")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8900/v1")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--distinct", type=int, default=50, help="異なる入力の数（キャッシュ効果の確認用）")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--cache-ttl", type=float, default=3600.0, help="0 でキャッシュを実質無効化")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+一括出力の形式別ベンチマーク
+従業員数 N ごとに、連結スクリプト（ps1）・バンドル形式（bundle）・Graph バッチ形式（graph）の出力サイズ・gzip後のサイズ・生成時間を比較する
+
+使い方:
+    python -m benchmarks.bench_bundle --sizes 1,10,100,1000
+"""
+
+import argparse
+import gzip
+import io
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
+from app.services.batch_service import BatchService
+
+NAMES = ["山田 太郎", "鈴木 花子", "佐藤 一郎", "田中 美咲", "高橋 健", "伊藤 さくら"]
+EMPLOYMENT_TYPES = ["正社員", "派遣"]
+
+
+def make_jsonl(rows: int) -> bytes:
+    """rows 行のJSONL入力を生成する"""
+    lines = []
+    for i in range(rows):
+        lines.append(json.dumps({
+            "company": f"株式会社サンプル{i % 5}",
+            "employee_name": NAMES[i % len(NAMES)],
+            "employment_type": EMPLOYMENT_TYPES[i % len(EMPLOYMENT_TYPES)],
+            "department": "営業部",
+        }, ensure_ascii=False))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def measure(payload: bytes, output_format: str, repeats: int) -> Dict[str, float]:
+    """1つの出力形式について、出力サイズと生成時間（中央値）を計測する"""
+    timings: List[float] = []
+    output = b""
+    for _ in range(repeats):
+        started = time.perf_counter()
+        output = b"".join(BatchService.stream(io.BytesIO(payload), BatchService.FORMAT_JSONL, output_format))
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "bytes": len(output),
+        "gzip_bytes": len(gzip.compress(output, compresslevel=6)),
+        "ms": round(timings[len(timings) // 2] * 1000, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="一括出力の形式別ベンチマーク")
+    parser.add_argument("--sizes", default="1,10,100,1000", help="従業員数（カンマ区切り）")
+    parser.add_argument("--repeats", type=int, default=5, help="計測回数")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"{'N':>6}  {'format':<8}{'bytes':>12}{'gzip':>10}{'ms':>10}")
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        payload = make_jsonl(size)
+        for output_format in (BatchService.OUTPUT_PS1, BatchService.OUTPUT_BUNDLE, BatchService.OUTPUT_GRAPH):
+            result = measure(payload, output_format, args.repeats)
+            print(f"{size:>6}  {output_format:<8}{result['bytes']:>12}{result['gzip_bytes']:>10}{result['ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+コールドスタート計測
+新しいPythonプロセスで Vercel のエントリーポイント（api/index.py）をインポートし、
+全体の所要時間と、`python -X importtime` によるモジュールごとのインポート時間を出力する
+
+使い方:
+    python -m benchmarks.bench_cold_start --runs 5 --top 20
+    python -m benchmarks.bench_cold_start --module app.main --json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).parent.parent
+
+# python -X importtime の出力行: "import time: self [us] | cumulative | imported package"
+_IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+    """リポジトリのルートで新しいPythonプロセスを実行する"""
+    env = dict(os.environ, PYTHONPATH=str(ROOT), PYTHONDONTWRITEBYTECODE="")
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+
+def measure_wall(module: str, runs: int) -> List[float]:
+    """インポートにかかる時間（インタープリターの起動を除く）を runs 回計測する（ミリ秒）"""
+    code = (
+        "import time; started = time.perf_counter(); "
+        f"import {module}; "
+        "print((time.perf_counter() - started) * 1000)"
+    )
+    return [float(run_python(code).stdout.strip().splitlines()[-1]) for _ in range(runs)]
+
+
+def measure_modules(module: str) -> List[Dict]:
+    """モジュールごとのインポート時間（マイクロ秒）を取得する"""
+    stderr = run_python(f"import {module}", "-X", "importtime").stderr
+    modules: List[Dict] = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_PATTERN.match(line)
+        if match:
+            modules.append({
+                "module": match.group(4),
+                "self_us": int(match.group(1)),
+                "cumulative_us": int(match.group(2)),
+                "depth": len(match.group(3)) // 2,
+            })
+    return modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="コールドスタート計測")
+    parser.add_argument("--module", default="api.index", help="インポートするモジュール（既定: api.index）")
+    parser.add_argument("--runs", type=int, default=5, help="計測回数")
+    parser.add_argument("--top", type=int, default=20, help="出力するモジュール数（累積時間の降順）")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    args = parser.parse_args()
+
+    # 1回目は .pyc の生成を含むため計測から除外する
+    run_python(f"import {args.module}")
+    started = time.perf_counter()
+    wall = measure_wall(args.module, args.runs)
+    modules = measure_modules(args.module)
+    elapsed = time.perf_counter() - started
+
+    top_level = sorted(
+        (m for m in modules if m["depth"] <= 1 or m["module"].startswith("app.")),
+        key=lambda m: m["cumulative_us"],
+        reverse=True
+    )[:args.top]
+    report = {
+        "module": args.module,
+        "import_ms": {
+            "median": round(statistics.median(wall), 1),
+            "min": round(min(wall), 1),
+            "max": round(max(wall), 1),
+        },
+        "modules": top_level,
+    }
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+
+    print(f"import {args.module}: median {report['import_ms']['median']} ms "
+          f"(min {report['import_ms']['min']}, max {report['import_ms']['max']}, runs {args.runs})")
+    print()
+    print(f"{'module':<48}{'self ms':>10}{'cumulative ms':>16}")
+    for m in top_level:
+        print(f"{m['module']:<48}{m['self_us'] / 1000:>10.1f}{m['cumulative_us'] / 1000:>16.1f}")
+    print(f"\n(計測時間 {elapsed:.1f}s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+列指向の一括生成のベンチマーク
+検証済みの N 行について、行ごとの JudgmentService.judge + CommandGenerator.generate_command（バンドル形式は
+generate_bundle_row）と、ColumnarBatch（組み合わせごとに判断とテンプレートの共通部分を1回だけ処理）の
+生成時間を比較し、出力が一致することを確認する（生成日時・契約終了日は正規化して比較）
+
+使い方:
+    python -m benchmarks.bench_columnar --rows 100000 --companies 50 --departments 8
+"""
+
+import argparse
+import logging
+import random
+import time
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.cli import normalize_golden
+from app.services.columnar_batch import ColumnarBatch
+from app.services.command_generator import CommandGenerator
+from app.services.judgment_service import JudgmentService
+from app.services.upn_registry import UpnRegistry
+
+SURNAMES = ["山田", "鈴木", "佐藤", "田中", "高橋", "伊藤", "渡辺", "中村", "小林", "加藤"]
+GIVEN_NAMES = ["太郎", "花子", "一郎", "美咲", "健", "さくら", "翔", "陽菜", "大輔", "結衣"]
+EMPLOYMENT_TYPES = ["正社員", "派遣"]
+
+
+def make_rows(rows: int, companies: int, departments: int, seed: int = 0) -> List[Tuple[int, Dict]]:
+    """検証済みの行（OnboardingRequest.model_dump() と同じ辞書）を生成する"""
+    rng = random.Random(seed)
+    return [
+        (row_number, {
+            "company": f"株式会社サンプル{rng.randrange(companies)}",
+            "task_type": "onboarding",
+            "employee_name": f"{rng.choice(SURNAMES)} {rng.choice(GIVEN_NAMES)}",
+            "employment_type": rng.choice(EMPLOYMENT_TYPES),
+            "department": f"部署{rng.randrange(departments)}",
+        })
+        for row_number in range(1, rows + 1)
+    ]
+
+
+def row_at_a_time(rows: List[Tuple[int, Dict]], layout: Optional[str], today: date) -> List[str]:
+    """行ごとに判断とコマンド生成を行う（従来の処理）"""
+    registry = UpnRegistry()
+    commands = []
+    for row_number, request_data in rows:
+        judgment = JudgmentService.judge(request_data, today)
+        if layout is not None:
+            commands.append(CommandGenerator.generate_bundle_row(
+                request_data, judgment, row_number=row_number, registry=registry, layout=layout
+            ))
+        else:
+            commands.append(CommandGenerator.generate_command(request_data, judgment=judgment, registry=registry))
+    return commands
+
+
+def columnar(rows: List[Tuple[int, Dict]], layout: Optional[str], today: date) -> List[str]:
+    """列指向でまとめて生成する"""
+    return ColumnarBatch(rows, registry=UpnRegistry(), layout=layout, today=today).commands()
+
+
+def best_of(function: Callable[[], List[str]], repeats: int) -> Tuple[float, List[str]]:
+    """repeats 回実行し、最短の時間（秒）と出力を返す"""
+    best = float("inf")
+    output: List[str] = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        output = function()
+        best = min(best, time.perf_counter() - started)
+    return best, output
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="列指向の一括生成のベンチマーク")
+    parser.add_argument("--rows", type=int, default=100000, help="行数")
+    parser.add_argument("--companies", type=int, default=50, help="顧客数")
+    parser.add_argument("--departments", type=int, default=8, help="部署数")
+    parser.add_argument("--repeats", type=int, default=3, help="計測回数（最短の時間を採用）")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    CommandGenerator.preload_templates()
+    rows = make_rows(args.rows, args.companies, args.departments)
+    today = date.today()
+    groups = len({(data["company"], data["employment_type"], data["department"]) for _, data in rows})
+    print(f"{args.rows} 行（顧客・雇用形態・部署の組み合わせ: {groups}）")
+    print(f"{'layout':<8}{'行ごと ms':>12}{'列指向 ms':>12}{'µs/行':>10}{'倍率':>8}  出力")
+    for layout in (None, CommandGenerator.LAYOUT_BUNDLE, CommandGenerator.LAYOUT_GRAPH_BATCH):
+        baseline, expected = best_of(lambda: row_at_a_time(rows, layout, today), args.repeats)
+        elapsed, actual = best_of(lambda: columnar(rows, layout, today), args.repeats)
+        same = len(actual) == len(expected) and all(
+            normalize_golden(a) == normalize_golden(b) for a, b in zip(actual, expected)
+        )
+        print(
+            f"{layout or 'script':<8}{baseline * 1000:>12.1f}{elapsed * 1000:>12.1f}"
+            f"{elapsed / args.rows * 1e6:>10.2f}{baseline / elapsed:>7.1f}x  {'一致' if same else '不一致'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
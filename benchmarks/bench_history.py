@@ -0,0 +1,154 @@
+"""
+生成履歴ストアのベンチマーク
+- record: リクエストの処理側でかかる時間（キューへの追加まで）と、書き込みスレッドの処理件数
+- search: 件数が多い（既定100万件）ストアでの検索時間（先頭ページ・深いページ、キーセットと OFFSET の比較）
+
+使い方:
+    python -m benchmarks.bench_history --rows 1000000
+"""
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.models import JudgmentResult
+from app.services.command_generator import CommandGenerator
+from app.services.history_store import HISTORY_COLUMNS, HistoryStore
+from app.services.judgment_service import JudgmentService
+
+COMPANIES = [f"株式会社サンプル{i}" for i in range(200)]
+# 姓は240種類（1種類あたり全体の約0.4%、実際の姓の分布に近い件数）
+FAMILY_NAMES = [a + b for a in "山田中川本井小松高石林森木村上野下原大池" for b in "田中川本井野村上口藤沢島"]
+GIVEN_NAMES = ["太郎", "花子", "一郎", "美咲", "健", "さくら", "翔", "陽菜"]
+EMPLOYMENT_TYPES = ["正社員", "派遣"]
+
+
+def fill(store: HistoryStore, rows: int, started: datetime) -> None:
+    """rows 件の履歴を直接書き込む（検索の計測用、1年間に均等に分布させる）"""
+    rng = random.Random(0)
+    blob = zlib.compress(b"# placeholder", 6)
+    step = timedelta(days=365) / rows
+    batch: List[tuple] = []
+    for i in range(rows):
+        batch.append((
+            (started + step * i).timestamp(),
+            "batch",
+            rng.choice(COMPANIES),
+            f"{rng.choice(FAMILY_NAMES)} {rng.choice(GIVEN_NAMES)}",
+            rng.choice(EMPLOYMENT_TYPES),
+            "営業部",
+            "標準ユーザー",
+            "ENTERPRISEPACK",
+            "{}",
+            "0" * 64,
+            13,
+            blob,
+        ))
+        if len(batch) == 50000:
+            store._write(batch)
+            batch = []
+    if batch:
+        store._write(batch)
+
+
+def timed(func: Callable[[], object], repeats: int = 20) -> float:
+    """中央値の所要時間（ミリ秒）"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def deep_cursor(store: HistoryStore, pages: int, **filters) -> Optional[Tuple[float, int]]:
+    """pages ページ分カーソルをたどった位置"""
+    cursor = None
+    for _ in range(pages):
+        entries = store.search(cursor=cursor, limit=50, **filters)
+        if len(entries) < 50:
+            break
+        cursor = HistoryStore.parse_cursor(HistoryStore.make_cursor(entries[-1]))
+    return cursor
+
+
+def bench_record(store: HistoryStore, count: int) -> Dict[str, float]:
+    """record の所要時間（リクエスト処理側）と書き込みスレッドの処理件数"""
+    request = {
+        "company": "株式会社サンプル", "task_type": "onboarding", "employee_name": "山田 太郎",
+        "employment_type": "正社員", "department": "営業部",
+    }
+    judgment: JudgmentResult = JudgmentService.judge(request)
+    script = CommandGenerator.generate_command(request, judgment=judgment)
+    started = time.perf_counter()
+    for _ in range(count):
+        store.record("onboarding", request, judgment, script)
+    queued = time.perf_counter() - started
+    store.flush()
+    written = time.perf_counter() - started
+    return {
+        "record_us": round(queued / count * 1e6, 1),
+        "writes_per_s": round(count / written),
+        "script_bytes": len(script.encode("utf-8")),
+        "stored_bytes": len(zlib.compress(script.encode("utf-8"), 6)),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="生成履歴ストアのベンチマーク")
+    parser.add_argument("--rows", type=int, default=1000000, help="検索の計測に使う履歴の件数")
+    parser.add_argument("--records", type=int, default=10000, help="record の計測件数")
+    parser.add_argument("--pages", type=int, default=200, help="深いページの計測でたどるページ数")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        store = HistoryStore(os.path.join(directory, "history.db"), queue_size=args.records)
+
+        result = bench_record(store, args.records)
+        print(
+            f"record: {result['record_us']} µs/件（リクエスト処理側）, 書き込み {result['writes_per_s']} 件/秒, "
+            f"スクリプト {result['script_bytes']} → {result['stored_bytes']} バイト（zlib）"
+        )
+
+        origin = datetime(2026, 1, 1)
+        started = time.perf_counter()
+        fill(store, args.rows, origin)
+        print(f"{args.rows} 件を書き込み: {time.perf_counter() - started:.1f} 秒")
+
+        march = {"since": datetime(2026, 3, 1), "until": datetime(2026, 4, 1)}
+        cases = {
+            "条件なし": {},
+            "顧客名": {"company": COMPANIES[7]},
+            "従業員名（前方一致）": {"employee_name": "山田"},
+            "雇用形態": {"employment_type": "派遣"},
+            "従業員名 + 3月": {"employee_name": "山田", **march},
+            "顧客名 + 3月": {"company": COMPANIES[7], **march},
+        }
+        print(f"{'条件':<22}{'先頭 ms':>10}{f'{args.pages}ページ目 ms':>18}")
+        for name, filters in cases.items():
+            first = timed(lambda: store.search(limit=50, **filters))
+            cursor = deep_cursor(store, args.pages, **filters)
+            deep = timed(lambda: store.search(cursor=cursor, limit=50, **filters))
+            print(f"{name:<22}{first:>10.2f}{deep:>18.2f}")
+
+        # 比較: OFFSET によるページネーション（読み飛ばす行数に比例して遅くなる、全体の中ほどのページ）
+        offset = args.rows // 2
+        sql = (
+            f"SELECT {', '.join(HISTORY_COLUMNS)} FROM generation_history"
+            f" ORDER BY created_at DESC, id DESC LIMIT 50 OFFSET {offset}"
+        )
+        offset_ms = timed(lambda: store._read_conn.execute(sql).fetchall())
+        print(f"{'（参考）OFFSET ' + str(offset):<22}{'':>10}{offset_ms:>18.2f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+ログ出力のオーバーヘッド計測
+リクエスト処理側（呼び出し側のスレッド）でログ1件あたりにかかる時間を、
+従来の同期出力（basicConfig + f-string で model_dump を整形）と
+キュー経由の非同期出力（app.logging_config）で比較する
+
+使い方:
+    python -m benchmarks.bench_logging --records 20000 --format json
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from app.logging_config import setup_logging, shutdown_logging
+from app.models import OnboardingRequest
+
+
+REQUEST = OnboardingRequest(
+    employee_name="山田 太郎",
+    company="サンプル株式会社",
+    employment_type="正社員",
+    department="営業部",
+    task_type="onboarding"
+)
+
+
+def reset_root() -> logging.Logger:
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    return root
+
+
+def per_request(logger: logging.Logger, records: int, structured: bool) -> float:
+    """1リクエスト分のログ（入力受信 + 判断結果 + 生成完了）を records 回出力し、1回あたりの時間（µs）を返す"""
+    started = time.perf_counter()
+    for _ in range(records):
+        request_dict = REQUEST.model_dump()
+        if structured:
+            logger.info("入力受信", extra={"data": request_dict})
+        else:
+            logger.info(f"入力受信: {request_dict}")
+        logger.info("AI判断結果: 正社員 -> 標準ユーザー + Microsoft 365 E3 (SKU: ENTERPRISEPACK)")
+        logger.info("PowerShell生成完了 (License: Microsoft 365 E3, SKU: ENTERPRISEPACK)")
+    return (time.perf_counter() - started) / records * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ログ出力のオーバーヘッド計測")
+    parser.add_argument("--records", type=int, default=20000, help="リクエスト数")
+    parser.add_argument("--format", default="json", choices=("json", "text"))
+    parser.add_argument("--sample-rate", type=float, default=1.0, help="高負荷時にINFOを残す割合")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        logger = logging.getLogger("bench")
+
+        # 従来: 呼び出し側のスレッドで整形・書き込み
+        path = os.path.join(tmp, "sync.log")
+        root = reset_root()
+        logging.basicConfig(
+            level=logging.INFO,
+            format="[%(asctime)s] [%(levelname)s] %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+            filename=path
+        )
+        sync_us = per_request(logger, args.records, structured=False)
+        reset_root()
+
+        # 新方式: キューに入れるだけ（整形・マスク・書き込みは書き込みスレッド）
+        settings = SimpleNamespace(
+            log_level="INFO",
+            log_format=args.format,
+            log_queue_size=args.records * 3 + 10,
+            log_sample_watermark=1000 if args.sample_rate < 1 else args.records * 3 + 10,
+            log_sample_rate=args.sample_rate
+        )
+        listener = setup_logging(settings)
+        # 標準エラー出力の代わりにファイルへ書き込む
+        file_handler = logging.FileHandler(os.path.join(tmp, "async.log"), encoding="utf-8")
+        file_handler.setFormatter(listener.handlers[0].formatter)
+        listener.handlers = (file_handler,)
+        async_us = per_request(logger, args.records, structured=True)
+        drain_started = time.perf_counter()
+        shutdown_logging()
+        drain_s = time.perf_counter() - drain_started
+        file_handler.close()
+        reset_root()
+
+        lines = sum(1 for _ in open(os.path.join(tmp, "async.log"), encoding="utf-8"))
+
+    print(f"requests            : {args.records} (3 records each)")
+    print(f"sync  (basicConfig) : {sync_us:8.2f} µs/request on the caller thread")
+    print(f"async ({args.format:<4} queue)  : {async_us:8.2f} µs/request on the caller thread "
+          f"({sync_us / async_us:.1f}x less)")
+    print(f"writer drain        : {drain_s:.2f}s, {lines} lines written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+マルチワーカーサーバーのスケーリングベンチマーク
+python -m app.server をワーカー数を変えて起動し、/api/onboarding に一定時間リクエストを送り続けて
+リクエスト数/秒・レイテンシと、ワーカー1つあたりの固有メモリ（fork 前の読み込みで共有されない分）を比較する
+
+負荷は別プロセスのクライアント（Keep-Alive の HTTP/1.1 接続を複数張る）から送る。
+クライアントも同じマシンで動作するため、CPU数を超えるワーカー数では伸びが頭打ちになる。
+
+使い方:
+    python -m benchmarks.bench_server --workers 1,2,4 --duration 5
+    python -m benchmarks.bench_server --workers 4 --no-preload    # fork 前に読み込まない場合との比較
+    python -m benchmarks.bench_server --workers 1 --loop asyncio --http h11    # uvloop / httptools を使わない場合との比較
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+from benchmarks.run import percentile
+
+HOST = "127.0.0.1"
+
+
+def free_port() -> int:
+    """空いているポート"""
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port: int, timeout: float = 30.0) -> None:
+    """/ready が 200 を返すまで待つ"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://{HOST}:{port}/ready", timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError("サーバーの準備が完了しませんでした")
+
+
+def build_requests(count: int) -> List[bytes]:
+    """従業員名の異なるリクエスト（生成済みのレスポンスの再送にならないようにする）"""
+    requests = []
+    for i in range(count):
+        body = json.dumps({
+            "company": f"株式会社サンプル{i % 50}",
+            "task_type": "onboarding",
+            "employee_name": f"山田 太郎{i}",
+            "employment_type": ("正社員", "派遣")[i % 2],
+            "department": "営業部",
+        }, ensure_ascii=False).encode("utf-8")
+        requests.append(
+            b"POST /api/onboarding HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+            + f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+        )
+    return requests
+
+
+async def connection_loop(port: int, requests: List[bytes], offset: int, deadline: float, latencies: List[float]) -> int:
+    """1本の Keep-Alive 接続でリクエストを送り続ける（エラー件数を返す）"""
+    reader, writer = await asyncio.open_connection(HOST, port)
+    errors = 0
+    index = offset
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        writer.write(requests[index % len(requests)])
+        index += 1
+        header = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in header.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":", 1)[1])
+        await reader.readexactly(length)
+        if not header.startswith(b"HTTP/1.1 200"):
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    writer.close()
+    return errors
+
+
+def client_process(port: int, connections: int, duration: float, seed: int, queue) -> None:
+    """負荷をかけるクライアントプロセス（結果をキューに返す）"""
+    requests = build_requests(5000)
+    latencies: List[float] = []
+
+    async def run() -> int:
+        deadline = time.perf_counter() + duration
+        results = await asyncio.gather(*(
+            connection_loop(port, requests, seed * 100000 + i * 1000, deadline, latencies)
+            for i in range(connections)
+        ))
+        return sum(results)
+
+    errors = asyncio.run(run())
+    queue.put((latencies, errors))
+
+
+def private_memory_kb(pid: int) -> int:
+    """プロセス固有のメモリ（Private_Clean + Private_Dirty、KB）"""
+    total = 0
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                    total += int(line.split()[1])
+    except OSError:
+        return 0
+    return total
+
+
+def worker_pids(master_pid: int) -> List[int]:
+    """マスタープロセスの子プロセス"""
+    try:
+        with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+            return [int(pid) for pid in f.read().split()]
+    except OSError:
+        return []
+
+
+def bench(
+    workers: int,
+    clients: int,
+    connections: int,
+    duration: float,
+    preload: bool = True,
+    loop: str = "auto",
+    http: str = "auto"
+) -> Dict[str, float]:
+    """ワーカー数 workers のサーバーを起動して計測する"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        ADMISSION_ENABLED="false",
+        JOBS_ENABLED="false",
+        LOG_LEVEL="WARNING",
+        PYTHONPATH=os.getcwd(),
+    )
+    command = [
+        sys.executable, "-m", "app.server", "--host", HOST, "--port", str(port),
+        "--workers", str(workers), "--loop", loop, "--http", http,
+    ]
+    if not preload:
+        command.append("--no-preload")
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        # 全ワーカーの起動を待つ
+        time.sleep(1.0)
+        memory = [private_memory_kb(pid) for pid in worker_pids(server.pid)]
+
+        queue = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=client_process, args=(port, connections, duration, i, queue))
+            for i in range(clients)
+        ]
+        for process in processes:
+            process.start()
+        latencies: List[float] = []
+        errors = 0
+        for _ in processes:
+            result_latencies, result_errors = queue.get()
+            latencies.extend(result_latencies)
+            errors += result_errors
+        for process in processes:
+            process.join()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / duration,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "errors": errors,
+        "private_mb": (sum(memory) / len(memory) / 1024) if memory else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="マルチワーカーサーバーのスケーリングベンチマーク")
+    parser.add_argument("--workers", default="1,2,4", help="ワーカー数（カンマ区切り）")
+    parser.add_argument("--clients", type=int, default=2, help="クライアントプロセス数")
+    parser.add_argument("--connections", type=int, default=16, help="クライアントプロセスあたりの接続数")
+    parser.add_argument("--duration", type=float, default=5.0, help="計測時間（秒）")
+    parser.add_argument("--no-preload", action="store_true", help="fork 前に読み込まない")
+    parser.add_argument("--loop", default="auto", choices=["auto", "uvloop", "asyncio"], help="イベントループ")
+    parser.add_argument("--http", default="auto", choices=["auto", "httptools", "h11"], help="HTTPパーサー")
+    args = parser.parse_args(argv)
+
+    print(f"CPU数: {os.cpu_count()}, クライアント {args.clients} プロセス × {args.connections} 接続")
+    print(f"{'ワーカー数':<10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'エラー':>8}{'固有メモリ MB/ワーカー':>24}")
+    for workers in (int(value) for value in args.workers.split(",")):
+        result = bench(
+            workers, args.clients, args.connections, args.duration,
+            preload=not args.no_preload, loop=args.loop, http=args.http
+        )
+        print(
+            f"{workers:<10}{result['rps']:>10.0f}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+            f"{result['errors']:>8}{result['private_mb']:>24.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
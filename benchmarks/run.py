@@ -0,0 +1,356 @@
+"""
+ベンチマークスイート
+コマンド生成・判断・入力検証のマイクロベンチマークと、
+/api/onboarding のエンドツーエンド計測（プロセス内のASGI呼び出し、同時実行数を変えて計測）を行い、
+ベースライン（benchmarks/baseline.json）と比較して性能の劣化を検出する
+
+ネットワーク・外部サービス・追加パッケージは使用しない（オフラインで実行可能）
+
+使い方:
+    python -m benchmarks.run                    # ベースラインと比較（劣化がしきい値を超えると終了コード1）
+    python -m benchmarks.run --save-baseline --runs 5    # 5回の中央値をベースラインとして保存
+    python -m benchmarks.run --only micro --threshold 0.3
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+SAMPLE_REQUEST = {
+    "company": "株式会社サンプル",
+    "task_type": "onboarding",
+    "employee_name": "山田 太郎",
+    "employment_type": "正社員",
+    "department": "営業部",
+}
+
+# 比較対象の指標と、値が大きいほど良いかどうか
+COMPARED_METRICS = {
+    "us_per_op": False,
+    "p50_ms": False,
+    "p99_ms": False,
+    "rps": True,
+}
+
+# ベースラインの値がこれ未満（ミリ秒）の p99 は比較しない
+# （プロセス内の呼び出しでは1ms未満の p99 はGCやスケジューリングの揺らぎで数倍になりうる）
+P99_GATE_MIN_MS = 1.0
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """ソート済みの値から百分位数を求める（最近傍法）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def bench_micro(func: Callable[[], object], iterations: int, repeats: int) -> Dict[str, float]:
+    """
+    関数を iterations 回 × repeats セット実行し、1回あたりの時間を計測する
+
+    Returns:
+        Dict[str, float]: us_per_op（セットごとの中央値）, ops_per_s
+    """
+    for _ in range(min(iterations, 100)):
+        func()
+    per_op: List[float] = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            per_op.append((time.perf_counter() - started) / iterations)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    median = statistics.median(per_op)
+    return {"us_per_op": round(median * 1_000_000, 3), "ops_per_s": round(1 / median, 1)}
+
+
+def run_micro(iterations: int, repeats: int) -> Dict[str, Dict[str, float]]:
+    """判断・コマンド生成・入力検証のマイクロベンチマーク"""
+    from app.models import OnboardingRequest
+    from app.services.command_generator import CommandGenerator
+    from app.services.judgment_service import JudgmentService
+
+    raw_json = json.dumps(SAMPLE_REQUEST, ensure_ascii=False).encode("utf-8")
+    request_dict = OnboardingRequest.model_validate(SAMPLE_REQUEST).model_dump()
+    contract_dict = dict(request_dict, employment_type="派遣")
+    today = date.today()
+    judgment = JudgmentService.judge(request_dict, today)
+    contract_judgment = JudgmentService.judge(contract_dict, today)
+
+    cases = {
+        "validate_dict": lambda: OnboardingRequest.model_validate(SAMPLE_REQUEST),
+        "validate_json": lambda: OnboardingRequest.model_validate_json(raw_json),
+        "judge_regular": lambda: JudgmentService.judge(request_dict, today),
+        "judge_contract": lambda: JudgmentService.judge(contract_dict, today),
+        "generate_regular": lambda: CommandGenerator.generate_command(request_dict, judgment),
+        "generate_contract": lambda: CommandGenerator.generate_command(contract_dict, contract_judgment),
+    }
+    return {name: bench_micro(func, iterations, repeats) for name, func in cases.items()}
+
+
+class ASGIDriver:
+    """
+    ASGIアプリケーションをプロセス内で直接呼び出すクライアント
+
+    HTTPクライアントライブラリやソケットを使わず、ASGIのscope/receive/sendを組み立てて呼び出す
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, body: bytes = b"", headers: Optional[Dict[str, str]] = None) -> int:
+        """
+        リクエストを1件送信する
+
+        Returns:
+            int: HTTPステータスコード
+        """
+        raw_headers = [(b"host", b"bench"), (b"content-length", str(len(body)).encode())]
+        for name, value in (headers or {}).items():
+            raw_headers.append((name.lower().encode("latin-1"), value.encode("latin-1")))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        }
+        sent = False
+        status = 0
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        await self.app(scope, receive, send)
+        return status
+
+
+async def run_e2e_level(
+    driver: ASGIDriver,
+    body: bytes,
+    concurrency: int,
+    requests: int,
+    extra_headers: Optional[Dict[str, str]] = None
+) -> Dict[str, float]:
+    """同時実行数 concurrency で requests 件のリクエストを送信し、レイテンシを計測する"""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+    headers = {"content-type": "application/json", **(extra_headers or {})}
+
+    async def worker():
+        nonlocal errors
+        for _ in counter:
+            started = time.perf_counter()
+            status = await driver.request("POST", "/api/onboarding", body, headers)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+async def run_e2e(levels: List[int], requests: int) -> Dict[str, Dict[str, float]]:
+    """/api/onboarding のエンドツーエンド計測（起動処理を含むライフサイクルを実行）"""
+    from app.config import get_settings
+    from app.main import app, get_admission_controller
+
+    # 設定の読み込み・ロガーの設定・流量制御の作成は初回の使用時に行われるため、ログレベルの変更より前に済ませる
+    admission_controller = get_admission_controller()
+    # ログ出力の負荷を計測対象から外す
+    logging.getLogger().setLevel(logging.WARNING)
+    settings = get_settings()
+    if admission_controller is not None:
+        # 単一のクライアントから連続して送信するため、クライアントごとの流量制限は外す（同時実行数の制御は計測に含める）
+        admission_controller.limiter = None
+    body = json.dumps(SAMPLE_REQUEST, ensure_ascii=False).encode("utf-8")
+    driver = ASGIDriver(app)
+    results: Dict[str, Dict[str, float]] = {}
+    async with app.router.lifespan_context(app):
+        # 同じ本文を繰り返し送信するため、生成処理の計測中は重複リクエストの検出を無効にする
+        settings.idempotency_enabled = False
+        await run_e2e_level(driver, body, 1, min(requests, 200))  # ウォームアップ
+        for concurrency in levels:
+            results[f"onboarding_c{concurrency}"] = await run_e2e_level(driver, body, concurrency, requests)
+        # 重複リクエスト（同じ Idempotency-Key での保存済みレスポンスの再送）の計測
+        settings.idempotency_enabled = True
+        replay_headers = {"idempotency-key": f"bench-{os.getpid()}-{time.monotonic_ns()}"}
+        results["onboarding_replay_c10"] = await run_e2e_level(driver, body, 10, requests, replay_headers)
+    return results
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    ベースラインと比較し、しきい値を超えて劣化した指標を返す
+
+    Args:
+        current: 今回の結果
+        baseline: ベースライン
+        threshold: 許容する劣化の割合（0.2 = 20%）
+
+    Returns:
+        List[str]: 劣化した指標の説明
+    """
+    regressions: List[str] = []
+    for group in ("micro", "e2e"):
+        for name, metrics in current.get(group, {}).items():
+            base_metrics = baseline.get(group, {}).get(name)
+            if not base_metrics:
+                continue
+            for metric, higher_is_better in COMPARED_METRICS.items():
+                if metric not in metrics or not base_metrics.get(metric):
+                    continue
+                base, value = base_metrics[metric], metrics[metric]
+                if metric == "p99_ms" and base < P99_GATE_MIN_MS:
+                    continue
+                change = (base - value) / base if higher_is_better else (value - base) / base
+                if change > threshold:
+                    regressions.append(f"{group}.{name}.{metric}: {base} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def median_results(runs: List[Dict]) -> Dict:
+    """
+    複数回の計測結果を、指標ごとの中央値にまとめる
+
+    Args:
+        runs: 1回ごとの結果（micro / e2e）
+
+    Returns:
+        Dict: 指標ごとの中央値（runs に計測回数を記録する）
+    """
+    merged: Dict = {"runs": len(runs)}
+    for group in ("micro", "e2e"):
+        if group not in runs[0]:
+            continue
+        merged[group] = {
+            name: {
+                metric: round(statistics.median(run[group][name][metric] for run in runs), 3)
+                for metric in metrics
+            }
+            for name, metrics in runs[0][group].items()
+        }
+    return merged
+
+
+def print_report(results: Dict) -> None:
+    """結果を表形式で出力する"""
+    if results.get("micro"):
+        print(f"{'microbenchmark':<22}{'us/op':>12}{'ops/s':>14}")
+        for name, metrics in results["micro"].items():
+            print(f"{name:<22}{metrics['us_per_op']:>12.3f}{metrics['ops_per_s']:>14.1f}")
+    if results.get("e2e"):
+        print()
+        print(f"{'end-to-end':<22}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for name, metrics in results["e2e"].items():
+            print(
+                f"{name:<22}{metrics['rps']:>10.1f}{metrics['p50_ms']:>10.3f}"
+                f"{metrics['p95_ms']:>10.3f}{metrics['p99_ms']:>10.3f}{metrics['errors']:>8}"
+            )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ベンチマークスイート")
+    parser.add_argument("--only", choices=("micro", "e2e"), help="指定したグループのみ実行")
+    parser.add_argument("--iterations", type=int, default=2000, help="マイクロベンチマークの1セットあたりの実行回数")
+    parser.add_argument("--repeats", type=int, default=7, help="マイクロベンチマークのセット数")
+    parser.add_argument("--requests", type=int, default=2000, help="同時実行数ごとのリクエスト数")
+    parser.add_argument("--concurrency", default="1,10,50", help="同時実行数（カンマ区切り）")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="ベースラインJSONのパス")
+    parser.add_argument("--save-baseline", action="store_true", help="結果をベースラインとして保存")
+    parser.add_argument("--threshold", type=float, default=0.25, help="許容する劣化の割合（既定: 0.25）")
+    parser.add_argument("--runs", type=int, default=3, help="計測の回数（指標ごとの中央値を採用）")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    runs: List[Dict] = []
+    for _ in range(max(1, args.runs)):
+        run: Dict = {}
+        if args.only in (None, "micro"):
+            run["micro"] = run_micro(args.iterations, args.repeats)
+        if args.only in (None, "e2e"):
+            run["e2e"] = asyncio.run(run_e2e(levels, args.requests))
+        runs.append(run)
+    results: Dict = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        **median_results(runs),
+    }
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print_report(results)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"\nベースラインを保存しました: {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not args.baseline.exists():
+        print(f"\nベースラインがありません（--save-baseline で作成）: {args.baseline}", file=sys.stderr)
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n性能が {args.threshold:.0%} を超えて劣化しました:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print(f"\nベースラインとの比較: 劣化なし（しきい値 {args.threshold:.0%}）", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
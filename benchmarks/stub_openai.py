@@ -0,0 +1,89 @@
+"""
+OpenAI API スタブサーバー
+/v1/chat/completions を模倣し、実際のAPIを使わずに AIService のスループットを計測する
+
+使い方:
+    python -m benchmarks.stub_openai --port 8900 --latency 0.2 --error-rate 0.05
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def create_app(latency: float = 0.2, jitter: float = 0.05, error_rate: float = 0.0) -> FastAPI:
+    """
+    スタブアプリケーションを作成する
+
+    Args:
+        latency: 応答までの平均待機時間（秒）
+        jitter: 待機時間のばらつき（秒）
+        error_rate: 429 / 503 を返す割合（0〜1）
+
+    Returns:
+        FastAPI: スタブアプリケーション
+    """
+    app = FastAPI(title="OpenAI API スタブ")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        await asyncio.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+
+        if error_rate and random.random() < error_rate:
+            status = random.choice((429, 503))
+            return JSONResponse(
+                status_code=status,
+                content={"error": {"message": "stub error", "type": "stub", "code": status}},
+                headers={"retry-after": "0.05"}
+            )
+
+        prompt = body["messages"][-1]["content"]
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"[stub] {prompt.splitlines()[0]}"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI API スタブサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.2, help="平均応答時間（秒）")
+    parser.add_argument("--jitter", type=float, default=0.05, help="応答時間のばらつき（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429/503 を返す割合")
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(args.latency, args.jitter, args.error_rate),
+        host=args.host,
+        port=args.port,
+        log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
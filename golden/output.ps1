@@ -0,0 +1,193 @@
+# ----- 行 1: 山田 太郎 -----
+# =========================================
+# Entra ID ユーザー作成（正社員）
+# Generated at: <GENERATED_AT>
+# =========================================
+
+$DisplayName = "山田 太郎"
+$UserPrincipalName = "yamada.taro@company.onmicrosoft.com"
+$MailNickname = "yamada.taro"
+$Department = "営業部"
+$UsageLocation = "JP"
+$TempPassword = (New-Guid).Guid
+
+Write-Host "[INFO] Entra ID ユーザーを作成します（Dry-run前提）"
+
+$newUser = New-MgUser `
+  -DisplayName $DisplayName `
+  -UserPrincipalName $UserPrincipalName `
+  -MailNickname $MailNickname `
+  -Department $Department `
+  -UsageLocation $UsageLocation `
+  -AccountEnabled $true `
+  -PasswordProfile @{
+      ForceChangePasswordNextSignIn = $true
+      Password = $TempPassword
+  }
+
+$sku = Get-MgSubscribedSku | Where-Object { $_.SkuPartNumber -eq "ENTERPRISEPACK" }
+
+if ($sku) {
+  Set-MgUserLicense `
+    -UserId $newUser.Id `
+    -AddLicenses @{ SkuId = $sku.SkuId } `
+    -RemoveLicenses @()
+
+  Write-Host "[SUCCESS] Microsoft 365 E3 ライセンスを付与しました"
+} else {
+  Write-Host "[WARN] Microsoft 365 E3 ライセンスが見つからないためスキップしました"
+}
+
+Write-Host "[SUCCESS] ユーザー作成完了: $DisplayName ($UserPrincipalName)" -ForegroundColor Green
+
+
+# ----- 行 2: 鈴木 花子 -----
+# =========================================
+# Entra ID ユーザー作成（派遣社員）
+# Generated at: <GENERATED_AT>
+# 契約終了日: <DATE>
+# =========================================
+
+$DisplayName = "鈴木 花子"
+$UserPrincipalName = "suzuki.hanako@company.onmicrosoft.com"
+$MailNickname = "suzuki.hanako"
+$Department = "総務部"
+$UsageLocation = "JP"
+$AccountExpirationDate = Get-Date "<DATE>"
+$TempPassword = (New-Guid).Guid
+
+Write-Host "[INFO] Entra ID ユーザーを作成します（制限ユーザー・有効期限あり、Dry-run前提）"
+
+$newUser = New-MgUser `
+  -DisplayName $DisplayName `
+  -UserPrincipalName $UserPrincipalName `
+  -MailNickname $MailNickname `
+  -Department $Department `
+  -UsageLocation $UsageLocation `
+  -AccountEnabled $true `
+  -PasswordProfile @{
+      ForceChangePasswordNextSignIn = $true
+      Password = $TempPassword
+  }
+
+# 注意: Entra ID では AccountExpirationDate は制限付きの機能です
+# 必要に応じて別途設定してください
+
+$sku = Get-MgSubscribedSku | Where-Object { $_.SkuPartNumber -eq "BASICPACK" }
+
+if ($sku) {
+  Set-MgUserLicense `
+    -UserId $newUser.Id `
+    -AddLicenses @{ SkuId = $sku.SkuId } `
+    -RemoveLicenses @()
+
+  Write-Host "[SUCCESS] Microsoft 365 Basic ライセンスを付与しました"
+} else {
+  Write-Host "[WARN] Microsoft 365 Basic ライセンスが見つからないためスキップしました"
+}
+
+Write-Host "[SUCCESS] ユーザー作成完了: $DisplayName ($UserPrincipalName)" -ForegroundColor Green
+Write-Host "[INFO] 有効期限: <DATE>" -ForegroundColor Yellow
+
+
+# ----- 行 3: 山田 太郎 -----
+# =========================================
+# Entra ID ユーザー作成（正社員）
+# Generated at: <GENERATED_AT>
+# =========================================
+
+$DisplayName = "山田 太郎"
+$UserPrincipalName = "yamada.taro2@company.onmicrosoft.com"
+$MailNickname = "yamada.taro2"
+$Department = "開発部"
+$UsageLocation = "JP"
+$TempPassword = (New-Guid).Guid
+
+Write-Host "[INFO] Entra ID ユーザーを作成します（Dry-run前提）"
+
+$newUser = New-MgUser `
+  -DisplayName $DisplayName `
+  -UserPrincipalName $UserPrincipalName `
+  -MailNickname $MailNickname `
+  -Department $Department `
+  -UsageLocation $UsageLocation `
+  -AccountEnabled $true `
+  -PasswordProfile @{
+      ForceChangePasswordNextSignIn = $true
+      Password = $TempPassword
+  }
+
+$sku = Get-MgSubscribedSku | Where-Object { $_.SkuPartNumber -eq "ENTERPRISEPACK" }
+
+if ($sku) {
+  Set-MgUserLicense `
+    -UserId $newUser.Id `
+    -AddLicenses @{ SkuId = $sku.SkuId } `
+    -RemoveLicenses @()
+
+  Write-Host "[SUCCESS] Microsoft 365 E3 ライセンスを付与しました"
+} else {
+  Write-Host "[WARN] Microsoft 365 E3 ライセンスが見つからないためスキップしました"
+}
+
+Write-Host "[SUCCESS] ユーザー作成完了: $DisplayName ($UserPrincipalName)" -ForegroundColor Green
+
+
+# ----- 行 4: さとう いちろう -----
+# =========================================
+# Entra ID ユーザー作成（正社員）
+# Generated at: <GENERATED_AT>
+# =========================================
+
+$DisplayName = "さとう いちろう"
+$UserPrincipalName = "sato.ichiro@company.onmicrosoft.com"
+$MailNickname = "sato.ichiro"
+$Department = "経理部 $(Get-Date)"
+$UsageLocation = "JP"
+$TempPassword = (New-Guid).Guid
+
+Write-Host "[INFO] Entra ID ユーザーを作成します（Dry-run前提）"
+
+$newUser = New-MgUser `
+  -DisplayName $DisplayName `
+  -UserPrincipalName $UserPrincipalName `
+  -MailNickname $MailNickname `
+  -Department $Department `
+  -UsageLocation $UsageLocation `
+  -AccountEnabled $true `
+  -PasswordProfile @{
+      ForceChangePasswordNextSignIn = $true
+      Password = $TempPassword
+  }
+
+$sku = Get-MgSubscribedSku | Where-Object { $_.SkuPartNumber -eq "ENTERPRISEPACK" }
+
+if ($sku) {
+  Set-MgUserLicense `
+    -UserId $newUser.Id `
+    -AddLicenses @{ SkuId = $sku.SkuId } `
+    -RemoveLicenses @()
+
+  Write-Host "[SUCCESS] Microsoft 365 E3 ライセンスを付与しました"
+} else {
+  Write-Host "[WARN] Microsoft 365 E3 ライセンスが見つからないためスキップしました"
+}
+
+Write-Host "[SUCCESS] ユーザー作成完了: $DisplayName ($UserPrincipalName)" -ForegroundColor Green
+
+
+# [ERROR] 行 5: 入力値の検証に失敗しました
+#   - employee_name: String should have at least 1 character
+
+# [ERROR] 行 6: 入力値の検証に失敗しました
+#   - employment_type: Input should be '正社員' or '派遣'
+
+# [ERROR] 行 7: 行を解析できません: Expecting ',' delimiter: line 1 column 47 (char 46)
+
+# [ERROR] 行 8: 入力値の検証に失敗しました
+#   - employee_name: Value error, 改行などの制御文字は使用できません
+
+# [ERROR] 行 9: 入力値の検証に失敗しました
+#   - company: Value error, 改行などの制御文字は使用できません
+#   - department: Value error, 改行などの制御文字は使用できません
+
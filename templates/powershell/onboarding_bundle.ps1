@@ -0,0 +1,95 @@
+# =========================================
+# Entra ID ユーザー一括作成（バンドル形式）
+# Generated at: {generated_at}
+#
+# 共通の関数と Microsoft Graph への接続はこのファイルの先頭で1回だけ定義し、
+# 従業員ごとの処理は末尾の New-OnboardingUser の呼び出し（1行1名）で行います。
+# =========================================
+
+$UsageLocation = "JP"
+$script:SkuIds = $null
+$script:Succeeded = 0
+$script:Failed = 0
+
+function Connect-OnboardingGraph {
+  # 未接続の場合のみ Microsoft Graph に接続する
+  if ($null -eq (Get-MgContext)) {
+    Write-Host "[INFO] Microsoft Graph に接続します"
+    Connect-MgGraph -Scopes "User.ReadWrite.All", "Organization.Read.All" -NoWelcome
+  }
+}
+
+function Get-OnboardingSkuId {
+  param([string]$SkuPartNumber)
+  # テナントのライセンス一覧は最初の1回だけ取得し、以降は SkuPartNumber で引く
+  if ($null -eq $script:SkuIds) {
+    $script:SkuIds = @{}
+    foreach ($sku in Get-MgSubscribedSku) {
+      $script:SkuIds[$sku.SkuPartNumber] = $sku.SkuId
+    }
+  }
+  return $script:SkuIds[$SkuPartNumber]
+}
+
+function New-OnboardingUser {
+  param(
+    [int]$Row,
+    [string]$DisplayName,
+    [string]$MailNickname,
+    [string]$Domain,
+    [string]$Department,
+    [string]$LicenseSku,
+    [string]$LicenseType,
+    [string]$ContractEndDate = ""
+  )
+
+  $UserPrincipalName = "$MailNickname@$Domain"
+  Write-Host "[INFO] 行 $Row`: Entra ID ユーザーを作成します（$DisplayName）"
+
+  try {
+    $newUser = New-MgUser `
+      -DisplayName $DisplayName `
+      -UserPrincipalName $UserPrincipalName `
+      -MailNickname $MailNickname `
+      -Department $Department `
+      -UsageLocation $UsageLocation `
+      -AccountEnabled $true `
+      -PasswordProfile @{
+          ForceChangePasswordNextSignIn = $true
+          Password = (New-Guid).Guid
+      } `
+      -ErrorAction Stop
+  }
+  catch {
+    Write-Host "[ERROR] 行 $Row`: ユーザー作成に失敗しました: $($_.Exception.Message)" -ForegroundColor Red
+    $script:Failed++
+    return
+  }
+
+  $skuId = Get-OnboardingSkuId -SkuPartNumber $LicenseSku
+  if ($skuId) {
+    Set-MgUserLicense `
+      -UserId $newUser.Id `
+      -AddLicenses @{ SkuId = $skuId } `
+      -RemoveLicenses @()
+
+    Write-Host "[SUCCESS] $LicenseType ライセンスを付与しました"
+  } else {
+    Write-Host "[WARN] $LicenseType ライセンスが見つからないためスキップしました"
+  }
+
+  Write-Host "[SUCCESS] ユーザー作成完了: $DisplayName ($UserPrincipalName)" -ForegroundColor Green
+  if ($ContractEndDate) {
+    # 注意: Entra ID では AccountExpirationDate は制限付きの機能です（必要に応じて別途設定してください）
+    Write-Host "[INFO] 有効期限: $ContractEndDate" -ForegroundColor Yellow
+  }
+  $script:Succeeded++
+}
+
+function Write-OnboardingSummary {
+  Write-Host "[INFO] 完了: 成功 $script:Succeeded 件 / 失敗 $script:Failed 件"
+}
+
+Connect-OnboardingGraph
+
+# ----- 従業員ごとの処理（1行1名） -----
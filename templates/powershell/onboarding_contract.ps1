@@ -29,7 +29,7 @@ $newUser = New-MgUser `
 # 注意: Entra ID では AccountExpirationDate は制限付きの機能です
 # 必要に応じて別途設定してください
 
-$sku = Get-MgSubscribedSku | Where-Object { $_.SkuPartNumber -eq "BASICPACK" }
+$sku = Get-MgSubscribedSku | Where-Object { $_.SkuPartNumber -eq "{license_sku}" }
 
 if ($sku) {
   Set-MgUserLicense `
@@ -37,9 +37,9 @@ if ($sku) {
     -AddLicenses @{ SkuId = $sku.SkuId } `
     -RemoveLicenses @()
 
-  Write-Host "[SUCCESS] Microsoft 365 Basic ライセンスを付与しました"
+  Write-Host "[SUCCESS] {license_type} ライセンスを付与しました"
 } else {
-  Write-Host "[WARN] Basic ライセンスが見つからないためスキップしました"
+  Write-Host "[WARN] {license_type} ライセンスが見つからないためスキップしました"
 }
 
 Write-Host "[SUCCESS] ユーザー作成完了: $DisplayName ($UserPrincipalName)" -ForegroundColor Green
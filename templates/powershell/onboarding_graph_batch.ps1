@@ -0,0 +1,175 @@
+# =========================================
+# Entra ID ユーザー一括作成（Microsoft Graph JSON バッチ）
+# Generated at: {generated_at}
+#
+# ライセンス SKU はスクリプトの開始時に1回だけ取得して対応表にし、
+# ユーザー作成とライセンス付与は $batch リクエスト（1回あたり最大20件）にまとめて送信します。
+# スロットリング（429 / 503 / 504）された要求は Retry-After（無い場合は指数バックオフ）に従って再送します。
+# 従業員ごとのデータは末尾の $Users.Add(...)（1行1名）で定義します。
+# =========================================
+
+$UsageLocation = "JP"
+$BatchSize = 20
+$MaxAttempts = 6
+$BatchUri = 'https://graph.microsoft.com/v1.0/$batch'
+
+if ($null -eq (Get-MgContext)) {
+  Write-Host "[INFO] Microsoft Graph に接続します"
+  Connect-MgGraph -Scopes "User.ReadWrite.All", "Organization.Read.All" -NoWelcome
+}
+
+# ライセンス SKU の対応表（SkuPartNumber → SkuId）
+$SkuIds = @{}
+foreach ($sku in Get-MgSubscribedSku) {
+  $SkuIds[$sku.SkuPartNumber] = $sku.SkuId
+}
+
+function Invoke-GraphBatch {
+  # 要求を最大 $BatchSize 件ずつ $batch で送信し、id → 応答（status / headers / body）の対応表を返す
+  param(
+    [object[]]$Requests,
+    [int[]]$RetryStatus = @(429, 503, 504)
+  )
+
+  $responses = @{}
+  for ($offset = 0; $offset -lt $Requests.Count; $offset += $BatchSize) {
+    $last = [Math]::Min($offset + $BatchSize, $Requests.Count) - 1
+    $pending = @($Requests[$offset..$last])
+    $attempt = 0
+    while ($pending.Count -gt 0) {
+      $attempt++
+      $body = @{ requests = $pending } | ConvertTo-Json -Depth 10 -Compress
+      try {
+        $result = Invoke-MgGraphRequest -Method POST -Uri $BatchUri -Body $body -ContentType "application/json" -OutputType PSObject
+      }
+      catch {
+        # $batch 自体がスロットリングされた場合は全件を再送する
+        $status = 0
+        if ($_.Exception.Response) { $status = [int]$_.Exception.Response.StatusCode }
+        if ($RetryStatus -notcontains $status -or $attempt -ge $MaxAttempts) { throw }
+        $wait = [Math]::Min(60, [Math]::Pow(2, $attempt))
+        Write-Host "[WARN] バッチ要求がスロットリングされました。$wait 秒後に再送します（$attempt 回目）" -ForegroundColor Yellow
+        Start-Sleep -Seconds $wait
+        continue
+      }
+
+      $retry = [System.Collections.Generic.List[object]]::new()
+      $wait = 0
+      foreach ($response in $result.responses) {
+        if ($RetryStatus -contains [int]$response.status -and $attempt -lt $MaxAttempts) {
+          $retry.Add(($pending | Where-Object { $_.id -eq $response.id }))
+          if ($response.headers -and $response.headers.'Retry-After') {
+            $wait = [Math]::Max($wait, [int]$response.headers.'Retry-After')
+          }
+        }
+        else {
+          $responses[$response.id] = $response
+        }
+      }
+      if ($retry.Count -gt 0) {
+        if ($wait -le 0) { $wait = [Math]::Min(60, [Math]::Pow(2, $attempt)) }
+        Write-Host "[WARN] $($retry.Count) 件の要求がスロットリングされました。$wait 秒後に再送します（$attempt 回目）" -ForegroundColor Yellow
+        Start-Sleep -Seconds $wait
+      }
+      $pending = $retry.ToArray()
+    }
+  }
+  return $responses
+}
+
+function Get-GraphErrorMessage {
+  param([object]$Response)
+  if ($null -eq $Response) { return "応答がありません" }
+  if ($Response.body -and $Response.body.error) { return $Response.body.error.message }
+  return "HTTP $($Response.status)"
+}
+
+function Invoke-OnboardingGraphBatch {
+  param([System.Collections.Generic.List[hashtable]]$Users)
+
+  if ($Users.Count -eq 0) {
+    Write-Host "[INFO] 作成するユーザーがありません"
+    return
+  }
+
+  # 1. ユーザー作成（$batch）
+  Write-Host "[INFO] $($Users.Count) 名の Entra ID ユーザーを作成します"
+  $createRequests = [System.Collections.Generic.List[object]]::new()
+  foreach ($user in $Users) {
+    $createRequests.Add(@{
+      id = [string]$user.Row
+      method = "POST"
+      url = "/users"
+      headers = @{ "Content-Type" = "application/json" }
+      body = @{
+        accountEnabled = $true
+        displayName = $user.DisplayName
+        mailNickname = $user.MailNickname
+        userPrincipalName = "$($user.MailNickname)@$($user.Domain)"
+        department = $user.Department
+        usageLocation = $UsageLocation
+        passwordProfile = @{
+          forceChangePasswordNextSignIn = $true
+          password = (New-Guid).Guid
+        }
+      }
+    })
+  }
+  $created = Invoke-GraphBatch -Requests $createRequests.ToArray()
+
+  # 2. ライセンス付与（$batch、SKU は対応表から引く）
+  $succeeded = 0
+  $failed = 0
+  $licenseRequests = [System.Collections.Generic.List[object]]::new()
+  foreach ($user in $Users) {
+    $response = $created[[string]$user.Row]
+    if ($null -eq $response -or [int]$response.status -ne 201) {
+      Write-Host "[ERROR] 行 $($user.Row): ユーザー作成に失敗しました（$($user.DisplayName)）: $(Get-GraphErrorMessage $response)" -ForegroundColor Red
+      $failed++
+      continue
+    }
+    Write-Host "[SUCCESS] ユーザー作成完了: $($user.DisplayName) ($($response.body.userPrincipalName))" -ForegroundColor Green
+    if ($user.ContractEndDate) {
+      # 注意: Entra ID では AccountExpirationDate は制限付きの機能です（必要に応じて別途設定してください）
+      Write-Host "[INFO] 有効期限: $($user.ContractEndDate)" -ForegroundColor Yellow
+    }
+    $succeeded++
+
+    $skuId = $SkuIds[$user.LicenseSku]
+    if (-not $skuId) {
+      Write-Host "[WARN] 行 $($user.Row): $($user.LicenseType) ライセンスが見つからないためスキップしました"
+      continue
+    }
+    $licenseRequests.Add(@{
+      id = [string]$user.Row
+      method = "POST"
+      url = "/users/$($response.body.id)/assignLicense"
+      headers = @{ "Content-Type" = "application/json" }
+      body = @{
+        addLicenses = @(@{ skuId = $skuId })
+        removeLicenses = @()
+      }
+    })
+  }
+
+  if ($licenseRequests.Count -gt 0) {
+    # 作成直後のユーザーはディレクトリへの反映待ちで 404 になることがあるため、404 も再送する
+    $assigned = Invoke-GraphBatch -Requests $licenseRequests.ToArray() -RetryStatus @(404, 429, 503, 504)
+    foreach ($user in $Users) {
+      $response = $assigned[[string]$user.Row]
+      if ($null -eq $response) { continue }
+      if ([int]$response.status -eq 200) {
+        Write-Host "[SUCCESS] 行 $($user.Row): $($user.LicenseType) ライセンスを付与しました"
+      }
+      else {
+        Write-Host "[WARN] 行 $($user.Row): ライセンス付与に失敗しました: $(Get-GraphErrorMessage $response)" -ForegroundColor Yellow
+      }
+    }
+  }
+
+  Write-Host "[INFO] 完了: 成功 $succeeded 件 / 失敗 $failed 件"
+}
+
+$Users = [System.Collections.Generic.List[hashtable]]::new()
+
+# ----- 従業員ごとのデータ（1行1名） -----
@@ -24,7 +24,7 @@ $newUser = New-MgUser `
       Password = $TempPassword
   }
 
-$sku = Get-MgSubscribedSku | Where-Object { $_.SkuPartNumber -eq "ENTERPRISEPACK" }
+$sku = Get-MgSubscribedSku | Where-Object { $_.SkuPartNumber -eq "{license_sku}" }
 
 if ($sku) {
   Set-MgUserLicense `
@@ -32,9 +32,9 @@ if ($sku) {
     -AddLicenses @{ SkuId = $sku.SkuId } `
     -RemoveLicenses @()
 
-  Write-Host "[SUCCESS] Microsoft 365 E3 ライセンスを付与しました"
+  Write-Host "[SUCCESS] {license_type} ライセンスを付与しました"
 } else {
-  Write-Host "[WARN] E3 ライセンスが見つからないためスキップしました"
+  Write-Host "[WARN] {license_type} ライセンスが見つからないためスキップしました"
 }
 
 Write-Host "[SUCCESS] ユーザー作成完了: $DisplayName ($UserPrincipalName)" -ForegroundColor Green